@@ -0,0 +1,99 @@
+"""Shared LangChain tool-calling executors for the lesson chat.
+
+Building the Gemini client, binding the tools and compiling the agent used to
+happen on every ``/api/chat/lc_stream`` request. Executors are now built once
+per model configuration and reused: they hold no per-request state, and the
+system prompt and chat history are passed as inputs on each call.
+``warm_chat_executors`` builds the default configuration in the background
+at startup so the first chat request doesn't pay for it either; LangChain
+itself is only imported then (on a worker thread), not when this module is.
+"""
+
+import asyncio
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.executors import run_blocking
+from app.core.log import get_logger
+
+if TYPE_CHECKING:
+    from langchain.agents import AgentExecutor
+
+logger = get_logger(__name__)
+
+# (model, temperature, max_iterations) -> executor
+_executors: Dict[Tuple[str, float, int], "AgentExecutor"] = {}
+_lock = asyncio.Lock()
+
+
+def chat_agent_prompt() -> Any:
+    """Prompt with inputs ``system_prompt`` (str), ``chat_history`` (messages) and ``input`` (str)."""
+    from langchain_core.prompts import (ChatPromptTemplate,
+                                        HumanMessagePromptTemplate,
+                                        MessagesPlaceholder)
+
+    return ChatPromptTemplate.from_messages([
+        ("system", "{system_prompt}"),
+        MessagesPlaceholder(variable_name="chat_history"),
+        HumanMessagePromptTemplate.from_template("{input}"),
+        MessagesPlaceholder(variable_name="agent_scratchpad"),
+    ])
+
+
+def _build_executor(model: str, temperature: float, max_iterations: int) -> "AgentExecutor":
+    from app.tools.our_langchain_tools import (exa_search_lc_tool,
+                                               firecrawl_scrape_url_lc_tool,
+                                               perplexity_search_lc_tool)
+    from langchain.agents import AgentExecutor, create_tool_calling_agent
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    tools = [exa_search_lc_tool, perplexity_search_lc_tool, firecrawl_scrape_url_lc_tool]
+    llm = ChatGoogleGenerativeAI(
+        model=model,
+        google_api_key=settings.gemini_api_key,
+        model_kwargs={"generation_config": {"max_output_tokens": 500000, "temperature": temperature}},
+    )
+    agent = create_tool_calling_agent(llm, tools, chat_agent_prompt())
+    return AgentExecutor(
+        agent=agent,
+        tools=tools,
+        verbose=True,
+        handle_parsing_errors=True,
+        max_iterations=max_iterations,  # Prevent runaway agents
+    )
+
+
+async def get_chat_executor(
+    model: Optional[str] = None,
+    temperature: Optional[float] = None,
+    max_iterations: Optional[int] = None,
+) -> "AgentExecutor":
+    """The shared executor for a model configuration (defaults from settings)."""
+    key = (
+        model or settings.chat_agent_model,
+        settings.chat_agent_temperature if temperature is None else temperature,
+        max_iterations or settings.chat_agent_max_iterations,
+    )
+    executor = _executors.get(key)
+    if executor is not None:
+        return executor
+    async with _lock:
+        if key not in _executors:
+            # Imports and client construction block; keep them off the event loop
+            _executors[key] = await run_blocking(_build_executor, *key)
+            logger.info("Built chat agent executor for %s", key)
+    return _executors[key]
+
+
+async def warm_chat_executors() -> None:
+    """Build the default executor ahead of the first chat request."""
+    if not settings.gemini_api_key:
+        return
+    try:
+        await get_chat_executor()
+    except Exception as e:
+        logger.warning("Chat executor warm-up failed: %s", e)
+
+
+def chat_executor_configs() -> List[str]:
+    return [f"{model}@{temperature}/{iterations}" for model, temperature, iterations in _executors]
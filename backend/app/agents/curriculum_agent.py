@@ -1,19 +1,35 @@
 """LangGraph agent for curriculum generation and management."""
 
+import asyncio
 import json
+import logging
 import re  # Added for robust JSON parsing
-import traceback  # Added for error logging
-from typing import Annotated, Any, Dict, List, Optional, TypedDict, AsyncIterator
+import time
+from typing import (Annotated, Any, AsyncIterator, Awaitable, Callable, Dict,
+                    List, Optional, TypedDict)
 
 import aiohttp
 from app.core.config import settings
+from app.core.executors import run_blocking
+from app.core.metrics import (GENERATION_STAGE_SECONDS, TOOL_CALL_SECONDS,
+                              LLMCallMetrics)
+from app.core.http_client import get_http_session
+from app.core.log import Sampler, get_logger
+from app.services.chat_context import truncate_to_tokens
+from app.services.streaming_json import JSONArrayStreamParser
+from app.services.validation_service import parse_outline, validate_day
 from app.tools.knowledge_sources import (arxiv_search, github_search,
                                          wikipedia_search, wolfram_alpha_query,
                                          youtube_search)
 from app.tools.scraping import (firecrawl_crawl, firecrawl_scrape,
                                 firecrawl_search)
 from app.tools.search import exa_search, perplexity_search
-from langgraph.graph import END, StateGraph
+from tenacity import AsyncRetrying, stop_after_attempt, wait_exponential
+
+logger = get_logger(__name__)
+
+# Raw SSE lines are only logged at DEBUG, and then only one in N
+_stream_line_sampler = Sampler()
 
 
 class AgentState(TypedDict):
@@ -29,13 +45,13 @@ class CurriculumAgent:
     """Agent for generating and managing curricula."""
     
     def __init__(self):
-        self.graph = self._build_graph()
+        self._graph = None
         # self.openrouter_api_key = settings.openrouter_api_key # Old key
         self.gemini_api_key = settings.gemini_api_key # New key for Gemini API
         
         # Check if API key is set
         if not self.gemini_api_key:
-            print("CRITICAL WARNING: GEMINI_API_KEY is not set in environment variables!")
+            logger.critical("GEMINI_API_KEY is not set in environment variables")
         
         # Tool mapping
         self.tools = {
@@ -51,11 +67,36 @@ class CurriculumAgent:
             "wolfram_alpha_query": wolfram_alpha_query
         }
         
-        self.graph = self._build_graph()
+        # Per-tool deadlines (seconds); anything not listed uses settings.tool_timeout_seconds
+        self.tool_timeouts = {
+            "firecrawl_search": 30.0,
+            "perplexity_search": 25.0,
+            "exa_search": 20.0,
+            "youtube_search": 15.0,
+            "arxiv_search": 15.0,
+            "wikipedia_search": 10.0,
+            "github_search": 10.0,
+            "wolfram_alpha_query": 10.0,
+        }
+        
         self.youtube_url_mapping = {}  # Store YouTube URL mappings
     
-    def _build_graph(self) -> StateGraph:
+    @property
+    def graph(self):
+        """The compiled LangGraph workflow, built (and LangGraph imported) on first use."""
+        if self._graph is None:
+            self._graph = self._build_graph()
+        return self._graph
+    
+    async def warm_up(self) -> None:
+        """Build the workflow on a worker thread so the LangGraph import doesn't block the loop."""
+        if self._graph is None:
+            self._graph = await run_blocking(self._build_graph)
+    
+    def _build_graph(self):
         """Build the LangGraph workflow."""
+        from langgraph.graph import END, StateGraph
+
         graph = StateGraph(AgentState)
         
         graph.add_node("analyze_context", self._analyze_context)
@@ -74,21 +115,19 @@ class CurriculumAgent:
     async def _analyze_context(self, state: AgentState) -> AgentState:
         messages = state.get("messages", [])
         context = state.get("context", {})
-        print(f"[AGENT DEBUG] _analyze_context received messages: {messages}") # DEBUG
         user_message = messages[-1] if messages else {}
         query = user_message.get("content", "")
-        print(f"[AGENT DEBUG] _analyze_context extracted query: '{query}'") # DEBUG
         context["user_query"] = query
         current_intent = self._determine_intent(query)
         context["intent"] = current_intent
-        print(f"[AGENT DEBUG] _analyze_context determined intent: '{current_intent}'") # DEBUG
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Analyzed %d message(s): query %d chars, intent=%s", len(messages), len(query), current_intent)
         context["user_preferences"] = context.get("user_preferences", {})
         state["context"] = context
         return state
     
     def _determine_intent(self, query: str) -> str:
         query_lower = query.lower().strip()
-        print(f"[AGENT DEBUG] _determine_intent received query_lower: '{query_lower}'") # DEBUG
         # More specific greeting check first
         if query_lower in ["hi", "hello", "hey", "greetings", "sup", "yo"]:
             return "greeting"
@@ -155,42 +194,89 @@ class CurriculumAgent:
                  if "perplexity_search" not in tools_needed: tools_needed.append("perplexity_search")
         # For "greeting" and "general_chat", tools_needed remains empty by default
         
-        print(f"[AGENT DEBUG] Intent: {intent}, Query: '{query}', Tools Planned: {tools_needed}")
+        logger.debug("Intent %s, tools planned: %s", intent, tools_needed)
         state["tools_needed"] = tools_needed
         return state
     
+    def _prepare_tool_call(self, tool_name: str, query: str) -> Optional[Awaitable[Any]]:
+        """Build the coroutine for a planned tool, or None if it should be skipped."""
+        if tool_name not in self.tools:
+            return None
+        tool_func = self.tools[tool_name]
+        if tool_name == "wolfram_alpha_query":
+            if not settings.wolfram_alpha_app_id:
+                logger.debug("Skipping %s: WOLFRAM_ALPHA_APP_ID not set", tool_name)
+                return None
+            return tool_func(query, app_id=settings.wolfram_alpha_app_id)
+        if tool_name in ["firecrawl_scrape", "firecrawl_crawl"]:
+            return None
+        if tool_name.startswith("firecrawl") and not settings.firecrawl_api_key:
+            logger.debug("Skipping %s: FIRECRAWL_API_KEY not set", tool_name)
+            return None
+        if tool_name == "perplexity_search" and not settings.perplexity_api_key:
+            logger.debug("Skipping %s: PERPLEXITY_API_KEY not set", tool_name)
+            return None
+        if tool_name == "exa_search" and not settings.exa_api_key:
+            logger.debug("Skipping %s: EXA_API_KEY not set", tool_name)
+            return None
+        return tool_func(query)
+
+    async def _run_tool(self, tool_name: str, tool_call: Awaitable[Any]) -> Dict[str, Any]:
+        """Await a single tool under its own deadline."""
+        timeout = self.tool_timeouts.get(tool_name, settings.tool_timeout_seconds)
+        started = time.perf_counter()
+        outcome = "cancelled"  # Overwritten unless the research budget cancels us
+        try:
+            result = await asyncio.wait_for(tool_call, timeout=timeout)
+            logger.debug("Tool %s returned %s in %.2fs", tool_name, type(result).__name__, time.perf_counter() - started)
+            outcome = "error" if isinstance(result, dict) and "error" in result else "ok"
+            return {"tool": tool_name, "result": result}
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+            logger.warning("Tool %s timed out after %gs", tool_name, timeout)
+            return {"tool": tool_name, "error": f"Timed out after {timeout:g}s"}
+        except Exception as e:
+            outcome = "error"
+            logger.warning("Error executing tool %s: %s", tool_name, e)
+            return {"tool": tool_name, "error": str(e)}
+        finally:
+            TOOL_CALL_SECONDS.observe(time.perf_counter() - started, tool=tool_name, outcome=outcome)
+
     async def _execute_tools(self, state: AgentState) -> AgentState:
-        tools_output = []
+        """Run all planned tools concurrently.
+
+        Each tool gets its own deadline (``self.tool_timeouts``) and the whole
+        research phase is capped by ``settings.tools_total_budget_seconds``.
+        Tools still running when the budget runs out are cancelled; results
+        from the tools that finished are kept.
+        """
         tools_needed = state.get("tools_needed", [])
         query = state.get("context", {}).get("user_query", "")
-        print(f"Executing tools: {tools_needed}")
-        for tool_name in tools_needed:
-            if tool_name in self.tools:
-                tool_func = self.tools[tool_name]
-                try:
-                    if tool_name == "wolfram_alpha_query":
-                        if not settings.wolfram_alpha_app_id:
-                            print(f"Skipping {tool_name} - WOLFRAM_ALPHA_APP_ID not set")
-                            continue
-                        result = await tool_func(query, app_id=settings.wolfram_alpha_app_id)
-                    elif tool_name in ["firecrawl_scrape", "firecrawl_crawl"]:
-                        continue
-                    else:
-                        if tool_name.startswith("firecrawl") and not settings.firecrawl_api_key:
-                            print(f"Skipping {tool_name} - FIRECRAWL_API_KEY not set")
-                            continue
-                        elif tool_name == "perplexity_search" and not settings.perplexity_api_key:
-                            print(f"Skipping {tool_name} - PERPLEXITY_API_KEY not set")
-                            continue
-                        elif tool_name == "exa_search" and not settings.exa_api_key:
-                            print(f"Skipping {tool_name} - EXA_API_KEY not set")
-                            continue
-                        result = await tool_func(query)
-                    print(f"Tool {tool_name} returned result of type {type(result)}")
-                    tools_output.append({"tool": tool_name, "result": result})
-                except Exception as e:
-                    print(f"Error executing tool {tool_name}: {str(e)}")
-                    tools_output.append({"tool": tool_name, "error": str(e)})
+        logger.debug("Executing tools: %s", tools_needed)
+
+        tasks: Dict[str, asyncio.Task] = {}
+        for tool_name in dict.fromkeys(tools_needed):  # de-duplicate, keep planned order
+            tool_call = self._prepare_tool_call(tool_name, query)
+            if tool_call is not None:
+                tasks[tool_name] = asyncio.create_task(self._run_tool(tool_name, tool_call))
+
+        tools_output = []
+        if tasks:
+            started = time.perf_counter()
+            done, pending = await asyncio.wait(tasks.values(), timeout=settings.tools_total_budget_seconds)
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+            logger.info("Research phase finished in %.2fs (%d/%d tools completed)", time.perf_counter() - started, len(done), len(tasks))
+
+            for tool_name, task in tasks.items():
+                if task in done:
+                    tools_output.append(task.result())
+                else:
+                    logger.warning("Tool %s cancelled: research budget exhausted", tool_name)
+                    tools_output.append({"tool": tool_name, "error": "Cancelled: research time budget exhausted"})
+
         state["tools_output"] = tools_output
         return state
     
@@ -286,7 +372,7 @@ CRITICAL OUTPUT FORMATTING RULES:
             {"role": "user", "content": user_prompt_content}
         ]
         
-        api_url = "https://generativelanguage.googleapis.com/v1beta/openai/chat/completions"
+        api_url = f"{settings.gemini_base_url}/chat/completions"
         model_name = "gemini-2.5-pro"
         headers = {
             "Authorization": f"Bearer {self.gemini_api_key}", 
@@ -302,27 +388,29 @@ CRITICAL OUTPUT FORMATTING RULES:
             # REMOVED response_format due to Gemini unicode bug - using markdown code blocks instead
         }
 
-        print(f"[AGENT _generate_response] Calling Gemini API ({payload['model']}) for intent '{intent}' with stream=False")
+        logger.debug("Calling Gemini (%s) for intent %s", payload["model"], intent)
         
         complete_response_content = ""
         # Increased timeout for potentially long curriculum generation
         timeout = aiohttp.ClientTimeout(total=3000) # 5 minutes total timeout
+        llm_call = LLMCallMetrics("agent_response", sum(len(m["content"]) for m in llm_messages))
         try:
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.post(api_url, headers=headers, json=payload) as response:
-                    print(f"[AGENT _generate_response] Gemini API status: {response.status}")
-                    if response.status == 200:
-                        data = await response.json()
-                        complete_response_content = data.get("choices", [{}])[0].get("message", {}).get("content", "")
-                        print(f"[AGENT _generate_response] Received full content, length: {len(complete_response_content)}")
-                    else:
-                        error_text = await response.text()
-                        print(f"[AGENT _generate_response] Gemini API error: {error_text}")
-                        err_msg_default = "Sorry, I encountered an error processing your request."
-                        complete_response_content = f'{{ "error": "API Error: {response.status}" }}' if intent == "create_curriculum" else err_msg_default
+            session = get_http_session()
+            async with session.post(api_url, headers=headers, json=payload, timeout=timeout) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    complete_response_content = data.get("choices", [{}])[0].get("message", {}).get("content", "")
+                    llm_call.finish("ok", len(complete_response_content or ""))
+                    logger.debug("Gemini response: %d chars", len(complete_response_content or ""))
+                else:
+                    llm_call.finish(f"http_{response.status}")
+                    error_text = await response.text()
+                    logger.error("Gemini API error (%s): %s", response.status, error_text[:1000])
+                    err_msg_default = "Sorry, I encountered an error processing your request."
+                    complete_response_content = f'{{ "error": "API Error: {response.status}" }}' if intent == "create_curriculum" else err_msg_default
         except Exception as e:
-            print(f"[AGENT _generate_response] Exception: {str(e)}")
-            traceback.print_exc()
+            llm_call.failed(e)
+            logger.exception("Gemini request failed")
             err_msg_default = "Sorry, an unexpected error occurred."
             complete_response_content = f'{{ "error": "LLM Call Exception" }}' if intent == "create_curriculum" else err_msg_default
         
@@ -332,8 +420,9 @@ CRITICAL OUTPUT FORMATTING RULES:
     # New method to prepare context for streaming chat, by running initial graph steps manually
     async def analyze_and_plan_for_chat(self, current_chat_messages: List[Dict[str, Any]], base_context: Dict[str, Any]) -> Dict[str, Any]:
         """Runs analysis, planning, and tool execution to prepare for a streaming LLM call."""
-        print(f"[AGENT analyze_and_plan_for_chat] Initial messages: {current_chat_messages}")
-        print(f"[AGENT analyze_and_plan_for_chat] Base context: {base_context.keys()}")
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            logger.debug("Planning chat turn: %d message(s), context keys %s", len(current_chat_messages), sorted(base_context))
 
         # Mimic initial state for the relevant parts of the agent
         # The user_query for intent determination is the last message.
@@ -354,20 +443,20 @@ CRITICAL OUTPUT FORMATTING RULES:
         intent = analyzed_state["context"].get("intent", "general_chat")
         # The user_query determined by _analyze_context is the one we should focus on for planning and LLM
         focused_user_query = analyzed_state["context"].get("user_query", current_chat_messages[-1]["content"] if current_chat_messages else "")
-        print(f"[AGENT analyze_and_plan_for_chat] Intent: {intent}, Focused Query: '{focused_user_query}'")
 
         # 2. Plan Tools (based on focused query and intent)
         # We need to update the context in temp_state_for_analysis with the focused_user_query for planning
         analyzed_state["context"]["user_query"] = focused_user_query # Ensure _plan_tools uses this
         planned_state = await self._plan_tools(analyzed_state)
         tools_needed = planned_state["tools_needed"]
-        print(f"[AGENT analyze_and_plan_for_chat] Tools needed: {tools_needed}")
 
         # 3. Execute Tools (if any)
         # The query for tool execution should be the focused_user_query
         executed_state = await self._execute_tools(planned_state) # _execute_tools uses context["user_query"]
         tools_output = executed_state["tools_output"]
-        print(f"[AGENT analyze_and_plan_for_chat] Tools output: {len(tools_output)} items")
+        if debug:
+            logger.debug("Chat turn planned: intent=%s, query %d chars, tools %s, %d output item(s)",
+                         intent, len(focused_user_query), tools_needed, len(tools_output))
 
         return {
             "intent": intent,
@@ -384,19 +473,21 @@ CRITICAL OUTPUT FORMATTING RULES:
                                    full_chat_history_for_llm: List[Dict[str,Any]]
                                    ) -> AsyncIterator[str]:
         
-        print(f"[AGENT stream_chat_response] Intent: {intent}, Query: '{focused_user_query}', Tools output items: {len(tools_output)}")
+        logger.debug("Chat stream intent=%s tools_output=%d", intent, len(tools_output))
 
         if intent == "greeting":
             # Simplest, most direct prompt for greeting to ensure a response
             system_prompt = "You are a friendly AI. User says hi. Respond with a short, friendly greeting."
             user_prompt_content = focused_user_query # This will be "hi"
         elif intent == "create_curriculum": 
-            print("[AGENT stream_chat_response] WARNING: 'create_curriculum' intent received in chat stream.")
+            logger.warning("'create_curriculum' intent received in chat stream")
             yield "To create a new curriculum, please use the 'Create New Curriculum' feature."
             return
         else: 
             system_prompt = "You are a helpful AI learning assistant. Provide a concise, conversational, and helpful plain text response based on the user's query and any provided research."
-            research_results_formatted = self._format_tool_results(tools_output)
+            research_results_formatted = truncate_to_tokens(
+                self._format_tool_results(tools_output), settings.chat_tool_output_budget_tokens
+            )
             if research_results_formatted.strip():
                 user_prompt_content = f"Based on the following information:\n{research_results_formatted}\n\nAddress the user's query: {focused_user_query}"
             else:
@@ -407,7 +498,7 @@ CRITICAL OUTPUT FORMATTING RULES:
             {"role": "user", "content": user_prompt_content}
         ]
 
-        api_url = "https://generativelanguage.googleapis.com/v1beta/openai/chat/completions"
+        api_url = f"{settings.gemini_base_url}/chat/completions"
         model_name = "gemini-2.5-pro"
         headers = {
             "Authorization": f"Bearer {self.gemini_api_key}", 
@@ -421,43 +512,50 @@ CRITICAL OUTPUT FORMATTING RULES:
             "stream": True, 
         }
 
-        print(f"[AGENT stream_chat_response] Calling Gemini API ({payload['model']}) for intent '{intent}' with stream=True")
-        print(f"[AGENT stream_chat_response] LLM Messages (simplified): {{system: '{system_prompt[:70]}...', user: '{user_prompt_content[:100]}...'}}")
+        logger.info("Streaming chat response", extra={"model": payload["model"], "intent": intent})
+        debug_lines = logger.isEnabledFor(logging.DEBUG)
         
         # Increased timeout for chat streaming as well, though less likely to be an issue here
         timeout = aiohttp.ClientTimeout(total=3000) # 5 minutes total timeout
+        llm_call = LLMCallMetrics("chat_stream", sum(len(m["content"]) for m in llm_messages_for_stream))
+        completion_chars = 0
         try:
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.post(api_url, headers=headers, json=payload) as response:
-                    print(f"[AGENT stream_chat_response] Gemini API stream status: {response.status}")
-                    if response.status == 200:
-                        async for line in response.content:
-                            if line:
-                                line_str = line.decode('utf-8').strip()
-                                print(f"[AGENT RAW STREAM LINE]: <{line_str}> ") # LOG RAW LINE
-                                if line_str.startswith("data: "):
-                                    line_str = line_str[len("data: "):]
-                                if line_str == "[DONE]":
-                                    print("[AGENT stream_chat_response] Stream finished [DONE].")
-                                    break
-                                try:
-                                    chunk_json = json.loads(line_str)
-                                    text_chunk = chunk_json.get("choices", [{}])[0].get("delta", {}).get("content", None)
-                                    if text_chunk is not None:
-                                        yield text_chunk
-                                    if chunk_json.get("choices", [{}])[0].get("finish_reason") is not None:
-                                        print(f"[AGENT stream_chat_response] Stream finished due to finish_reason: {chunk_json['choices'][0]['finish_reason']}")
-                                        break 
-                                except json.JSONDecodeError:
-                                    pass 
-                    else:
-                        error_text = await response.text()
-                        print(f"[AGENT stream_chat_response] Gemini API stream error ({response.status}): {error_text}")
-                        yield f"Sorry, I encountered an API error (Status {response.status}). Please try again."
+            session = get_http_session()
+            async with session.post(api_url, headers=headers, json=payload, timeout=timeout) as response:
+                if response.status == 200:
+                    async for line in response.content:
+                        if line:
+                            line_str = line.decode('utf-8').strip()
+                            if debug_lines and _stream_line_sampler.hit():
+                                logger.debug("Gemini stream line (sampled): %s", line_str[:500])
+                            if line_str.startswith("data: "):
+                                line_str = line_str[len("data: "):]
+                            if line_str == "[DONE]":
+                                break
+                            try:
+                                chunk_json = json.loads(line_str)
+                                text_chunk = chunk_json.get("choices", [{}])[0].get("delta", {}).get("content", None)
+                                if text_chunk is not None:
+                                    llm_call.first_token()
+                                    completion_chars += len(text_chunk)
+                                    yield text_chunk
+                                if chunk_json.get("choices", [{}])[0].get("finish_reason") is not None:
+                                    logger.debug("Chat stream finished: %s", chunk_json["choices"][0]["finish_reason"])
+                                    break 
+                            except json.JSONDecodeError:
+                                pass 
+                    llm_call.finish("ok", completion_chars)
+                else:
+                    llm_call.finish(f"http_{response.status}")
+                    error_text = await response.text()
+                    logger.error("Gemini chat stream error (%s): %s", response.status, error_text[:1000])
+                    yield f"Sorry, I encountered an API error (Status {response.status}). Please try again."
         except Exception as e:
-            print(f"[AGENT stream_chat_response] Exception: {str(e)}")
-            traceback.print_exc()
+            llm_call.failed(e)
+            logger.exception("Chat stream failed")
             yield "Sorry, an unexpected error occurred while trying to stream a response. Please try again."
+        finally:
+            llm_call.finish("cancelled")  # No-op unless the consumer stopped early
 
     def _format_tool_results(self, tools_output: List[Dict[str, Any]]) -> str:
         formatted = []
@@ -515,7 +613,18 @@ CRITICAL OUTPUT FORMATTING RULES:
                         continue
                     formatted.append(f"- [{paper.get('title', 'Unknown')}]({paper.get('url', '#')}) - {paper.get('summary', '')[:200]}...")
         return "\n".join(formatted)
-    
+
+    async def summarize_conversation(self, previous_summary: Optional[str], messages: List[Dict[str, Any]]) -> str:
+        """Fold older chat turns into a short running summary of the conversation."""
+        system_prompt = (
+            "You maintain a compact running summary of a tutoring conversation between a learner and an AI tutor. "
+            "Merge the new messages into the existing summary. Keep what matters for future answers: the learner's goals, "
+            "level, what they struggled with, decisions made and open questions. Write at most 200 words of plain prose."
+        )
+        transcript = "\n".join(f"{message['role']}: {message['content']}" for message in messages)
+        user_prompt = f"Existing summary:\n{previous_summary or '(none)'}\n\nNew messages:\n{transcript}"
+        return (await self._complete(system_prompt, user_prompt, max_tokens=1024, timeout_seconds=60, call="summary")).strip()
+
     async def generate_practice_problems(
         self,
         day_title: str,
@@ -525,6 +634,7 @@ CRITICAL OUTPUT FORMATTING RULES:
         num_problems: int = 3
     ) -> Dict[str, Any]:
         """Generate practice problems for a curriculum day"""
+        llm_call: Optional[LLMCallMetrics] = None
         try:
             prompt = f"""Based on the following curriculum day, generate {num_problems} practice problems.
 
@@ -569,7 +679,7 @@ Return the problems in this exact JSON format, wrapped in markdown code blocks:
 CRITICAL: Output ONLY the JSON inside markdown code blocks. Do NOT include any text before or after."""
 
             # Use Gemini API directly for practice problems
-            api_url = "https://generativelanguage.googleapis.com/v1beta/openai/chat/completions"
+            api_url = f"{settings.gemini_base_url}/chat/completions"
             model_name = "gemini-2.5-pro"
             headers = {
                 "Authorization": f"Bearer {self.gemini_api_key}",
@@ -588,39 +698,44 @@ CRITICAL: Output ONLY the JSON inside markdown code blocks. Do NOT include any t
             }
             
             timeout = aiohttp.ClientTimeout(total=60)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.post(api_url, headers=headers, json=payload) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        result = data.get("choices", [{}])[0].get("message", {}).get("content", "")
-                        
-                        # Extract JSON from markdown code block
-                        if "```json" in result:
-                            start_idx = result.find("```json") + 7
-                            end_idx = result.find("```", start_idx)
-                            if end_idx != -1:
-                                result = result[start_idx:end_idx].strip()
-                        else:
-                            # Clean up any markdown formatting
-                            result = result.replace("```json", "").replace("```", "").strip()
-                        
-                        result_json = json.loads(result)
-                        
-                        # Validate the structure
-                        if "problems" not in result_json or not isinstance(result_json["problems"], list):
-                            raise ValueError("Invalid response format: missing problems array")
-                            
-                        # Ensure we have the requested number of problems
-                        if len(result_json["problems"]) < num_problems:
-                            print(f"Generated fewer problems than requested: {len(result_json['problems'])} < {num_problems}")
-                            
-                        return result_json
+            llm_call = LLMCallMetrics("practice", sum(len(m["content"]) for m in payload["messages"]))
+            session = get_http_session()
+            async with session.post(api_url, headers=headers, json=payload, timeout=timeout) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    result = data.get("choices", [{}])[0].get("message", {}).get("content", "")
+                    llm_call.finish("ok", len(result or ""))
+                    
+                    # Extract JSON from markdown code block
+                    if "```json" in result:
+                        start_idx = result.find("```json") + 7
+                        end_idx = result.find("```", start_idx)
+                        if end_idx != -1:
+                            result = result[start_idx:end_idx].strip()
                     else:
-                        error_text = await response.text()
-                        raise Exception(f"API error {response.status}: {error_text}")
+                        # Clean up any markdown formatting
+                        result = result.replace("```json", "").replace("```", "").strip()
+                    
+                    result_json = json.loads(result)
+                    
+                    # Validate the structure
+                    if "problems" not in result_json or not isinstance(result_json["problems"], list):
+                        raise ValueError("Invalid response format: missing problems array")
                         
+                    # Ensure we have the requested number of problems
+                    if len(result_json["problems"]) < num_problems:
+                        logger.warning("Generated fewer problems than requested: %d < %d", len(result_json["problems"]), num_problems)
+                        
+                    return result_json
+                else:
+                    llm_call.finish(f"http_{response.status}")
+                    error_text = await response.text()
+                    raise Exception(f"API error {response.status}: {error_text}")
+                    
         except Exception as e:
-            print(f"Error generating practice problems: {str(e)}")
+            if llm_call is not None:
+                llm_call.failed(e)
+            logger.error("Error generating practice problems: %s", e)
             # Return a fallback problem set
             return {
                 "problems": [
@@ -636,6 +751,292 @@ CRITICAL: Output ONLY the JSON inside markdown code blocks. Do NOT include any t
                 ]
             }
 
+    # ------------------------------------------------------------------
+    # Two-stage curriculum generation
+    # ------------------------------------------------------------------
+
+    async def _complete(self, system_prompt: str, user_prompt: str, max_tokens: int, timeout_seconds: float, call: str = "complete") -> str:
+        """Single non-streaming Gemini completion. Raises on HTTP errors so callers can retry."""
+        api_url = f"{settings.gemini_base_url}/chat/completions"
+        headers = {
+            "Authorization": f"Bearer {self.gemini_api_key}",
+            "Content-Type": "application/json",
+        }
+        payload = {
+            "model": "gemini-2.5-pro",
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+            "temperature": 0.6,
+            "max_tokens": max_tokens,
+            "stream": False,
+        }
+        session = get_http_session()
+        timeout = aiohttp.ClientTimeout(total=timeout_seconds)
+        llm_call = LLMCallMetrics(call, len(system_prompt) + len(user_prompt))
+        try:
+            async with session.post(api_url, headers=headers, json=payload, timeout=timeout) as response:
+                if response.status != 200:
+                    llm_call.finish(f"http_{response.status}")
+                    error_text = await response.text()
+                    raise RuntimeError(f"Gemini API error {response.status}: {error_text[:300]}")
+                data = await response.json()
+        except Exception as e:
+            llm_call.failed(e)
+            raise
+        text = data.get("choices", [{}])[0].get("message", {}).get("content", "") or ""
+        llm_call.finish("ok", len(text))
+        return text
+
+    async def _stream_completion(
+        self, system_prompt: str, user_prompt: str, max_tokens: int, timeout_seconds: float, call: str = "stream"
+    ) -> AsyncIterator[str]:
+        """Streamed Gemini completion yielding text deltas. Raises on HTTP errors."""
+        api_url = f"{settings.gemini_base_url}/chat/completions"
+        headers = {
+            "Authorization": f"Bearer {self.gemini_api_key}",
+            "Content-Type": "application/json",
+        }
+        payload = {
+            "model": "gemini-2.5-pro",
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+            "temperature": 0.6,
+            "max_tokens": max_tokens,
+            "stream": True,
+        }
+        session = get_http_session()
+        timeout = aiohttp.ClientTimeout(total=timeout_seconds)
+        llm_call = LLMCallMetrics(call, len(system_prompt) + len(user_prompt))
+        completion_chars = 0
+        try:
+            async with session.post(api_url, headers=headers, json=payload, timeout=timeout) as response:
+                if response.status != 200:
+                    llm_call.finish(f"http_{response.status}")
+                    error_text = await response.text()
+                    raise RuntimeError(f"Gemini API error {response.status}: {error_text[:300]}")
+                async for line in response.content:
+                    line_str = line.decode("utf-8").strip()
+                    if not line_str.startswith("data: "):
+                        continue
+                    line_str = line_str[len("data: "):]
+                    if line_str == "[DONE]":
+                        break
+                    try:
+                        chunk_json = json.loads(line_str)
+                    except json.JSONDecodeError:
+                        continue
+                    choice = chunk_json.get("choices", [{}])[0]
+                    text_chunk = choice.get("delta", {}).get("content")
+                    if text_chunk:
+                        llm_call.first_token()
+                        completion_chars += len(text_chunk)
+                        yield text_chunk
+                    if choice.get("finish_reason") is not None:
+                        break
+            llm_call.finish("ok", completion_chars)
+        except Exception as e:
+            llm_call.failed(e)
+            raise
+        finally:
+            llm_call.finish("cancelled")  # No-op unless the consumer stopped early
+
+    async def _generate_outline(self, spec: str, research: str, num_days: int, transcript: List[str]) -> Dict[str, Any]:
+        system_prompt = f"""You are an expert curriculum designer. Plan a {num_days}-day learning curriculum as an OUTLINE only - no lesson content yet.
+
+Output ONLY a JSON object wrapped in a ```json code block, with EXACTLY this schema:
+{{
+  "curriculum_title": "string, max 100 characters",
+  "curriculum_description": "string, max 500 characters",
+  "days": [
+    {{
+      "day_number": integer (sequential, starting at 1),
+      "title": "string, max 80 characters",
+      "objectives": ["3-4 specific, actionable learning objectives"],
+      "is_project_day": boolean,
+      "project_title": "string - ONLY when is_project_day is true"
+    }}
+  ]
+}}
+
+"days" must contain exactly {num_days} entries. Build topics progressively so each day depends only on earlier days."""
+        user_prompt = f"User Preferences and Structure for CURRICULUM (MUST FOLLOW EXACTLY): {spec}\nSupporting Research: {research}"
+
+        async for attempt in AsyncRetrying(
+            stop=stop_after_attempt(settings.curriculum_chunk_attempts),
+            wait=wait_exponential(min=2, max=20),
+            reraise=True,
+        ):
+            with attempt:
+                text = await self._complete(system_prompt, user_prompt, max_tokens=16_000, timeout_seconds=settings.curriculum_outline_timeout_seconds, call="outline")
+                transcript.append(f"[outline attempt {attempt.retry_state.attempt_number}]\n{text}")
+                return parse_outline(text, num_days)
+
+    async def _generate_day_chunk(
+        self,
+        spec: str,
+        research: str,
+        outline: Dict[str, Any],
+        chunk: List[Dict[str, Any]],
+        youtube_mapping: Dict[str, str],
+        transcript: List[str],
+        on_day: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Stream one chunk of days, validating and handing off each day as soon as it closes.
+
+        A retry only asks for the days that have not been produced yet.
+        """
+        outline_summary = "\n".join(f"Day {day['day_number']}: {day['title']}" for day in outline["days"])
+        remaining = {day["day_number"]: day for day in chunk}
+        produced: List[Dict[str, Any]] = []
+
+        system_prompt = """You are an expert curriculum designer writing the full lesson content for specific days of an already-planned curriculum.
+
+CRITICAL OUTPUT FORMATTING RULES:
+1. Output ONLY a JSON object wrapped in a ```json code block, no text before or after it
+2. The object has a single field "days": an array with exactly the requested days, in order
+
+Each day object MUST follow this schema:
+{
+  "day_number": integer (as given in the outline),
+  "title": "string (as given in the outline, max 80 characters)",
+  "is_project_day": boolean (as given in the outline),
+  "project_data": {
+    "title": "string",
+    "description": "string",
+    "objectives": ["string"],
+    "requirements": ["string"],
+    "deliverables": ["string"],
+    "evaluation_criteria": ["string"]
+  } // ONLY include if is_project_day is true, otherwise omit entirely
+  "content": {
+    "type": "doc",
+    "content": [TipTap/ProseMirror nodes array]
+  },
+  "resources": [{"title": "string", "url": "string"}],
+  "estimated_hours": number // optional, positive
+}"""
+        async for attempt in AsyncRetrying(
+            stop=stop_after_attempt(settings.curriculum_chunk_attempts),
+            wait=wait_exponential(min=2, max=30),
+            reraise=True,
+        ):
+            with attempt:
+                if not remaining:
+                    break
+                todo = [remaining[number] for number in sorted(remaining)]
+                first, last = todo[0]["day_number"], todo[-1]["day_number"]
+                user_prompt = (
+                    f"User Preferences and Structure for CURRICULUM (MUST FOLLOW EXACTLY): {spec}\n\n"
+                    f"Curriculum: {outline['curriculum_title']} - {outline['curriculum_description']}\n"
+                    f"Full outline (for continuity; do NOT write these other days):\n{outline_summary}\n\n"
+                    f"Write the complete content for ONLY these days ({first}-{last}), following their outline entries:\n{json.dumps(todo, indent=2)}\n\n"
+                    f"Supporting Research (USE THIS TO FILL IN DETAILS): {research}"
+                )
+                parser = JSONArrayStreamParser("days")
+                raw_parts: List[str] = []
+                try:
+                    async for delta in self._stream_completion(system_prompt, user_prompt, max_tokens=65_536, timeout_seconds=settings.curriculum_chunk_timeout_seconds, call="day_chunk"):
+                        raw_parts.append(delta)
+                        for day in parser.feed(delta):
+                            if day.get("day_number") not in remaining:
+                                continue
+                            try:
+                                day = validate_day(self._replace_identifiers(day, youtube_mapping))
+                            except ValueError as e:
+                                logger.warning("Discarding invalid day: %s", e)
+                                continue
+                            # Only a day that reached on_day counts as produced, so a
+                            # failed hand-off is requested again on the next attempt
+                            if on_day:
+                                await on_day(day)
+                            del remaining[day["day_number"]]
+                            produced.append(day)
+                finally:
+                    transcript.append(f"[days {first}-{last} attempt {attempt.retry_state.attempt_number}]\n{''.join(raw_parts)}")
+                if remaining:
+                    raise ValueError(f"Missing or invalid days: {sorted(remaining)}")
+
+        return sorted(produced, key=lambda day: day["day_number"])
+
+    @staticmethod
+    def _replace_identifiers(day: Dict[str, Any], youtube_mapping: Dict[str, str]) -> Dict[str, Any]:
+        """Swap [YTn] placeholders for the real video URLs."""
+        if not youtube_mapping:
+            return day
+        day_json = json.dumps(day)
+        for identifier, url in youtube_mapping.items():
+            day_json = day_json.replace(identifier, url)
+        return json.loads(day_json)
+
+    async def generate_curriculum(
+        self,
+        messages: List[Dict[str, Any]],
+        context: Dict[str, Any],
+        num_days: int,
+        transcript: List[str],
+        on_outline: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
+        on_day: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
+        outline: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Generate a full curriculum in two stages.
+
+        Research runs once, then a short outline call fixes titles and
+        objectives for every day, and the day bodies are generated in chunks of
+        ``settings.curriculum_chunk_days`` with at most
+        ``settings.curriculum_generation_concurrency`` calls in flight. Chunks
+        are streamed: ``on_day`` is awaited for every validated day as soon as
+        it is complete, in whatever order days finish. Each outline/chunk is
+        validated and retried on its own. Raw model output is appended to
+        ``transcript``. Passing ``outline`` (e.g. from a curriculum template)
+        skips the outline call. Returns data in the same shape as
+        ``clean_and_validate_json``; raises if any stage exhausts its retries.
+        """
+        state = AgentState(messages=messages, context=dict(context or {}), tools_needed=[], tools_output=[], final_response=None)
+        with GENERATION_STAGE_SECONDS.time(stage="research"):
+            state = await self._analyze_context(state)
+            state["context"]["intent"] = "create_curriculum"
+            state = await self._plan_tools(state)
+            state = await self._execute_tools(state)
+        spec = state["context"].get("user_query", "")
+        research = self._format_tool_results(state["tools_output"])
+        # Snapshot the [YTn] mapping now; concurrent runs share self.youtube_url_mapping
+        youtube_mapping = dict(self.youtube_url_mapping)
+
+        if outline is None:
+            with GENERATION_STAGE_SECONDS.time(stage="outline"):
+                outline = await self._generate_outline(spec, research, num_days, transcript)
+        if on_outline:
+            await on_outline(outline)
+
+        size = max(1, settings.curriculum_chunk_days)
+        chunks = [outline["days"][i:i + size] for i in range(0, num_days, size)]
+        semaphore = asyncio.Semaphore(max(1, settings.curriculum_generation_concurrency))
+
+        async def run_chunk(chunk: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+            async with semaphore:
+                with GENERATION_STAGE_SECONDS.time(stage="day_chunk"):
+                    return await self._generate_day_chunk(spec, research, outline, chunk, youtube_mapping, transcript, on_day)
+
+        tasks = [asyncio.create_task(run_chunk(chunk)) for chunk in chunks]
+        try:
+            chunk_results = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        days = [day for chunk_days in chunk_results for day in chunk_days]
+        return {
+            "curriculum_title": outline["curriculum_title"],
+            "curriculum_description": outline["curriculum_description"],
+            "days": days,
+        }
+
     def replace_youtube_identifiers(self, curriculum_json: str) -> str:
         """Replace YouTube identifiers like [YT1] with actual URLs in the curriculum JSON."""
         result = curriculum_json
@@ -651,6 +1052,7 @@ CRITICAL: Output ONLY the JSON inside markdown code blocks. Do NOT include any t
             "tools_output": [],
             "final_response": None
         }
+        await self.warm_up()
         final_state = await self.graph.ainvoke(initial_state)
         response = final_state.get("final_response", "I apologize, but I encountered an error generating a response.")
         
@@ -1,6 +1,6 @@
 from typing import Any, Dict, Optional
 
-from app.db.supabase_client import supabase
+from app.db.supabase_client import run_auth, supabase
 from fastapi import APIRouter, HTTPException, status
 from pydantic import BaseModel, EmailStr
 
@@ -29,7 +29,7 @@ async def sign_up(request: SignUpRequest):
     """Create a new user account."""
     try:
         # Create user in Supabase
-        response = supabase.auth.sign_up({
+        response = await run_auth(supabase.auth.sign_up, {
             "email": request.email,
             "password": request.password,
             "options": {
@@ -66,7 +66,7 @@ async def sign_in(request: SignInRequest):
     """Sign in with email and password."""
     try:
         # Sign in with Supabase
-        response = supabase.auth.sign_in_with_password({
+        response = await run_auth(supabase.auth.sign_in_with_password, {
             "email": request.email,
             "password": request.password
         })
@@ -97,7 +97,7 @@ async def sign_in(request: SignInRequest):
 async def refresh_token(refresh_token: str):
     """Refresh the access token."""
     try:
-        response = supabase.auth.refresh_session(refresh_token)
+        response = await run_auth(supabase.auth.refresh_session, refresh_token)
         if response.session:
             return {
                 "access_token": response.session.access_token,
@@ -119,7 +119,7 @@ async def refresh_token(refresh_token: str):
 async def sign_out():
     """Sign out the current user."""
     try:
-        supabase.auth.sign_out()
+        await run_auth(supabase.auth.sign_out)
         return {"message": "Successfully signed out"}
     except Exception as e:
         raise HTTPException(
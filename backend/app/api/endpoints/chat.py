@@ -1,44 +1,33 @@
 """Chat endpoints."""
 
-import json
+import asyncio
+import logging
 from typing import Any, AsyncIterator, Dict, List, Optional
 from uuid import uuid4
 
+from app.agents.chat_executor import get_chat_executor
 from app.agents.curriculum_agent import curriculum_agent as agent
+from app.api.dependencies import require_subscription
 from app.core.auth import get_current_user
 from app.core.config import settings  # To get GEMINI_API_KEY
-from app.db.supabase_client import get_supabase
+from app.core.etag import (compute_etag, conditional_json, etag_matches,
+                           not_modified)
+from app.core.log import Sampler, get_logger
+from app.core.serialization import dumps
+from app.db.supabase_client import get_supabase, run_query
 from app.models.user import AuthenticatedUser
-from fastapi import APIRouter, Depends, HTTPException
+from app.services.chat_context import build_chat_context
+from app.services.chat_history import (append_turn, get_history, get_summary,
+                                       history_watermark, summarize_if_needed)
+from app.services.lesson_text import get_lesson_text, section_texts
+from fastapi import (APIRouter, BackgroundTasks, Depends, HTTPException, Query,
+                     Request)
 from fastapi.responses import StreamingResponse
-from langchain.chains import LLMChain
-from langchain.memory import ConversationBufferWindowMemory
-from langchain.prompts import (ChatPromptTemplate, HumanMessagePromptTemplate,
-                               MessagesPlaceholder,
-                               SystemMessagePromptTemplate)
-from langchain_core.messages import AIMessage  # Updated import path
-from langchain_core.messages import HumanMessage
-from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnablePassthrough  # For passing memory
-# LangChain imports
-from langchain_google_genai import ChatGoogleGenerativeAI
 from pydantic import BaseModel
-from sqlalchemy import select, update
-from langchain.agents import AgentExecutor, create_tool_calling_agent
-from app.tools.our_langchain_tools import (
-    exa_search_lc_tool,
-    perplexity_search_lc_tool,
-    firecrawl_scrape_url_lc_tool
-)
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder, SystemMessagePromptTemplate, HumanMessagePromptTemplate
-from langchain_core.messages import AIMessage, HumanMessage, ToolMessage # Ensure ToolMessage is imported
-from langchain.memory import ConversationBufferWindowMemory # Already there
-from langchain_google_genai import ChatGoogleGenerativeAI # Already there
-from app.core.config import settings # Already there
-import asyncio # Already there
-from app.api.dependencies import require_subscription
 
 router = APIRouter()
+logger = get_logger(__name__)
+_stream_chunk_sampler = Sampler()
 
 # Initialize the curriculum agent
 # agent = CurriculumAgent()
@@ -68,6 +57,8 @@ class AppendChatTurnRequest(BaseModel):
 
 class ChatHistoryResponse(BaseModel):
     messages: List[ChatMessage]
+    next_cursor: Optional[int] = None  # pass as ?before= to load older messages
+    summary: Optional[str] = None  # running summary of turns older than the loaded ones
 
 
 # New request model for LangChain stream if different from ChatRequest
@@ -85,6 +76,7 @@ class LangChainChatRequest(BaseModel):
 @router.post("/")
 async def chat(
     request: ChatRequest,
+    background_tasks: BackgroundTasks,
     current_user: AuthenticatedUser = Depends(require_subscription),
     supabase=Depends(get_supabase)
 ) -> ChatResponse:
@@ -97,16 +89,16 @@ async def chat(
     context: Dict[str, Any] = {}
     context["user_preferences"] = {} # Initialize with default
     if request.curriculum_id:
-        curriculum_response = supabase.table("curricula").select("*").eq("id", request.curriculum_id).eq("user_id", current_user.id).maybe_single().execute()
+        curriculum_response = await run_query(supabase.table("curricula").select("*").eq("id", request.curriculum_id).eq("user_id", current_user.id).maybe_single())
         if curriculum_response and curriculum_response.data: # Check if curriculum_response itself is not None
             context["curriculum"] = curriculum_response.data
             
     # Fetch user profile more safely
-    profile_response = supabase.table("profiles").select("*").eq("id", current_user.id).maybe_single().execute()
+    profile_response = await run_query(supabase.table("profiles").select("*").eq("id", current_user.id).maybe_single())
     if profile_response and profile_response.data: # Check if profile_response itself is not None
         context["user_preferences"] = profile_response.data
     else:
-        print(f"[CHAT DEBUG] No profile found for user {current_user.id}. Proceeding with default/empty preferences.")
+        logger.debug("No profile found for user %s, using default preferences", current_user.id)
     
     # Convert messages to the format expected by the agent
     messages_for_agent = [{"role": msg.role, "content": msg.content} for msg in request.messages]
@@ -114,29 +106,29 @@ async def chat(
     # Process with the agent
     agent_response_content = await agent.run(messages=messages_for_agent, context=context)
     
-    # Store chat session
+    # Store the new turn (the latest user message and the reply)
     try:
-        supabase.table("chat_sessions").upsert({
-            "id": session_id,
-            "user_id": current_user.id,
-            "curriculum_id": request.curriculum_id,
-            "messages": messages_for_agent + [{"role": "assistant", "content": agent_response_content}],
-            "updated_at": "now()"
-        }).execute()
-    except Exception as e_upsert:
-        print(f"[CHAT DEBUG] Error upserting chat session: {str(e_upsert)}")
+        result = await append_turn(
+            current_user.id,
+            request.curriculum_id,
+            messages_for_agent[-1:] + [{"role": "assistant", "content": agent_response_content}],
+            session_id=session_id,
+        )
+        background_tasks.add_task(summarize_if_needed, result["session_id"], result["unsummarized"])
+    except Exception as e_append:
+        logger.error("Error appending chat turn: %s", e_append)
         # Decide if this error should be fatal to the chat response or just logged
     
     return ChatResponse(message=agent_response_content, session_id=session_id)
 
 
-async def format_llm_stream_for_sdk(agent_stream: AsyncIterator[str]) -> AsyncIterator[str]:
+async def format_llm_stream_for_sdk(agent_stream: AsyncIterator[str]) -> AsyncIterator[bytes]:
     """Generate streaming response for Vercel AI SDK."""
     async for text_chunk in agent_stream:
         # Vercel AI SDK text stream format: 0:"chunk of text"\n
-        # Ensure the chunk is a string and properly escaped for JSON string conten
-        # json.dumps will handle escaping quotes and special characters within the text_chunk itself.
-        yield f"0:{json.dumps(text_chunk)}\n"
+        # dumps escapes quotes and special characters and returns bytes, so
+        # chunks go to the socket without another encode
+        yield b"0:" + dumps(text_chunk) + b"\n"
 
 
 @router.post("/stream")
@@ -151,33 +143,33 @@ async def chat_stream(
     context: Dict[str, Any] = {}
     context["user_preferences"] = {} # Initialize with default
     if request.curriculum_id:
-        curriculum_response = supabase.table("curricula").select("*").eq("id", request.curriculum_id).eq("user_id", current_user.id).maybe_single().execute()
+        curriculum_response = await run_query(supabase.table("curricula").select("*").eq("id", request.curriculum_id).eq("user_id", current_user.id).maybe_single())
         if curriculum_response and curriculum_response.data: # Check if curriculum_response itself is not None
             context["curriculum"] = curriculum_response.data
             
     # Fetch user profile more safely
-    profile_response = supabase.table("profiles").select("*").eq("id", current_user.id).maybe_single().execute()
+    profile_response = await run_query(supabase.table("profiles").select("*").eq("id", current_user.id).maybe_single())
     if profile_response and profile_response.data: # Check if profile_response itself is not None
         context["user_preferences"] = profile_response.data
     else:
-        print(f"[CHAT STREAM DEBUG] No profile found for user {current_user.id}. Proceeding with default/empty preferences.")
+        logger.debug("No profile found for user %s, using default preferences", current_user.id)
     
     # Convert messages to the format expected by the agent
     messages_for_agent = [{"role": msg.role, "content": msg.content} for msg in request.messages]
     
     # 1. Analyze context, plan, and execute tools (if any) - this is a non-streaming part
     try:
-        print(f"[CHAT STREAM DEBUG] Calling agent.analyze_and_plan_for_chat for user: {current_user.id}")
+        logger.debug("Planning chat response for user %s", current_user.id)
         analysis_result = await agent.analyze_and_plan_for_chat(
             current_chat_messages=messages_for_agent, 
             base_context=context
         )
-        print(f"[CHAT STREAM DEBUG] Analysis result: intent='{analysis_result['intent']}', tools_output_items={len(analysis_result['tools_output'])}")
+        logger.debug("Chat analysis intent=%s tools_output=%d", analysis_result["intent"], len(analysis_result["tools_output"]))
     except Exception as e_analysis:
-        print(f"[CHAT STREAM DEBUG] Error during agent analysis/planning: {str(e_analysis)}")
+        logger.error("Error during chat analysis/planning: %s", e_analysis)
         # Fallback to a simple error message stream if analysis fails
         async def error_stream():
-            yield f"0:{json.dumps('Sorry, I had trouble understanding that. Please try again.')}\n"
+            yield b"0:" + dumps("Sorry, I had trouble understanding that. Please try again.") + b"\n"
         return StreamingResponse(error_stream(), media_type="text/event-stream")
 
     # 2. Get the actual LLM stream using the prepared context
@@ -216,7 +208,7 @@ async def get_chat_sessions(
         if curriculum_id:
             query = query.eq('curriculum_id', curriculum_id)
             
-        response = query.order('created_at', desc=True).execute()
+        response = await run_query(query.order('created_at', desc=True))
         
         return {"sessions": response.data}
         
@@ -227,116 +219,61 @@ async def get_chat_sessions(
 @router.post("/append_turn")
 async def append_chat_turn(
     request: AppendChatTurnRequest,
+    background_tasks: BackgroundTasks,
     current_user: AuthenticatedUser = Depends(require_subscription),
-    supabase=Depends(get_supabase)
 ):
     """Appends a user message and an assistant message to a chat session."""
     user_id = current_user.id
     if not user_id:
         raise HTTPException(status_code=403, detail="User ID not found in token")
 
-    session_query = supabase.table("chat_sessions").select("*").eq("user_id", user_id)
-    if request.curriculum_id:
-        session_query = session_query.eq("curriculum_id", request.curriculum_id)
-    else:
-        # Handle sessions not tied to a specific curriculum, e.g., by checking for curriculum_id IS NULL
-        # For now, if curriculum_id is None in request, we assume it means we are looking for a session
-        # where curriculum_id is also NULL in the database.
-        session_query = session_query.is_("curriculum_id", None) 
-
-    existing_session_response = session_query.maybe_single().execute()
-
-    new_messages_to_append = [
-        request.user_message.model_dump(),
-        request.assistant_message.model_dump()
-    ]
-
-    if existing_session_response and existing_session_response.data:
-        session_id = existing_session_response.data["id"]
-        current_messages = existing_session_response.data.get("messages", [])
-        if not isinstance(current_messages, list): # Ensure current_messages is a list
-            current_messages = []
-        
-        updated_messages = current_messages + new_messages_to_append
-        
-        try:
-            update_response = supabase.table("chat_sessions").update({
-                "messages": updated_messages,
-                "updated_at": "now()",
-                "user_id": str(user_id)
-            }).eq("id", session_id).execute()
-            if not update_response.data: # Or check for errors if client lib provides
-                print(f"[CHAT APPEND DEBUG] Failed to update chat session {session_id}. Response: {update_response}")
-                raise HTTPException(status_code=500, detail="Failed to update chat session messages.")
-            print(f"[CHAT APPEND DEBUG] Appended to session {session_id}")
-            return {"session_id": session_id, "status": "appended"}
-        except Exception as e_update:
-            print(f"[CHAT APPEND DEBUG] Error updating chat session {session_id}: {str(e_update)}")
-            raise HTTPException(status_code=500, detail=f"Error updating chat session: {str(e_update)}")
-    else:
-        # Create new session
-        session_id = str(uuid4())
-        try:
-            insert_response = supabase.table("chat_sessions").insert({
-                "id": session_id,
-                "user_id": str(user_id),
-                "curriculum_id": request.curriculum_id, # This will be None if not provided in request
-                "messages": new_messages_to_append,
-                # created_at and updated_at should have defaults in DB or be set to now()
-            }).execute() # Assuming DB defaults for created_at, updated_at or set them explicitly
-            
-            if not insert_response.data: # Or check for errors
-                print(f"[CHAT APPEND DEBUG] Failed to create new chat session. Response: {insert_response}")
-                raise HTTPException(status_code=500, detail="Failed to create new chat session.")
-            print(f"[CHAT APPEND DEBUG] Created new session {session_id}")
-            return {"session_id": session_id, "status": "created"}
-        except Exception as e_insert:
-            print(f"[CHAT APPEND DEBUG] Error creating new chat session: {str(e_insert)}")
-            raise HTTPException(status_code=500, detail=f"Error creating new chat session: {str(e_insert)}")
+    try:
+        result = await append_turn(
+            user_id,
+            request.curriculum_id,
+            [request.user_message.model_dump(), request.assistant_message.model_dump()],
+        )
+    except Exception as e_append:
+        logger.error("Error appending chat turn: %s", e_append)
+        raise HTTPException(status_code=500, detail=f"Error appending chat turn: {str(e_append)}")
+
+    background_tasks.add_task(summarize_if_needed, result["session_id"], result["unsummarized"])
+    return {"session_id": result["session_id"], "status": "created" if result["created"] else "appended"}
 
 
 @router.get("/history/{curriculum_id}", response_model=ChatHistoryResponse)
 async def get_chat_history_for_curriculum(
     curriculum_id: str, # Assuming curriculum_id will always be provided for specific history
+    request: Request,
+    before: Optional[int] = Query(None, description="next_cursor from the previous page"),
+    limit: Optional[int] = Query(None, ge=1, le=200, description="page size; omit for the full history"),
     current_user: AuthenticatedUser = Depends(require_subscription),
-    supabase=Depends(get_supabase)
 ):
-    """Gets the chat message history for a given curriculum and the current user."""
+    """Gets the chat messages for a curriculum, oldest first.
+
+    Without ``limit`` or ``before`` the whole conversation is returned. With
+    them, only the newest ``limit`` messages (default 50 when only ``before``
+    is given) before the cursor; older ones are fetched by passing
+    ``next_cursor`` back as ``before``.
+    """
     user_id = current_user.id
     if not user_id:
         raise HTTPException(status_code=403, detail="User ID not found in token")
-
-    if not curriculum_id: # Should not happen if path param is mandatory
-        raise HTTPException(status_code=400, detail="Curriculum ID is required.")
-
-    session_response = (
-        supabase.table("chat_sessions")
-        .select("messages")
-        .eq("user_id", user_id)
-        .eq("curriculum_id", curriculum_id)
-        .maybe_single() # Assuming one session per user/curriculum for simplicity
-        .execute()
-    )
-
-    if session_response and session_response.data and session_response.data.get("messages"):
-        messages_data = session_response.data["messages"]
-        # Ensure messages_data is a list before trying to instantiate ChatMessage
-        if not isinstance(messages_data, list):
-            messages_data = [] # Default to empty list if it's not a list (e.g. null from DB)
-            
-        # Validate that each item in messages_data can be parsed into ChatMessage
-        # This is implicitly handled by Pydantic during response_model validation if types match
-        # For direct construction:
-        # valid_messages = []
-        # for msg_data in messages_data:
-        #     try:
-        #         valid_messages.append(ChatMessage(**msg_data))
-        #     except ValidationError:
-        #         print(f"Skipping invalid message data: {msg_data}")
-        # return ChatHistoryResponse(messages=valid_messages)
-        return ChatHistoryResponse(messages=[ChatMessage(**msg) for msg in messages_data if isinstance(msg, dict)])
-    
-    return ChatHistoryResponse(messages=[]) # Return empty list if no session or no messages 
+    if before is not None and limit is None:
+        limit = 50
+
+    # Revalidation checks the session's watermark before loading any messages
+    if request.headers.get("if-none-match"):
+        etag = compute_etag(await history_watermark(user_id, curriculum_id), before, limit)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
+    page = await get_history(user_id, curriculum_id, before=before, limit=limit)
+    return conditional_json(request, ChatHistoryResponse(
+        messages=[ChatMessage(**msg) for msg in page["messages"]],
+        next_cursor=page["next_cursor"],
+        summary=page["summary"],
+    ), etag=compute_etag(page["watermark"], before, limit))
 
 async def vercel_ai_sdk_hello_stream_generator_data():
     import asyncio
@@ -364,70 +301,37 @@ async def langchain_chat_stream_generator(
     context_data: Dict[str, Any]
 ):
     if not settings.gemini_api_key:
-        print("ERROR: GEMINI_API_KEY not set for LangChain agent!")
-        yield f'0:{json.dumps("AI service not configured.")}\n'
-        yield f'd:{json.dumps({"finishReason": "error"})}\n'
+        logger.error("GEMINI_API_KEY not set for LangChain agent")
+        yield b"0:" + dumps("AI service not configured.") + b"\n"
+        yield b"d:" + dumps({"finishReason": "error"}) + b"\n"
         return
 
-    # 1. Initialize LLM
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-2.5-pro", # Ensure this is your desired Gemini model for tool calling
-        google_api_key=settings.gemini_api_key,
-        model_kwargs={"generation_config": {"max_output_tokens": 500000, "temperature": 0.7}},
-        # The `tools` themselves will be bound via the agent creation process typically,
-        # or directly if not using a standard agent creator, but create_tool_calling_agent handles it.
-    )
+    # --- Context Augmentation ---
+    async def fetch_lesson_content():
+        if not (curriculum_id and context_data.get("current_day_number") is not None):
+            return None
+        # Pre-flattened at write time and cached per worker (see app.services.lesson_text)
+        return await get_lesson_text(curriculum_id, day_number=context_data.get("current_day_number"))
 
-    # 2. Define Tools
-    tools = [exa_search_lc_tool, perplexity_search_lc_tool, firecrawl_scrape_url_lc_tool]
+    async def fetch_summary():
+        return await get_summary(user_id, curriculum_id) if curriculum_id else None
 
-    # 3. Construct Agent Prompt
-    # System prompt now also subtly hints at tool capabilities by mentioning external info
-    # The specific tool instructions are usually best left to the agent framework
-    # based on the tool descriptions provided when defining the tools.
-    
-    # Helper to escape braces for prompt templates
-    def _escape_braces(text: str) -> str:
-        return text.replace('{', '{{').replace('}', '}}')
-    
-    # --- Context Augmentation (as before) ---
-    lesson_content_for_prompt = ""
-    if curriculum_id and context_data.get("current_day_number") is not None:
-        try:
-            print(f"[LC AGENT CONTEXT] Fetching lesson content for curriculum {curriculum_id}, day {context_data.get('current_day_number')}")
-            day_response = (
-                supabase_client.table("curriculum_days")
-                .select("content, title")
-                .eq("curriculum_id", curriculum_id)
-                .eq("day_number", context_data.get("current_day_number"))
-                .maybe_single()
-                .execute()
-            )
-            if day_response.data:
-                raw_lesson_content = day_response.data.get("content")
-                if raw_lesson_content:
-                    if isinstance(raw_lesson_content, dict) and raw_lesson_content.get('type') == 'doc' and isinstance(raw_lesson_content.get('content'), list):
-                        texts_for_lesson = [] 
-                        def extract_text_from_tiptap_nodes(nodes_list_recursive):
-                            for node_item in nodes_list_recursive:
-                                if node_item.get('type') == 'text' and 'text' in node_item:
-                                    texts_for_lesson.append(node_item['text'])
-                                if isinstance(node_item.get('content'), list):
-                                    extract_text_from_tiptap_nodes(node_item['content'])
-                        extract_text_from_tiptap_nodes(raw_lesson_content['content'])
-                        lesson_content_for_prompt = " ".join(texts_for_lesson).strip()
-                        if not lesson_content_for_prompt: 
-                            lesson_content_for_prompt = json.dumps(raw_lesson_content) 
-                    elif isinstance(raw_lesson_content, str):
-                        lesson_content_for_prompt = raw_lesson_content
-                    else: 
-                        lesson_content_for_prompt = json.dumps(raw_lesson_content)
-                    max_lesson_chars = 100000 
-                    if len(lesson_content_for_prompt) > max_lesson_chars:
-                        lesson_content_for_prompt = lesson_content_for_prompt[:max_lesson_chars] + "... (truncated)"
-            # ... (logging for context fetching) ...
-        except Exception as e_context_agent:
-            print(f"[LC AGENT CONTEXT] Error fetching/processing lesson: {str(e_context_agent)}")
+    lesson, conversation_summary = await asyncio.gather(
+        fetch_lesson_content(), fetch_summary(), return_exceptions=True
+    )
+    if isinstance(lesson, Exception):
+        logger.warning("Error fetching lesson text: %s", lesson)
+        lesson = None
+    if isinstance(conversation_summary, Exception):
+        logger.warning("Error fetching conversation summary: %s", conversation_summary)
+        conversation_summary = None
+
+    # Fit lesson sections, recent turns and the summary of older turns into the token budget
+    chat_context = build_chat_context(
+        current_user_input, section_texts(lesson) if lesson else [], full_messages_history_for_llm, conversation_summary
+    )
+    lesson_content_for_prompt = chat_context["lesson_text"]
+    logger.debug("Prompt token estimate %d, dropped %d old message(s)", chat_context["tokens"], chat_context["dropped_messages"])
     # --- END CONTEXT AUGMENTATION ---
 
     system_prompt_text = (
@@ -439,12 +343,12 @@ async def langchain_chat_stream_generator(
         "Always strive to provide comprehensive and accurate information."
     )
     if context_data.get("curriculum_title"):
-        system_prompt_text += f"\nThe user is currently working on the curriculum: '{_escape_braces(str(context_data["curriculum_title"]))}'."
+        system_prompt_text += f"\nThe user is currently working on the curriculum: '{str(context_data["curriculum_title"])}'."
     if context_data.get("current_day_number") and context_data.get("current_day_title"):
-        system_prompt_text += f" Specifically, they are on Day {context_data["current_day_number"]}: '{_escape_braces(str(context_data["current_day_title"]))}'."
+        system_prompt_text += f" Specifically, they are on Day {context_data["current_day_number"]}: '{str(context_data["current_day_title"])}'."
     
     if lesson_content_for_prompt and lesson_content_for_prompt.strip() and lesson_content_for_prompt != "null":
-        system_prompt_text += f"\n\nHere is the content for today's lesson:\n---BEGIN LESSON CONTENT---\n{_escape_braces(lesson_content_for_prompt)}\n---END LESSON CONTENT---"
+        system_prompt_text += f"\n\nHere is the content for today's lesson:\n---BEGIN LESSON CONTENT---\n{lesson_content_for_prompt}\n---END LESSON CONTENT---"
     else:
         system_prompt_text += ("\nIt seems there is no specific lesson content loaded for today, or the content is empty. "
                                "Try to be helpful with general knowledge based on the curriculum and day title, or use your tools to find relevant information if appropriate, or ask the user for more details.")
@@ -452,21 +356,14 @@ async def langchain_chat_stream_generator(
     if context_data.get("learning_goal"):
         system_prompt_text += f"\n\nThe overall learning goal for this curriculum is: '{context_data["learning_goal"]}'."
 
-    # Prompt for tool calling agent
-    # Based on LangChain examples, often uses `நாரદ` (Narad) or similar character for placeholders if not directly supported by MessagesPlaceholder for agent_scratchpad.
-    # For Gemini with create_tool_calling_agent, the prompt structure is simpler usually.
-    # The create_tool_calling_agent typically infers how to format tool calls and responses for the LLM.
-    # Let's use a standard prompt structure that works well with tool calling agents.
-    agent_prompt = ChatPromptTemplate.from_messages([
-        ("system", system_prompt_text),  # Use tuple format for pre-formatted system message
-        MessagesPlaceholder(variable_name="chat_history"),
-        HumanMessagePromptTemplate.from_template("{input}"),
-        MessagesPlaceholder(variable_name="agent_scratchpad") # Crucial for agent execution flow
-    ])
-
-    # 4. Load Memory (Convert dict history to LangChain message objects)
+    if chat_context["summary"]:
+        system_prompt_text += f"\n\nSummary of the earlier conversation:\n{chat_context['summary']}"
+
+    # Load Memory (Convert dict history to LangChain message objects)
+    from langchain_core.messages import AIMessage, HumanMessage
+
     chat_history_messages = []
-    for msg_data in full_messages_history_for_llm:
+    for msg_data in chat_context["history"]:
         if msg_data.get("role") == "user":
             chat_history_messages.append(HumanMessage(content=msg_data.get("content", "")))
         elif msg_data.get("role") == "assistant":
@@ -474,30 +371,21 @@ async def langchain_chat_stream_generator(
             # For now, assume it's plain content from previous non-agent interactions
             chat_history_messages.append(AIMessage(content=msg_data.get("content", "")))
         # Later, if we store ToolMessages in history, we'd load them here too.
-    print(f"[LC AGENT DEBUG] Chat history for agent: {len(chat_history_messages)} messages.")
-
-    # 5. Create Agent
-    agent = create_tool_calling_agent(llm, tools, agent_prompt)
-
-    # 6. Create Agent Executor
-    agent_executor = AgentExecutor(
-        agent=agent, 
-        tools=tools, 
-        verbose=True, 
-        handle_parsing_errors=True, # Good for robustness
-        max_iterations=6, # Prevent runaway agents
-        # return_intermediate_steps=True # Consider this if we want to log/show intermediate thoughts/tool calls
-    )
+    logger.debug("Chat history for agent: %d messages", len(chat_history_messages))
+
+    # Shared executor (LLM client, tool bindings and prompt built once per model config)
+    agent_executor = await get_chat_executor()
 
     # Ensure tool_input_dict is defined before the try block if it's used in on_tool_start's yield
     # However, it's better to get it from event["data"] directly.
 
+    debug_chunks = logger.isEnabledFor(logging.DEBUG)
     try:
-        print(f"[LC AGENT EVENTS STREAM] Invoking agent_executor.astream_events for input: '{current_user_input}'")
+        logger.info("Streaming LangChain agent response", extra={"user_id": user_id, "input_chars": len(current_user_input)})
         final_answer_has_streamed = False
         
         async for event in agent_executor.astream_events(
-            {"input": current_user_input, "chat_history": chat_history_messages},
+            {"system_prompt": system_prompt_text, "input": current_user_input, "chat_history": chat_history_messages},
             version="v2"
         ):
             kind = event["event"]
@@ -509,14 +397,15 @@ async def langchain_chat_stream_generator(
                 if chunk_data and hasattr(chunk_data, 'content'):
                     content_piece = chunk_data.content
                     if isinstance(content_piece, str) and content_piece:
-                        print(f"[LC AGENT LLM STREAM - YIELDING]: '{content_piece[:70]}...'")
-                        yield content_piece + "\n"
+                        if debug_chunks and _stream_chunk_sampler.hit():
+                            logger.debug("Agent stream chunk (sampled): %d chars", len(content_piece))
+                        yield content_piece.encode() + b"\n"
                         final_answer_has_streamed = True
 
             elif kind == "on_tool_start":
                 tool_name = data.get("name", "unknown_tool")
                 tool_input_payload = data.get("input", {})
-                print(f"[LC AGENT TOOL START]: Tool '{tool_name}' starting with input: {str(tool_input_payload)[:100]}...")
+                logger.debug("Tool %s started", tool_name)
                 
                 # Prepare input for JSON serialization
                 input_for_json = {}
@@ -526,34 +415,34 @@ async def langchain_chat_stream_generator(
                     input_for_json = {"query": str(tool_input_payload)[:100] + ("..." if len(str(tool_input_payload)) > 100 else "")}
 
                 try:
-                    yield f"__TOOL_START__!{json.dumps({"name": tool_name, "input": input_for_json})}\n"
+                    yield b"__TOOL_START__!" + dumps({"name": tool_name, "input": input_for_json}) + b"\n"
                 except TypeError as e_json_tool_start:
-                    print(f"[LC AGENT TOOL START] JSON serialization error for tool input: {e_json_tool_start}. Input was: {input_for_json}")
-                    yield f"__TOOL_START__!{json.dumps({"name": tool_name, "input": "<input details in backend logs>"})}\n"
+                    logger.warning("Could not serialize input of tool %s: %s", tool_name, e_json_tool_start)
+                    yield b"__TOOL_START__!" + dumps({"name": tool_name, "input": "<input details in backend logs>"}) + b"\n"
 
             elif kind == "on_tool_end":
                 tool_name = data.get("name", "unknown_tool")
                 # tool_output_preview = str(data.get("output", ""))[:100] # Output not sent to frontend for status
-                print(f"[LC AGENT TOOL END]: Tool '{tool_name}' finished.")
-                yield f"__TOOL_END__!{json.dumps({"name": tool_name})}\n"
+                logger.debug("Tool %s finished", tool_name)
+                yield b"__TOOL_END__!" + dumps({"name": tool_name}) + b"\n"
             
             elif kind == "on_chain_end" and name == "AgentExecutor":
                 final_agent_output_dict = data.get("output", {})
-                print(f"[LC AGENT EXECUTOR END]: Raw output dict: {str(final_agent_output_dict)[:200]}...")
+                logger.debug("Agent executor finished, streamed=%s", final_answer_has_streamed)
                 if not final_answer_has_streamed:
                     final_text_from_executor = final_agent_output_dict.get("output") 
                     if isinstance(final_text_from_executor, str) and final_text_from_executor:
-                        print(f"[LC AGENT EXECUTOR END - YIELDING FALLBACK TEXT]: '{final_text_from_executor[:70]}...'")
-                        yield final_text_from_executor + "\n"
+                        logger.debug("Sending executor output as fallback text (%d chars)", len(final_text_from_executor))
+                        yield final_text_from_executor.encode() + b"\n"
             
             await asyncio.sleep(0.01)
 
     except Exception as e:
-        print(f"Error during LangChain Agent astream_events: {str(e)}")
-        yield f"Sorry, an error occurred: {str(e)}\n"
+        logger.exception("LangChain agent stream failed")
+        yield f"Sorry, an error occurred: {str(e)}\n".encode()
     finally:
-        print(f"[LC AGENT GENERATOR ENDING] User: {user_id}. Sending __END_OF_AI_STREAM__.")
-        yield "__END_OF_AI_STREAM__\n"
+        logger.debug("Agent stream for user %s ending", user_id)
+        yield b"__END_OF_AI_STREAM__\n"
 
 @router.post("/lc_stream")
 async def chat_langchain_stream(
@@ -565,7 +454,7 @@ async def chat_langchain_stream(
          raise HTTPException(status_code=401, detail="User not authenticated")
 
     user_id_str = str(current_user.id)
-    print(f"[LCEL CHAT DEBUG] Request for /lc_stream user: {user_id_str}, curriculum: {request_data.curriculum_id}")
+    logger.debug("/lc_stream request user=%s curriculum=%s", user_id_str, request_data.curriculum_id)
 
     # Extract the last user message as the current input
     current_user_input = ""
@@ -580,8 +469,8 @@ async def chat_langchain_stream(
     if not current_user_input:
         # Handle case where there's no user input, maybe return an error or a default greeting
         async def empty_input_stream():
-            yield f'0:{json.dumps("Hello! How can I help you today?")}\n'
-            yield f'd:{json.dumps({"finishReason": "stop"})}\n'
+            yield b"0:" + dumps("Hello! How can I help you today?") + b"\n"
+            yield b"d:" + dumps({"finishReason": "stop"}) + b"\n"
         return StreamingResponse(empty_input_stream(), media_type="text/event-stream", headers={"x-vercel-ai-data-stream": "v1"})
 
     # Prepare context data for the system prompt
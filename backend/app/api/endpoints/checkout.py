@@ -4,7 +4,8 @@ from typing import Optional
 import httpx
 from app.core.auth import get_current_user
 from app.core.config import settings
-from app.db.supabase_client import supabase
+from app.core.http_client import get_httpx_client
+from app.db.supabase_client import run_query, supabase
 from app.models.user import AuthenticatedUser
 from fastapi import APIRouter, Depends, HTTPException, status
 
@@ -24,7 +25,7 @@ async def create_checkout_session(
         )
     
     # Check if user already has an active subscription
-    result = supabase.table("subscription_status").select("*").eq("user_id", str(user.id)).execute()
+    result = await run_query(supabase.table("subscription_status").select("*").eq("user_id", str(user.id)))
     
     if result.data and result.data[0].get("status") == "active":
         raise HTTPException(
@@ -38,59 +39,59 @@ async def create_checkout_session(
     if not cancel_url:
         cancel_url = f"{os.environ.get('FRONTEND_URL', 'http://localhost:5173')}/dashboard"
     
-    async with httpx.AsyncClient() as client:
-        try:
-            import logging
-            logger = logging.getLogger(__name__)
-            
-            # Log the request details
-            logger.info(f"Creating checkout session for user {user.id}")
-            logger.info(f"Product ID: {settings.polar_product_id}")
-            logger.info(f"Success URL: {success_url}")
-            
-            # Create checkout session with Polar API
-            response = await client.post(
-                "https://api.polar.sh/v1/checkouts/",
-                headers={
-                    "Authorization": f"Bearer {settings.polar_access_token}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "products": [settings.polar_product_id],
-                    "success_url": success_url,
-                    "metadata": {
-                        "user_id": str(user.id)
-                    },
-                    "customer_email": user.email,
-                    "customer_external_id": str(user.id),
-                    "allow_discount_codes": True,
-                    "customer_billing_address": {
-                        "country": "US"
-                    }
+    client = get_httpx_client()
+    try:
+        import logging
+        logger = logging.getLogger(__name__)
+        
+        # Log the request details
+        logger.info(f"Creating checkout session for user {user.id}")
+        logger.info(f"Product ID: {settings.polar_product_id}")
+        logger.info(f"Success URL: {success_url}")
+        
+        # Create checkout session with Polar API
+        response = await client.post(
+            "https://api.polar.sh/v1/checkouts/",
+            headers={
+                "Authorization": f"Bearer {settings.polar_access_token}",
+                "Content-Type": "application/json"
+            },
+            json={
+                "products": [settings.polar_product_id],
+                "success_url": success_url,
+                "metadata": {
+                    "user_id": str(user.id)
                 },
-                timeout=30.0,
-                follow_redirects=True
-            )
-            
-            if response.status_code != 201:
-                logger.error(f"Failed to create checkout session: {response.status_code} - {response.text}")
-                logger.error(f"Response headers: {response.headers}")
-                
-                # Check if it's a redirect issue
-                if response.status_code in [301, 302, 307, 308]:
-                    logger.error(f"Redirect location: {response.headers.get('location')}")
-                
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail="Failed to create checkout session"
-                )
+                "customer_email": user.email,
+                "customer_external_id": str(user.id),
+                "allow_discount_codes": True,
+                "customer_billing_address": {
+                    "country": "US"
+                }
+            },
+            timeout=30.0,
+            follow_redirects=True
+        )
+        
+        if response.status_code != 201:
+            logger.error(f"Failed to create checkout session: {response.status_code} - {response.text}")
+            logger.error(f"Response headers: {response.headers}")
             
-            data = response.json()
-            return {"url": data.get("url")}
+            # Check if it's a redirect issue
+            if response.status_code in [301, 302, 307, 308]:
+                logger.error(f"Redirect location: {response.headers.get('location')}")
             
-        except httpx.RequestError as e:
-            logger.error(f"Request error creating checkout session: {e}")
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to create checkout session"
-            ) 
\ No newline at end of file
+            )
+        
+        data = response.json()
+        return {"url": data.get("url")}
+        
+    except httpx.RequestError as e:
+        logger.error(f"Request error creating checkout session: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to create checkout session"
+        ) 
\ No newline at end of file
@@ -2,40 +2,66 @@ import asyncio
 import json
 import logging
 import re
-import traceback
 from datetime import datetime
 from typing import Any, Dict, List
 from uuid import UUID, uuid4
 
-import json5
 from app.agents.curriculum_agent import curriculum_agent
 from app.api.dependencies import require_subscription
 from app.core.auth import get_current_user
-from app.db.supabase_client import supabase
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.etag import (compute_etag, conditional_json, etag_matches,
+                           not_modified)
+from app.core.log import get_logger
+from app.core.serialization import dumps
+from app.db.supabase_client import run_query, supabase
 from app.models.curriculum import (Curriculum, CurriculumCreate, CurriculumDay,
-                                   CurriculumDayCreate)
+                                   CurriculumDayCreate, CurriculumDaySummary,
+                                   CurriculumOverview)
 from app.models.user import AuthenticatedUser
-from app.services.validation_service import clean_and_validate_json
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
-from fastapi.responses import JSONResponse
+from app.services.curriculum_generation import queue_curriculum_generation
+from app.services.generation_events import (EventSubscription, format_sse,
+                                            get_status, set_status)
+from app.services.lesson_text import invalidate as invalidate_lesson_text
+from app.services.lesson_text import lesson_text_columns
+from app.services.llm_archive import archive_llm_output
+from fastapi import (APIRouter, BackgroundTasks, Depends, HTTPException,
+                     Request, status)
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
+from redis.exceptions import RedisError
 
 router = APIRouter()
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
-# Create a file handler for raw LLM responses
-try:
-    llm_handler = logging.FileHandler("llm_responses.log", encoding='utf-8')
-    llm_handler.setLevel(logging.INFO)
-    llm_logger = logging.getLogger("llm_responses")
-    llm_logger.addHandler(llm_handler)
-    llm_logger.propagate = False
-except Exception as e:
-    logger.error(f"Failed to configure file logger: {e}")
-    llm_logger = logger # Fallback to console logger
+logger = get_logger(__name__)
+
+# Everything the Curriculum model needs, lifting the three fields it reads out of
+# metadata instead of shipping the whole JSON column
+CURRICULUM_COLUMNS = (
+    "id, user_id, title, description, topic, goal, difficulty_level, estimated_duration_days, "
+    "num_projects, is_public, is_prebuilt, generation_status, generation_progress, created_at, updated_at, "
+    "prerequisites:metadata->>prerequisites, "
+    "daily_time_commitment_minutes:metadata->daily_time_commitment_minutes, "
+    "learning_style:metadata->>learning_style"
+)
+
+DAY_SUMMARY_COLUMNS = "id, day_number, title, estimated_hours, is_project_day, updated_at"
+
+# Encoded GET /days/{day_id} bodies keyed by ETag, i.e. by the row's content,
+# so an edited day can never be served from a stale entry
+_day_bodies = TTLCache(maxsize=settings.day_body_cache_max_entries)
+
+
+def _curriculum_from_row(row: Dict[str, Any]) -> Curriculum:
+    """Map a curricula row (full or CURRICULUM_COLUMNS) onto the Curriculum model."""
+    row["learning_goal"] = row.get("topic") or row.get("goal")
+    metadata = row.get("metadata") or {}
+    for field in ("prerequisites", "daily_time_commitment_minutes", "learning_style"):
+        if field not in row:
+            row[field] = metadata.get(field)
+    return Curriculum(**row)
+
 
 class ProgressRecord(BaseModel):
     id: UUID
@@ -87,18 +113,21 @@ async def create_curriculum(
         if field in db_curriculum_data:
             del db_curriculum_data[field]
 
-    print(f"Inserting curriculum with fields: {list(db_curriculum_data.keys())}")
-    created_curriculum_row = supabase.table("curricula").insert(db_curriculum_data).execute()
+    created_curriculum_row = await run_query(supabase.table("curricula").insert(db_curriculum_data))
 
     if not created_curriculum_row.data:
         raise HTTPException(status_code=500, detail="Failed to create curriculum in database")
     
     new_curriculum_id = created_curriculum_row.data[0]["id"]
 
-    # Update status: Researching topic
-    supabase.table("curricula").update({
-        "generation_progress": "Researching your topic and gathering resources..."
-    }).eq("id", new_curriculum_id).execute()
+    # Update status: Researching topic (progress lives in Redis; the row keeps its initial state)
+    await set_status(
+        new_curriculum_id,
+        user_id=user_id,
+        title=db_curriculum_data["title"],
+        generation_status="generating",
+        generation_progress="Researching your topic and gathering resources...",
+    )
 
     # Prepare initial messages for the agent based on curriculum_data
     agent_messages = [
@@ -152,202 +181,92 @@ Return ONLY the JSON object in the exact schema format specified in the system p
     agent_context["curriculum_id"] = new_curriculum_id
     agent_context["intent"] = "create_curriculum"  # Add intent for YouTube URL replacement
 
-    background_tasks.add_task(generate_and_save_curriculum, new_curriculum_id, curriculum_data, agent_messages, agent_context)
+    await queue_curriculum_generation(new_curriculum_id, curriculum_data, agent_messages, agent_context, background_tasks)
     
     return {"curriculum_id": new_curriculum_id, "message": "Curriculum generation started."}
 
-async def generate_and_save_curriculum(curriculum_id: str, curriculum_data: CurriculumCreate, agent_messages: List, agent_context: Dict):
-    raw_agent_response = ""
-    try:
-        # Update status: Planning curriculum structure
-        supabase.table("curricula").update({
-            "generation_progress": "Planning curriculum structure and daily topics..."
-        }).eq("id", curriculum_id).execute()
-
-        # Call the agent to generate the curriculum structure and content
-        print(f"Calling agent with messages: {agent_messages[:100]}...")  # Log first 100 chars
-        raw_agent_response = await curriculum_agent.run(messages=agent_messages, context=agent_context)
-        print(f"Agent response length: {len(raw_agent_response) if raw_agent_response else 0}")
-        print(f"Agent response preview: {raw_agent_response[:500] if raw_agent_response else 'None'}...")
-
-        validated_data = await clean_and_validate_json(raw_agent_response)
-        
-        if not validated_data:
-            # If validation and repair fail, mark as failed
-            supabase.table("curricula").update({
-                "generation_status": "failed",
-                "generation_progress": "Failed to generate a valid curriculum after multiple repair attempts."
-            }).eq("id", curriculum_id).execute()
-            return
-
-        # Update status: Processing content
-        supabase.table("curricula").update({
-            "generation_progress": "Creating day-by-day content and resources..."
-        }).eq("id", curriculum_id).execute()
-        
-        # ---------------------------------------------
-        # Use already validated JSON instead of reparsing
-        # ---------------------------------------------
-
-        generated_curriculum = validated_data  # Comes from clean_and_validate_json
-
-        curriculum_title = generated_curriculum.get("curriculum_title", curriculum_data.title or f"Learning {curriculum_data.learning_goal}")
-        curriculum_description = generated_curriculum.get("curriculum_description", curriculum_data.description or curriculum_data.learning_goal)
-        generated_days_data = generated_curriculum.get("days", [])
-
-        print(f"Validated curriculum with {len(generated_days_data)} days")
-
-        if not isinstance(generated_days_data, list):
-            supabase.table("curricula").update({
-                "generation_status": "failed",
-                "generation_progress": "Agent did not return a list of days."
-            }).eq("id", curriculum_id).execute()
-            return
-
-        # Update curriculum with title and description from agent
-        supabase.table("curricula").update({
-            "title": curriculum_title,
-            "description": curriculum_description,
-            "generation_progress": f"Creating {len(generated_days_data)} days of content..."
-        }).eq("id", curriculum_id).execute()
-
-        # 2. Create CurriculumDay entries for each day generated by the agent
-        days_to_insert = []
-        for i, day_data_raw in enumerate(generated_days_data):
-            # Update progress for each day
-            if i % 5 == 0:  # Update every 5 days to avoid too many DB calls
-                supabase.table("curricula").update({
-                    "generation_progress": f"Processing day {i+1} of {len(generated_days_data)}..."
-                }).eq("id", curriculum_id).execute()
-                
-            # Validate and create CurriculumDayCreate objects
-            # The agent MUST provide data in the format CurriculumDayCreate expects
-            try:
-                # Extract project fields if present
-                is_project_day = day_data_raw.get("is_project_day", False)
-                project_data = day_data_raw.get("project_data", None) if is_project_day else None
-                
-                # Create the day object without project fields for validation
-                day_fields = {k: v for k, v in day_data_raw.items() if k not in ["is_project_day", "project_data"]}
-                day_create_obj = CurriculumDayCreate(**day_fields)
-                
-                # Add to insert list with project fields
-                day_dict = day_create_obj.model_dump()
-                day_dict.update({
-                    "curriculum_id": curriculum_id,
-                    "id": str(uuid4()),
-                    "is_project_day": is_project_day,
-                    "project_data": project_data
-                })
-                days_to_insert.append(day_dict)
-            except Exception as e: # Catch Pydantic validation errors or others
-                # Log this error, maybe skip this day or fail the whole process
-                print(f"Skipping day due to parsing error: {str(e)}, data: {day_data_raw}")
-                continue # Or raise HTTPException if one bad day should fail all
-
-        # Update status: Saving curriculum
-        supabase.table("curricula").update({
-            "generation_progress": "Saving curriculum to database..."
-        }).eq("id", curriculum_id).execute()
-
-        if days_to_insert:
-            created_days_response = supabase.table("curriculum_days").insert(days_to_insert).execute()
-            if created_days_response.data is None or len(created_days_response.data) != len(days_to_insert):
-                # Handle partial insert or error - potentially delete the main curriculum entry for consistency
-                supabase.table("curricula").update({
-                    "generation_status": "failed",
-                    "generation_progress": "Failed to save curriculum days"
-                }).eq("id", curriculum_id).execute()
-                raise HTTPException(status_code=500, detail="Failed to create curriculum days")
-        
-        # Update status: Completed
-        supabase.table("curricula").update({
-            "generation_status": "completed",
-            "generation_progress": "Curriculum generated successfully!"
-        }).eq("id", curriculum_id).execute()
-        
-        # Return only the ID – UI will poll /api/curricula/{id} for full data
-        return
-
-    except HTTPException as e: # Re-raise HTTPExceptions
-        raise e
-    except Exception as e:
-        # Log the full error for debugging
-        print(f"Unexpected error creating curriculum: {str(e)}")
-        traceback.print_exc()
-        
-        # Update status to failed
-        supabase.table("curricula").update({
-            "generation_status": "failed",
-            "generation_progress": f"Unexpected error: {str(e)}"
-        }).eq("id", curriculum_id).execute()
-        
-        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
-
-    finally:
-        # Log the raw LLM response
-        try:
-            llm_logger.info(f"--- New Curriculum Generation ---")
-            llm_logger.info(f"Curriculum ID: {curriculum_id}")
-            llm_logger.info(f"Timestamp: {datetime.utcnow().isoformat()}")
-            llm_logger.info("Raw Response:")
-            llm_logger.info(raw_agent_response)
-            llm_logger.info("--- End of Response ---\n")
-        except Exception as e:
-            logger.error(f"Failed to write to llm_responses.log: {e}")
-
 @router.get("/", response_model=List[Curriculum])
-async def list_curricula(current_user: AuthenticatedUser = Depends(get_current_user)):
+async def list_curricula(request: Request, current_user: AuthenticatedUser = Depends(get_current_user)):
     """List all curricula for the current user."""
     user_id = current_user.id
     if not user_id:
         raise HTTPException(status_code=403, detail="User ID not found in token")
 
-    response = supabase.table("curricula").select("*").eq("user_id", str(user_id)).order("created_at", desc=True).execute()
-    
-    if response.data:
-        processed_curricula = []
-        for item in response.data:
-            # Map database fields to Pydantic model fields
-            item["learning_goal"] = item.get("topic") or item.get("goal")
-            
-            metadata_from_db = item.get("metadata", {})
-            item["prerequisites"] = metadata_from_db.get("prerequisites")
-            item["daily_time_commitment_minutes"] = metadata_from_db.get("daily_time_commitment_minutes")
-            item["learning_style"] = metadata_from_db.get("learning_style")
-            
-            try:
-                processed_curricula.append(Curriculum(**item))
-            except Exception as e:
-                print(f"Error validating curriculum data for ID {item.get('id')}: {str(e)}")
-                traceback.print_exc()
-                # Optionally, skip this item or raise an error if strict validation is required
-                # For now, we'll skip problematic items to avoid breaking the whole list
-                continue
-        return processed_curricula
-    return []
+    response = await run_query(supabase.table("curricula").select(CURRICULUM_COLUMNS).eq("user_id", str(user_id)).order("created_at", desc=True))
+    rows = response.data or []
+    etag = compute_etag(rows)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    processed_curricula = []
+    for item in rows:
+        try:
+            processed_curricula.append(_curriculum_from_row(item))
+        except Exception as e:
+            logger.warning("Skipping invalid curriculum %s: %s", item.get("id"), e)
+            # Optionally, skip this item or raise an error if strict validation is required
+            # For now, we'll skip problematic items to avoid breaking the whole list
+            continue
+    return conditional_json(request, processed_curricula, etag=etag)
 
 # Placeholder for GET /curriculum/{id}
 @router.get("/{curriculum_id}", response_model=Curriculum)
 async def get_curriculum(
     curriculum_id: str,
+    request: Request,
     current_user: AuthenticatedUser = Depends(get_current_user)
 ):
     user_id = current_user.id
-    response = supabase.table("curricula").select("*").eq("id", curriculum_id).eq("user_id", str(user_id)).maybe_single().execute()
-    if response.data:
-        # Map database fields to Pydantic model fields
-        curriculum_data = response.data
-        curriculum_data["learning_goal"] = curriculum_data.get("topic") or curriculum_data.get("goal")
-        
-        metadata_from_db = curriculum_data.get("metadata", {})
-        curriculum_data["prerequisites"] = metadata_from_db.get("prerequisites")
-        curriculum_data["daily_time_commitment_minutes"] = metadata_from_db.get("daily_time_commitment_minutes")
-        curriculum_data["learning_style"] = metadata_from_db.get("learning_style")
-        
-        return Curriculum(**curriculum_data)
+    response = await run_query(supabase.table("curricula").select(CURRICULUM_COLUMNS).eq("id", curriculum_id).eq("user_id", str(user_id)).maybe_single())
+    if response and response.data:
+        etag = compute_etag(response.data)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        return conditional_json(request, _curriculum_from_row(response.data), etag=etag)
     raise HTTPException(status_code=404, detail="Curriculum not found")
 
+
+@router.get("/{curriculum_id}/overview", response_model=CurriculumOverview)
+async def get_curriculum_overview(
+    curriculum_id: str,
+    request: Request,
+    current_user: AuthenticatedUser = Depends(get_current_user)
+):
+    """Curriculum, day summaries (no lesson bodies) and the user's completion state.
+
+    One embedded select replaces the curriculum, days and progress round trips;
+    lesson bodies are loaded per day from ``GET /{curriculum_id}/days/{day_id}``.
+    """
+    user_id = str(current_user.id)
+    response = await run_query(
+        supabase.table("curricula")
+        .select(f"{CURRICULUM_COLUMNS}, curriculum_days({DAY_SUMMARY_COLUMNS}, progress(completed_at))")
+        .eq("id", curriculum_id)
+        .eq("user_id", user_id)
+        .eq("curriculum_days.progress.user_id", user_id)
+        .order("day_number", foreign_table="curriculum_days")
+        .maybe_single()
+    )
+    if not response or not response.data:
+        raise HTTPException(status_code=404, detail="Curriculum not found")
+
+    etag = compute_etag(response.data)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    row = response.data
+    days = []
+    for day in row.pop("curriculum_days", None) or []:
+        completions = [record["completed_at"] for record in day.pop("progress", None) or []]
+        days.append(CurriculumDaySummary(**day, completed=bool(completions), completed_at=min(completions, default=None)))
+
+    overview = CurriculumOverview(
+        curriculum=_curriculum_from_row(row),
+        days=days,
+        completed_days=sum(day.completed for day in days),
+    )
+    return conditional_json(request, overview, etag=etag)
+
 # New endpoint to mark a day as complete
 @router.post("/{curriculum_id}/days/{day_id}/complete", status_code=status.HTTP_201_CREATED, response_model=ProgressRecord)
 async def mark_day_complete(
@@ -363,12 +282,11 @@ async def mark_day_complete(
     s_day_id = str(day_id)
 
     # Validate day belongs to curriculum
-    day_check_response = (
+    day_check_response = await run_query(
         supabase.table("curriculum_days")
         .select("id", count='exact') # Using count='exact' for existence check
         .eq("id", s_day_id)
         .eq("curriculum_id", s_curriculum_id)
-        .execute()
     )
     # Check if count is 0 or data is empty (PostgREST v1+ might return count in response)
     # A more robust check for PostgREST v0.x (older Supabase client libs) is just to check if data is empty.
@@ -380,18 +298,16 @@ async def mark_day_complete(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Day not found in this curriculum (data check)")
 
     # Check if progress record already exists
-    existing_progress_response = (
+    existing_progress_response = await run_query(
         supabase.table("progress")
         .select("*")  # Fetch all columns to match ProgressRecord model
         .eq("user_id", user_id_str)
         .eq("curriculum_id", s_curriculum_id)
         .eq("day_id", s_day_id)
-        .maybe_single() # Use maybe_single to get one or None
-        .execute()
+        .maybe_single()
     )
 
     if existing_progress_response and existing_progress_response.data: # .data will be a dict if row exists, or None if no row with maybe_single()
-        print(f"[PROGRESS DEBUG] Day '{s_day_id}' for curriculum '{s_curriculum_id}' already marked complete. Returning existing.")
         return ProgressRecord(**existing_progress_response.data)
 
     # Create new progress record
@@ -405,15 +321,12 @@ async def mark_day_complete(
     }
 
     try:
-        print(f"[PROGRESS DEBUG] Inserting new progress record: {progress_data_to_insert}")
-        insert_response = (
+        insert_response = await run_query(
             supabase.table("progress")
             .insert(progress_data_to_insert)
-            .execute()
         )
         
         if insert_response.data and len(insert_response.data) > 0:
-            print(f"[PROGRESS DEBUG] Insert successful: {insert_response.data[0]}")
             return ProgressRecord(**insert_response.data[0])
         else:
             error_detail = "Failed to mark day as complete."
@@ -422,14 +335,13 @@ async def mark_day_complete(
                  error_msg = getattr(insert_response.error, 'message', str(insert_response.error))
                  error_detail += f" DB Error: {error_msg}"
             # For Supabase client v2.x (postgrest-py v0.11+), errors are usually raised as exceptions
-            print(f"[PROGRESS DEBUG] Failed to insert progress. Supabase response was not as expected or contained an error if v1.x client: {insert_response}")
+            logger.error("Failed to insert progress for day %s: %s", s_day_id, error_detail)
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=error_detail)
             
     except HTTPException: 
         raise
     except Exception as e: # Catch other potential errors (e.g., direct exceptions from Supabase client v2+)
-        print(f"[PROGRESS DEBUG] Exception marking day complete: {type(e).__name__} - {str(e)}")
-        traceback.print_exc()
+        logger.exception("Error marking day %s complete", s_day_id)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error marking day as complete: {str(e)}")
 
 # We will also need PUT and DELETE later 
@@ -447,12 +359,12 @@ async def update_day_content(
     user_id = str(current_user.id)
     
     # Verify curriculum ownership
-    curriculum_check = supabase.table("curricula").select("id").eq("id", curriculum_id).eq("user_id", user_id).maybe_single().execute()
+    curriculum_check = await run_query(supabase.table("curricula").select("id").eq("id", curriculum_id).eq("user_id", user_id).maybe_single())
     if not curriculum_check.data:
         raise HTTPException(status_code=404, detail="Curriculum not found or access denied")
     
     # Verify day belongs to curriculum
-    day_check = supabase.table("curriculum_days").select("id").eq("id", day_id).eq("curriculum_id", curriculum_id).maybe_single().execute()
+    day_check = await run_query(supabase.table("curriculum_days").select("id").eq("id", day_id).eq("curriculum_id", curriculum_id).maybe_single())
     if not day_check.data:
         raise HTTPException(status_code=404, detail="Day not found in this curriculum")
     
@@ -465,8 +377,11 @@ async def update_day_content(
     }
     # Remove None values
     update_data = {k: v for k, v in update_data.items() if v is not None}
+    if "content" in update_data:
+        update_data.update(lesson_text_columns(update_data["content"]))
     
-    result = supabase.table("curriculum_days").update(update_data).eq("id", day_id).execute()
+    result = await run_query(supabase.table("curriculum_days").update(update_data).eq("id", day_id))
+    invalidate_lesson_text(curriculum_id)
     
     if result.data:
         return {"message": "Day updated successfully", "data": result.data[0]}
@@ -483,40 +398,21 @@ async def reorder_days(
     user_id = str(current_user.id)
     
     # Verify curriculum ownership
-    curriculum_check = supabase.table("curricula").select("id").eq("id", curriculum_id).eq("user_id", user_id).maybe_single().execute()
+    curriculum_check = await run_query(supabase.table("curricula").select("id").eq("id", curriculum_id).eq("user_id", user_id).maybe_single())
     if not curriculum_check.data:
         raise HTTPException(status_code=404, detail="Curriculum not found or access denied")
     
-    # Phase 1: temporary high numbers to avoid unique constraint collisions
-    temp_updates = []
-    for i, day_info in enumerate(day_order):
-        day_id = day_info.get("id")
-        if not day_id:
-            continue
-        temp_updates.append({"id": day_id, "day_number": 1000 + i})
-
-    for upd in temp_updates:
-        supabase.table("curriculum_days").update({"day_number": upd["day_number"]}).eq("id", upd["id"]).execute()
-
-    # Phase 2: set the desired day_numbers
-    for day_info in day_order:
-        day_id = day_info.get("id")
-        new_number = day_info.get("day_number")
-        if not day_id or new_number is None:
-            continue
-
-        # Fetch current title
-        day_data = supabase.table("curriculum_days").select("title").eq("id", day_id).maybe_single().execute()
-        update_data = {"day_number": new_number}
-        if day_data.data:
-            title = day_data.data.get("title", "")
-            if title.startswith("Day "):
-                colon_idx = title.find(":")
-                if colon_idx > 0:
-                    update_data["title"] = f"Day {new_number}{title[colon_idx:]}"
-
-        supabase.table("curriculum_days").update(update_data).eq("id", day_id).execute()
-
+    # One set-based update renumbers the days and rewrites "Day N:" titles
+    await run_query(supabase.rpc("resequence_curriculum_days", {
+        "p_curriculum_id": curriculum_id,
+        "p_order": [
+            {"id": day_info["id"], "day_number": day_info["day_number"]}
+            for day_info in day_order
+            if day_info.get("id") and day_info.get("day_number") is not None
+        ],
+    }))
+
+    invalidate_lesson_text(curriculum_id)
     return {"message": "Days reordered successfully"}
 
 
@@ -530,12 +426,12 @@ async def add_custom_day(
     user_id = str(current_user.id)
     
     # Verify curriculum ownership
-    curriculum_check = supabase.table("curricula").select("id").eq("id", curriculum_id).eq("user_id", user_id).maybe_single().execute()
+    curriculum_check = await run_query(supabase.table("curricula").select("id").eq("id", curriculum_id).eq("user_id", user_id).maybe_single())
     if not curriculum_check.data:
         raise HTTPException(status_code=404, detail="Curriculum not found or access denied")
     
     # Get the current max day_number
-    max_day_result = supabase.table("curriculum_days").select("day_number").eq("curriculum_id", curriculum_id).order("day_number", desc=True).limit(1).execute()
+    max_day_result = await run_query(supabase.table("curriculum_days").select("day_number").eq("curriculum_id", curriculum_id).order("day_number", desc=True).limit(1))
     
     next_day_number = 1
     if max_day_result.data and len(max_day_result.data) > 0:
@@ -549,10 +445,12 @@ async def add_custom_day(
     new_day = {
         **day_data.model_dump(),
         "curriculum_id": curriculum_id,
-        "id": str(uuid4())
+        "id": str(uuid4()),
+        **lesson_text_columns(day_data.content),
     }
     
-    result = supabase.table("curriculum_days").insert(new_day).execute()
+    result = await run_query(supabase.table("curriculum_days").insert(new_day))
+    invalidate_lesson_text(curriculum_id)
     
     if result.data:
         return CurriculumDay(**result.data[0])
@@ -569,38 +467,19 @@ async def delete_day(
     user_id = str(current_user.id)
     
     # Verify curriculum ownership
-    curriculum_check = supabase.table("curricula").select("id").eq("id", curriculum_id).eq("user_id", user_id).maybe_single().execute()
+    curriculum_check = await run_query(supabase.table("curricula").select("id").eq("id", curriculum_id).eq("user_id", user_id).maybe_single())
     if not curriculum_check.data:
         raise HTTPException(status_code=404, detail="Curriculum not found or access denied")
     
-    # Get the day to be deleted
-    day_to_delete = supabase.table("curriculum_days").select("day_number").eq("id", day_id).eq("curriculum_id", curriculum_id).maybe_single().execute()
-    if not day_to_delete.data:
+    # Delete the day and resequence the later ones in one transaction
+    deleted = await run_query(supabase.rpc("delete_curriculum_day", {
+        "p_curriculum_id": curriculum_id,
+        "p_day_id": day_id,
+    }))
+    if deleted.data is None:
         raise HTTPException(status_code=404, detail="Day not found")
     
-    deleted_day_number = day_to_delete.data["day_number"]
-    
-    # Delete the day
-    supabase.table("curriculum_days").delete().eq("id", day_id).execute()
-    
-    # Resequence remaining days
-    remaining_days = supabase.table("curriculum_days").select("id, day_number, title").eq("curriculum_id", curriculum_id).gt("day_number", deleted_day_number).order("day_number").execute()
-    
-    if remaining_days.data:
-        for day in remaining_days.data:
-            new_number = day["day_number"] - 1
-            update_data = {"day_number": new_number}
-            
-            # Update title if it follows "Day X: ..." pattern
-            title = day.get("title", "")
-            if title.startswith("Day "):
-                colon_idx = title.find(":")
-                if colon_idx > 0:
-                    new_title = f"Day {new_number}{title[colon_idx:]}"
-                    update_data["title"] = new_title
-            
-            supabase.table("curriculum_days").update(update_data).eq("id", day["id"]).execute()
-    
+    invalidate_lesson_text(curriculum_id)
     return {"message": "Day deleted successfully"}
 
 
@@ -616,12 +495,12 @@ async def regenerate_day(
     improvement_prompt = regenerate_request.get("improvement_prompt", "")
     
     # Verify curriculum ownership
-    curriculum_check = supabase.table("curricula").select("*").eq("id", curriculum_id).eq("user_id", user_id).maybe_single().execute()
+    curriculum_check = await run_query(supabase.table("curricula").select("*").eq("id", curriculum_id).eq("user_id", user_id).maybe_single())
     if not curriculum_check.data:
         raise HTTPException(status_code=404, detail="Curriculum not found or access denied")
     
     # Get the current day content
-    current_day = supabase.table("curriculum_days").select("*").eq("id", day_id).eq("curriculum_id", curriculum_id).maybe_single().execute()
+    current_day = await run_query(supabase.table("curriculum_days").select("id, title, content, resources").eq("id", day_id).eq("curriculum_id", curriculum_id).maybe_single())
     if not current_day.data:
         raise HTTPException(status_code=404, detail="Day not found")
     
@@ -654,8 +533,9 @@ async def regenerate_day(
             context={"intent": "regenerate_day"}  # Make sure to pass intent in context
         )
         
-        print(f"[REGENERATE DEBUG] Raw agent response: {raw_response[:500]}...")
-        
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Regenerated day %s: response %d chars", day_id, len(raw_response or ""))
+
         # Parse the response
         regenerated_data = json.loads(raw_response)
         
@@ -666,30 +546,211 @@ async def regenerate_day(
             "resources": regenerated_data.get("resources", current_day.data.get("resources")),
             "updated_at": datetime.utcnow().isoformat()
         }
+        text_columns = lesson_text_columns(update_data["content"])
+        update_data.update(text_columns)
         
-        result = supabase.table("curriculum_days").update(update_data).eq("id", day_id).execute()
+        result = await run_query(supabase.table("curriculum_days").update(update_data).eq("id", day_id))
+        invalidate_lesson_text(curriculum_id)
         
         if result.data:
-            return {"message": "Day regenerated successfully", "data": result.data[0]}
+            # The derived lesson text is for the chat context only, not the client
+            day = {key: value for key, value in result.data[0].items() if key not in text_columns}
+            return {"message": "Day regenerated successfully", "data": day}
         raise HTTPException(status_code=500, detail="Failed to update regenerated day")
         
     except json.JSONDecodeError as e:
-        print(f"[REGENERATE ERROR] JSON decode error: {str(e)}")
-        print(f"[REGENERATE ERROR] Raw response that failed: {raw_response}")
+        logger.warning("Regenerated day %s is not valid JSON: %s", day_id, e)
+        archive_llm_output("regenerate_day_failed", raw_response, curriculum_id, error=str(e))
         raise HTTPException(status_code=500, detail=f"Failed to parse regenerated content: {str(e)}")
     except Exception as e:
-        print(f"[REGENERATE ERROR] Unexpected error: {str(e)}")
-        traceback.print_exc()
+        logger.exception("Failed to regenerate day %s", day_id)
         raise HTTPException(status_code=500, detail=f"Failed to regenerate day: {str(e)}")
 
+async def _read_generation_status(curriculum_id: str) -> Dict[str, Any]:
+    """Latest generation status: the Redis snapshot if there is one, else the curricula row."""
+    snapshot = await get_status(curriculum_id)
+    if snapshot and snapshot.get("generation_status"):
+        return snapshot
+    response = await run_query(supabase.table("curricula").select("generation_status, generation_progress, title").eq("id", curriculum_id).maybe_single())
+    return (response.data if response else None) or {}
+
+
+async def _check_generation_access(curriculum_id: str, user_id: str) -> None:
+    """404 unless the user owns the curriculum (answered from the status snapshot when possible)."""
+    snapshot = await get_status(curriculum_id)
+    if snapshot and snapshot.get("user_id") == user_id:
+        return
+    response = await run_query(supabase.table("curricula").select("id").eq("id", curriculum_id).eq("user_id", user_id).maybe_single())
+    if not response or not response.data:
+        raise HTTPException(status_code=404, detail="Curriculum not found")
+
+
+def _generation_event_stream(curriculum_id: str, include_days: bool) -> StreamingResponse:
+    """SSE response relaying a curriculum's generation events until it completes or fails.
+
+    With ``include_days`` every saved day is sent as ``day_ready`` and only the
+    final ``status`` is forwarded; without it every ``status`` (progress) event is.
+    """
+
+    async def read_state():
+        days = []
+        if include_days:
+            days_resp = await run_query(supabase.table("curriculum_days").select("id, day_number, title").eq("curriculum_id", curriculum_id).order("day_number"))
+            days = days_resp.data or []
+        return days, await _read_generation_status(curriculum_id)
+
+    async def event_stream():
+        sent = set()
+        last_status = None
+
+        def new_days(days):
+            for day in days:
+                if day["day_number"] not in sent:
+                    sent.add(day["day_number"])
+                    yield format_sse("day_ready", day)
+
+        def status_events(state):
+            nonlocal last_status
+            current = {
+                "generation_status": state.get("generation_status"),
+                "generation_progress": state.get("generation_progress"),
+            }
+            finished = current["generation_status"] != "generating"
+            if (finished or not include_days) and current != last_status:
+                last_status = current
+                yield format_sse("status", current)
+
+        def done(state):
+            return state.get("generation_status") != "generating"
+
+        try:
+            # Subscribe before the catch-up read so nothing published in between is lost
+            async with EventSubscription(curriculum_id) as subscription:
+                days, state = await read_state()
+                for chunk in new_days(days):
+                    yield chunk
+                for chunk in status_events(state):
+                    yield chunk
+                if done(state):
+                    return
+
+                while True:
+                    event = await subscription.next_event(timeout=settings.sse_keepalive_seconds)
+                    if event is None:
+                        # Quiet period: keep the connection alive and re-check in case an event was missed
+                        yield b": keepalive\n\n"
+                        days, state = await read_state()
+                    elif event.get("type") == "day_ready":
+                        days = [{key: event[key] for key in ("id", "day_number", "title")}] if include_days else []
+                        state = None
+                    elif event.get("type") == "status" and event.get("generation_status"):
+                        days, state = [], event
+                    else:
+                        continue
+                    for chunk in new_days(days):
+                        yield chunk
+                    if state is not None:
+                        for chunk in status_events(state):
+                            yield chunk
+                        if done(state):
+                            return
+        except RedisError as e:
+            # No pub/sub available: fall back to polling the database
+            logger.warning("Generation stream for %s falling back to polling: %s", curriculum_id, e)
+            while True:
+                days, state = await read_state()
+                for chunk in new_days(days):
+                    yield chunk
+                for chunk in status_events(state):
+                    yield chunk
+                if done(state):
+                    return
+                await asyncio.sleep(2)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/{curriculum_id}/status")
 async def get_generation_status(curriculum_id: str, current_user: AuthenticatedUser = Depends(get_current_user)):
-    """Gets the generation status of a curriculum."""
-    response = supabase.table("curricula").select("generation_status, generation_progress, title").eq("id", curriculum_id).eq("user_id", str(current_user.id)).maybe_single().execute()
-    if not response.data:
+    """Gets the generation status of a curriculum.
+
+    Served from the Redis status snapshot while it exists; prefer
+    ``/status/stream`` over polling this endpoint.
+    """
+    snapshot = await get_status(curriculum_id)
+    if snapshot and snapshot.get("user_id") == str(current_user.id) and snapshot.get("generation_status"):
+        return {
+            "generation_status": snapshot["generation_status"],
+            "generation_progress": snapshot.get("generation_progress"),
+            "title": snapshot.get("title"),
+        }
+    response = await run_query(supabase.table("curricula").select("generation_status, generation_progress, title").eq("id", curriculum_id).eq("user_id", str(current_user.id)).maybe_single())
+    if not response or not response.data:
         raise HTTPException(status_code=404, detail="Curriculum not found")
     return response.data 
 
+
+@router.get("/{curriculum_id}/status/stream")
+async def stream_generation_status(curriculum_id: str, current_user: AuthenticatedUser = Depends(get_current_user)):
+    """Server-sent ``status`` events ({generation_status, generation_progress}) for a
+    curriculum being generated; the stream closes after the completed/failed event.
+    EventSource clients can authenticate with the ``?token=`` query parameter.
+    """
+    await _check_generation_access(curriculum_id, str(current_user.id))
+    return _generation_event_stream(curriculum_id, include_days=False)
+
+
+@router.get("/{curriculum_id}/days/stream")
+async def stream_generated_days(curriculum_id: str, current_user: AuthenticatedUser = Depends(get_current_user)):
+    """Server-sent events for a curriculum being generated.
+
+    Emits ``day_ready`` ({id, day_number, title}) for every day already saved
+    and then for each new day as the worker saves it, followed by a final
+    ``status`` event once generation completes or fails. EventSource clients
+    can authenticate with the ``?token=`` query parameter.
+    """
+    await _check_generation_access(curriculum_id, str(current_user.id))
+    return _generation_event_stream(curriculum_id, include_days=True)
+
+
+# Registered after /days/stream so "stream" is never taken for a day id
+@router.get("/{curriculum_id}/days/{day_id}", response_model=CurriculumDay)
+async def get_day(
+    curriculum_id: str,
+    day_id: str,
+    request: Request,
+    current_user: AuthenticatedUser = Depends(get_current_user)
+):
+    """A single day including its lesson body, ownership-checked in the same query."""
+    response = await run_query(
+        supabase.table("curriculum_days")
+        .select("id, curriculum_id, day_number, title, content, resources, estimated_hours, is_project_day, project_data, created_at, updated_at, curricula!inner(user_id)")
+        .eq("id", day_id)
+        .eq("curriculum_id", curriculum_id)
+        .eq("curricula.user_id", str(current_user.id))
+        .maybe_single()
+    )
+    if not response or not response.data:
+        raise HTTPException(status_code=404, detail="Day not found")
+    day = response.data
+    day.pop("curricula", None)
+    etag = compute_etag(day)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    body = _day_bodies.get(etag)
+    if body is None:
+        body = dumps(CurriculumDay(**day))
+        _day_bodies.set(etag, body)
+    return conditional_json(request, body, etag=etag)
+
+
+def day_body_cache_stats() -> Dict[str, int]:
+    return _day_bodies.stats()
+
 # Add retry endpoint --------------------------------------------------
 
 # Reuse CurriculumCreate model
@@ -705,13 +766,12 @@ async def retry_curriculum_generation(
     """Retry generation for a curriculum that is in failed state. Uses the same row ID so the UI updates in place."""
 
     # Fetch the curriculum row and verify ownership
-    resp = (
+    resp = await run_query(
         supabase.table("curricula")
         .select("*")
         .eq("id", curriculum_id)
         .eq("user_id", str(current_user.id))
         .maybe_single()
-        .execute()
     )
 
     if not resp.data:
@@ -756,18 +816,25 @@ Return ONLY the JSON object in the exact schema format specified in the system p
     ]
 
     # Update row to retrying state
-    supabase.table("curricula").update({
+    await run_query(supabase.table("curricula").update({
         "generation_status": "generating",
         "generation_progress": "Retry queued..."
-    }).eq("id", curriculum_id).execute()
+    }).eq("id", curriculum_id))
+    await set_status(
+        curriculum_id,
+        user_id=current_user.id,
+        title=row.get("title"),
+        generation_status="generating",
+        generation_progress="Retry queued...",
+    )
 
-    # Queue background generation task with same curriculum_id
-    background_tasks.add_task(
-        generate_and_save_curriculum,
+    # Queue generation job with same curriculum_id
+    await queue_curriculum_generation(
         curriculum_id,
         curriculum_payload,
         agent_messages,
-        {"curriculum_id": curriculum_id, "intent": "retry_curriculum"}
+        {"curriculum_id": curriculum_id, "intent": "retry_curriculum"},
+        background_tasks,
     )
 
     return {"message": "Retry started"}
@@ -4,9 +4,12 @@ from uuid import UUID
 
 from app.api.dependencies import require_subscription
 from app.core.auth import get_current_user
-from app.db.supabase_client import get_supabase_client
+from app.core.etag import (compute_etag, conditional_json, etag_matches,
+                           not_modified)
+from app.db.supabase_client import get_supabase_client, run_query
 from app.models.user import AuthenticatedUser
-from fastapi import APIRouter, Depends, HTTPException, Query
+from app.services.lesson_text import plain_text
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from pydantic import BaseModel, Field
 
 router = APIRouter()
@@ -89,7 +92,7 @@ async def create_logbook_entry(
     }
     
     try:
-        response = supabase.table("logbook_entries").insert(entry_data).execute()
+        response = await run_query(supabase.table("logbook_entries").insert(entry_data))
         
         if response.data:
             return LogbookEntryResponse(entry=LogbookEntry(**response.data[0]))
@@ -103,6 +106,7 @@ async def create_logbook_entry(
 
 @router.get("/entries", response_model=LogbookEntriesResponse)
 async def get_logbook_entries(
+    request: Request,
     current_user: AuthenticatedUser = Depends(require_subscription),
     curriculum_id: Optional[UUID] = Query(None),
     day_id: Optional[UUID] = Query(None),
@@ -145,7 +149,11 @@ async def get_logbook_entries(
         query = query.range(offset, offset + page_size - 1)
     
     try:
-        response = query.execute()
+        response = await run_query(query)
+        total_count = response.count if response.count is not None else 0
+        etag = compute_etag(response.data, total_count, page, page_size)
+        if etag_matches(request, etag):
+            return not_modified(etag)
         
         validated_entries = []
         if response.data:
@@ -159,14 +167,12 @@ async def get_logbook_entries(
                     # For now, let it fail to surface the root cause in server logs if a specific entry is bad.
                     raise HTTPException(status_code=500, detail=f"Data validation error for entry {entry_data.get('id', 'UNKNOWN')}")
         
-        total_count = response.count if response.count is not None else 0
-        
-        return LogbookEntriesResponse(
+        return conditional_json(request, LogbookEntriesResponse(
             entries=validated_entries,
             total_count=total_count,
             page=page,
             page_size=page_size
-        )
+        ), etag=etag)
         
     except HTTPException: # Re-raise HTTPExceptions explicitly
         raise
@@ -187,13 +193,12 @@ async def get_logbook_entry(
     supabase = get_supabase_client()
     
     try:
-        response = (
+        response = await run_query(
             supabase.table("logbook_entries")
             .select("*")
             .eq("id", str(entry_id))
             .eq("user_id", str(current_user.id))
             .single()
-            .execute()
         )
         
         if response.data:
@@ -265,12 +270,11 @@ async def update_logbook_entry(
     print(f"[LOGBOOK UPDATE DEBUG] Updating entry {entry_id} with data: {update_data}")
     
     try:
-        response = (
+        response = await run_query(
             supabase.table("logbook_entries")
             .update(update_data)
             .eq("id", str(entry_id))
             .eq("user_id", str(current_user.id))
-            .execute()
         )
         
         if response.data:
@@ -299,12 +303,11 @@ async def delete_logbook_entry(
     supabase = get_supabase_client()
     
     try:
-        response = (
+        response = await run_query(
             supabase.table("logbook_entries")
             .delete()
             .eq("id", str(entry_id))
             .eq("user_id", str(current_user.id))
-            .execute()
         )
         
         if response.data:
@@ -333,7 +336,7 @@ async def get_logbook_stats(
         if curriculum_id:
             query = query.eq("curriculum_id", str(curriculum_id))
         
-        response = query.execute()
+        response = await run_query(query)
         
         # Calculate stats
         total_entries = len(response.data)
@@ -420,15 +423,4 @@ async def get_logbook_stats(
 
 def extract_text_from_content(content: Dict[str, Any]) -> str:
     """Extract plain text from TipTap/ProseMirror content."""
-    text_parts = []
-    
-    def extract_from_node(node: Dict[str, Any]):
-        if node.get("type") == "text":
-            text_parts.append(node.get("text", ""))
-        
-        if "content" in node and isinstance(node["content"], list):
-            for child in node["content"]:
-                extract_from_node(child)
-    
-    extract_from_node(content)
-    return " ".join(text_parts) 
\ No newline at end of file
+    return plain_text(content)
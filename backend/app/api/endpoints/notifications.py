@@ -3,7 +3,7 @@ from uuid import UUID
 
 from app.core.auth import get_current_user
 from app.core.config import settings
-from app.db.supabase_client import get_supabase_client
+from app.db.supabase_client import get_supabase_client, run_auth, run_query
 from app.models.user import \
     AuthenticatedUser  # Assuming you have this for type hinting
 from app.services.email_service import EmailService
@@ -174,7 +174,7 @@ async def trigger_all_weekly_recaps(
     try:
         # 1. Fetch all users using the admin interface (requires service_role key)
         # This accesses auth.users correctly.
-        list_users_response = supabase_client.auth.admin.list_users()
+        list_users_response = await run_auth(supabase_client.auth.admin.list_users)
         # The response object itself might be the list, or it might be nested, e.g., response.users
         # Based on supabase-py common patterns, list_users_response itself is often the list of User objects.
         # If it's a more complex response object, this might need adjustment, e.g. list_users_response.get('users')
@@ -215,7 +215,7 @@ async def trigger_all_weekly_recaps(
                 continue
 
             # 2. Fetch all curricula for this user
-            curricula_response = supabase_client.table("curricula").select("id, title").eq("user_id", str(user_id)).execute()
+            curricula_response = await run_query(supabase_client.table("curricula").select("id, title").eq("user_id", str(user_id)))
             
             if curricula_response.data:
                 for curriculum_row in curricula_response.data:
@@ -5,10 +5,11 @@ import logging
 import os
 from datetime import datetime
 
-import httpx
 from app.api.dependencies import get_current_user
 from app.core.config import settings
-from app.db.supabase_client import supabase
+from app.core.http_client import get_httpx_client
+from app.db.supabase_client import run_query, supabase
+from app.services.entitlement_service import invalidate_entitlement
 from fastapi import (APIRouter, Depends, Header, HTTPException, Request,
                      Response, status)
 from starlette.requests import ClientDisconnect
@@ -76,12 +77,13 @@ async def polar_webhook(request: Request, polar_signature: str = Header(None)):
         if user_id:
             try:
                 # Create or update subscription status
-                result = supabase.table("subscription_status").upsert({
+                result = await run_query(supabase.table("subscription_status").upsert({
                     "user_id": user_id,
                     "status": "active",
                     "customer_id": customer_id,
                     "updated_at": datetime.utcnow().isoformat()
-                }).execute()
+                }))
+                await invalidate_entitlement(user_id)
                 logger.info(f"Activated subscription for user {user_id} after checkout - Result: {result}")
                 print(f"Activated subscription for user {user_id} after checkout")
             except Exception as e:
@@ -114,7 +116,7 @@ async def polar_webhook(request: Request, polar_signature: str = Header(None)):
         if not user_id and customer_email:
             try:
                 # Look up user by email in auth.users
-                users_response = supabase.from_("users").select("id").eq("email", customer_email).execute()
+                users_response = await run_query(supabase.from_("users").select("id").eq("email", customer_email))
                 if users_response.data and len(users_response.data) > 0:
                     user_id = users_response.data[0]["id"]
                     logger.info(f"Found user by email lookup: {user_id}")
@@ -134,12 +136,13 @@ async def polar_webhook(request: Request, polar_signature: str = Header(None)):
         # Update subscription status if we have user_id
         if user_id and status_value:
             try:
-                result = supabase.table("subscription_status").upsert({
+                result = await run_query(supabase.table("subscription_status").upsert({
                     "user_id": user_id,
                     "status": status_value,
                     "customer_id": customer_id,
                     "updated_at": datetime.utcnow().isoformat()
-                }).execute()
+                }))
+                await invalidate_entitlement(user_id)
                 logger.info(f"Updated subscription status for user {user_id} to {status_value} - Result: {result}")
                 print(f"Updated subscription status for user {user_id} to {status_value}")
             except Exception as e:
@@ -161,19 +164,20 @@ async def polar_webhook(request: Request, polar_signature: str = Header(None)):
             user_id = external_id
             try:
                 # Update customer_id in subscription_status
-                existing = supabase.table("subscription_status").select("*").eq("user_id", user_id).maybe_single().execute()
+                existing = await run_query(supabase.table("subscription_status").select("*").eq("user_id", user_id).maybe_single())
                 if existing.data:
-                    supabase.table("subscription_status").update({
+                    await run_query(supabase.table("subscription_status").update({
                         "customer_id": customer_id,
                         "updated_at": datetime.utcnow().isoformat()
-                    }).eq("user_id", user_id).execute()
+                    }).eq("user_id", user_id))
                 else:
-                    supabase.table("subscription_status").insert({
+                    await run_query(supabase.table("subscription_status").insert({
                         "user_id": user_id,
                         "status": "none",
                         "customer_id": customer_id,
                         "updated_at": datetime.utcnow().isoformat()
-                    }).execute()
+                    }))
+                await invalidate_entitlement(user_id)
                 print(f"Updated customer_id for user {user_id}")
             except Exception as e:
                 print(f"Error updating customer data: {e}")
@@ -184,12 +188,13 @@ async def polar_webhook(request: Request, polar_signature: str = Header(None)):
 async def test_activation(user_id: str, customer_id: str = "test_customer"):
     """Test endpoint to manually activate a subscription."""
     try:
-        result = supabase.table("subscription_status").upsert({
+        result = await run_query(supabase.table("subscription_status").upsert({
             "user_id": user_id,
             "status": "active", 
             "customer_id": customer_id,
             "updated_at": datetime.utcnow().isoformat()
-        }).execute()
+        }))
+        await invalidate_entitlement(user_id)
         return {"success": True, "result": result.data}
     except Exception as e:
         return {"success": False, "error": str(e)} 
@@ -201,57 +206,58 @@ async def get_customer_portal_url(current_user = Depends(get_current_user)):
     
     try:
         # Get the customer_id from subscription_status
-        result = supabase.table("subscription_status").select("customer_id").eq("user_id", str(current_user.id)).maybe_single().execute()
+        result = await run_query(supabase.table("subscription_status").select("customer_id").eq("user_id", str(current_user.id)).maybe_single())
         
         customer_id = None
         if result.data and result.data.get("customer_id"):
             customer_id = result.data["customer_id"]
         else:
             # Try to find customer_id from Polar using email
-            async with httpx.AsyncClient(follow_redirects=True) as client:
-                customers_response = await client.get(
-                    f"{POLAR_API_URL}customers",
-                    headers={
-                        "Authorization": f"Bearer {POLAR_ACCESS_TOKEN}",
-                    },
-                    params={"email": current_user.email}
-                )
-                
-                if customers_response.status_code == 200:
-                    customers_data = customers_response.json()
-                    if customers_data.get("items") and len(customers_data["items"]) > 0:
-                        customer_id = customers_data["items"][0]["id"]
-                        
-                        # Update the subscription_status table with the customer_id
-                        supabase.table("subscription_status").update({
-                            "customer_id": customer_id,
-                            "updated_at": datetime.utcnow().isoformat()
-                        }).eq("user_id", str(current_user.id)).execute()
-                        logger.info(f"Updated customer_id for user {current_user.id}")
-                
-                if not customer_id:
-                    raise HTTPException(status_code=404, detail="No customer found for this email")
-        
-        logger.info(f"Creating customer session for customer_id: {customer_id}")
-        
-        # Create a customer session with Polar
-        async with httpx.AsyncClient(follow_redirects=True) as client:
-            response = await client.post(
-                f"{POLAR_API_URL}customer-sessions",
+            client = get_httpx_client()
+            customers_response = await client.get(
+                f"{POLAR_API_URL}customers",
                 headers={
                     "Authorization": f"Bearer {POLAR_ACCESS_TOKEN}",
-                    "Content-Type": "application/json"
                 },
-                json={"customer_id": customer_id}
+                params={"email": current_user.email}
             )
             
-            if response.status_code != 201:
-                logger.error(f"Failed to create customer session: {response.text}")
-                raise HTTPException(status_code=500, detail="Failed to create customer portal session")
-            
-            session_data = response.json()
-            return {"customer_portal_url": session_data.get("customer_portal_url")}
+            if customers_response.status_code == 200:
+                customers_data = customers_response.json()
+                if customers_data.get("items") and len(customers_data["items"]) > 0:
+                    customer_id = customers_data["items"][0]["id"]
+                    
+                    # Update the subscription_status table with the customer_id
+                    await run_query(supabase.table("subscription_status").update({
+                        "customer_id": customer_id,
+                        "updated_at": datetime.utcnow().isoformat()
+                    }).eq("user_id", str(current_user.id)))
+                    await invalidate_entitlement(current_user.id)
+                    logger.info(f"Updated customer_id for user {current_user.id}")
             
+            if not customer_id:
+                raise HTTPException(status_code=404, detail="No customer found for this email")
+        
+        logger.info(f"Creating customer session for customer_id: {customer_id}")
+        
+        # Create a customer session with Polar
+        client = get_httpx_client()
+        response = await client.post(
+            f"{POLAR_API_URL}customer-sessions",
+            headers={
+                "Authorization": f"Bearer {POLAR_ACCESS_TOKEN}",
+                "Content-Type": "application/json"
+            },
+            json={"customer_id": customer_id}
+        )
+        
+        if response.status_code != 201:
+            logger.error(f"Failed to create customer session: {response.text}")
+            raise HTTPException(status_code=500, detail="Failed to create customer portal session")
+        
+        session_data = response.json()
+        return {"customer_portal_url": session_data.get("customer_portal_url")}
+        
     except HTTPException:
         raise
     except Exception as e:
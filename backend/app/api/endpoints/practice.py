@@ -3,13 +3,17 @@ from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional
 from uuid import UUID
 
-from app.agents.curriculum_agent import CurriculumAgent
+from app.agents.curriculum_agent import curriculum_agent
 from app.api.dependencies import require_subscription
 from app.core.auth import get_current_user
 from app.core.config import settings
-from app.db.supabase_client import get_supabase_client
+from app.core.etag import (compute_etag, conditional_json, etag_matches,
+                           not_modified)
+from app.db.supabase_client import get_supabase_client, run_query
 from app.models.user import AuthenticatedUser
-from fastapi import APIRouter, Depends, HTTPException
+from app.services.chat_context import truncate_to_tokens
+from app.services.lesson_text import get_lesson_text, plain_text
+from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import BaseModel
 
 router = APIRouter()
@@ -18,7 +22,7 @@ class GeneratePracticeRequest(BaseModel):
     curriculum_id: UUID
     day_id: UUID
     day_title: str
-    day_content: str
+    day_content: Optional[str] = None  # Only used if the stored lesson text is unavailable
     learning_goal: str
     difficulty_level: str
     num_problems: int = 3
@@ -57,18 +61,24 @@ async def generate_practice_problems(
     supabase = get_supabase_client()
     
     # Verify user has access to this curriculum
-    curriculum_check = supabase.table("curricula").select("id").eq("id", str(request.curriculum_id)).eq("user_id", str(current_user.id)).single().execute()
+    curriculum_check = await run_query(supabase.table("curricula").select("id").eq("id", str(request.curriculum_id)).eq("user_id", str(current_user.id)).single())
     if not curriculum_check.data:
         raise HTTPException(status_code=403, detail="You don't have access to this curriculum")
     
-    # Create agent and generate problems
-    agent = CurriculumAgent()
+    # Prefer the lesson text flattened at write time over the client's copy of the document
+    lesson = await get_lesson_text(str(request.curriculum_id), day_id=str(request.day_id))
+    if lesson and lesson["text"]:
+        day_content = truncate_to_tokens(lesson["text"], settings.chat_lesson_budget_tokens)
+    elif request.day_content:
+        day_content = truncate_to_tokens(plain_text(request.day_content), settings.chat_lesson_budget_tokens)
+    else:
+        raise HTTPException(status_code=404, detail="Lesson content not found for this day")
     
     try:
         # Use the agent to generate practice problems
-        problems_data = await agent.generate_practice_problems(
+        problems_data = await curriculum_agent.generate_practice_problems(
             day_title=request.day_title,
-            day_content=request.day_content,
+            day_content=day_content,
             learning_goal=request.learning_goal,
             difficulty_level=request.difficulty_level,
             num_problems=request.num_problems
@@ -83,7 +93,7 @@ async def generate_practice_problems(
             "responses": []
         }
         
-        session_result = supabase.table("practice_sessions").insert(session_data).execute()
+        session_result = await run_query(supabase.table("practice_sessions").insert(session_data))
         session = session_result.data[0]
         
         # Convert to response format
@@ -106,7 +116,7 @@ async def submit_practice_responses(
     supabase = get_supabase_client()
     
     # Get the practice session
-    session_result = supabase.table("practice_sessions").select("*").eq("id", str(request.session_id)).eq("user_id", str(current_user.id)).single().execute()
+    session_result = await run_query(supabase.table("practice_sessions").select("*").eq("id", str(request.session_id)).eq("user_id", str(current_user.id)).single())
     if not session_result.data:
         raise HTTPException(status_code=404, detail="Practice session not found")
     
@@ -158,18 +168,18 @@ async def submit_practice_responses(
         "completed_at": datetime.now(timezone.utc).isoformat()
     }
     
-    supabase.table("practice_sessions").update(update_data).eq("id", str(request.session_id)).execute()
+    await run_query(supabase.table("practice_sessions").update(update_data).eq("id", str(request.session_id)))
     
     # Update practice history for concept mastery tracking
     for concept in set(concepts_correct):
         # Check if user has history for this concept
-        history_check = supabase.table("practice_history").select("*").eq("user_id", str(current_user.id)).eq("concept", concept).execute()
+        history_check = await run_query(supabase.table("practice_history").select("*").eq("user_id", str(current_user.id)).eq("concept", concept))
         
         if history_check.data:
             # Update existing mastery level (increment by 1, max 10)
             current_level = history_check.data[0]["mastery_level"]
             new_level = min(current_level + 1, 10)
-            supabase.table("practice_history").update({"mastery_level": new_level}).eq("id", history_check.data[0]["id"]).execute()
+            await run_query(supabase.table("practice_history").update({"mastery_level": new_level}).eq("id", history_check.data[0]["id"]))
         else:
             # Create new history entry
             history_data = {
@@ -178,16 +188,16 @@ async def submit_practice_responses(
                 "concept": concept,
                 "mastery_level": 1
             }
-            supabase.table("practice_history").insert(history_data).execute()
+            await run_query(supabase.table("practice_history").insert(history_data))
     
     # Decrease mastery for incorrect concepts
     for concept in set(concepts_incorrect):
-        history_check = supabase.table("practice_history").select("*").eq("user_id", str(current_user.id)).eq("concept", concept).execute()
+        history_check = await run_query(supabase.table("practice_history").select("*").eq("user_id", str(current_user.id)).eq("concept", concept))
         
         if history_check.data:
             current_level = history_check.data[0]["mastery_level"]
             new_level = max(current_level - 1, 0)
-            supabase.table("practice_history").update({"mastery_level": new_level}).eq("id", history_check.data[0]["id"]).execute()
+            await run_query(supabase.table("practice_history").update({"mastery_level": new_level}).eq("id", history_check.data[0]["id"]))
     
     return SubmitResponseResponse(
         score=score,
@@ -200,20 +210,24 @@ async def submit_practice_responses(
 @router.get("/history/{curriculum_id}")
 async def get_practice_history(
     curriculum_id: UUID,
+    request: Request,
     current_user: AuthenticatedUser = Depends(require_subscription)
 ):
     """Get practice history for a curriculum"""
     supabase = get_supabase_client()
     
     # Get all practice sessions for this curriculum
-    sessions_result = supabase.table("practice_sessions").select("*").eq("user_id", str(current_user.id)).eq("curriculum_id", str(curriculum_id)).order("created_at", desc=True).execute()
+    sessions_result = await run_query(supabase.table("practice_sessions").select("*").eq("user_id", str(current_user.id)).eq("curriculum_id", str(curriculum_id)).order("created_at", desc=True))
     
     # Get concept mastery levels
-    mastery_result = supabase.table("practice_history").select("*").eq("user_id", str(current_user.id)).execute()
+    mastery_result = await run_query(supabase.table("practice_history").select("*").eq("user_id", str(current_user.id)))
     
     mastery_map = {item["concept"]: item["mastery_level"] for item in mastery_result.data}
+    etag = compute_etag(sessions_result.data, mastery_map)
+    if etag_matches(request, etag):
+        return not_modified(etag)
     
-    return {
+    return conditional_json(request, {
         "sessions": sessions_result.data,
         "concept_mastery": mastery_map
-    } 
\ No newline at end of file
+    }, etag=etag) 
\ No newline at end of file
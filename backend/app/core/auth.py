@@ -1,36 +1,152 @@
-import traceback
+import asyncio
+import hashlib
+import logging
+import time
 from typing import Any, Dict, Optional
 
-from app.db.supabase_client import supabase
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.http_client import get_httpx_client
+from app.core.log import get_logger
+from app.db.supabase_client import run_auth, supabase
 from app.models.user import AuthenticatedUser
 from fastapi import HTTPException, Request, status
+from jose import jwt
+from jose.exceptions import ExpiredSignatureError, JWTClaimsError, JWTError
+
+logger = get_logger(__name__)
 
 # Correctly attempt to import AuthApiError for Supabase/GoTrue auth errors
 try:
     from gotrue.errors import AuthApiError
 except ImportError:
-    print("[AUTH DEBUG] gotrue.errors.AuthApiError not found. Supabase auth error handling will use a generic Exception for GoTrue errors.")
+    logger.warning("gotrue.errors.AuthApiError not found; GoTrue errors will be handled as generic exceptions")
     # Fallback to generic Exception if AuthApiError is not available in the installed gotrue version
     AuthApiError = Exception 
 
 
+# Recently verified tokens, keyed by SHA-256 of the raw token
+_token_cache = TTLCache(maxsize=settings.auth_token_cache_size)
+
+# Supabase signing keys (asymmetric JWT projects), keyed by "kid"
+_jwks: Dict[str, Dict[str, Any]] = {}
+_jwks_fetched_at = 0.0
+_jwks_lock = asyncio.Lock()
+# Don't hammer the JWKS endpoint when tokens carry an unknown kid
+_JWKS_MIN_REFRESH_SECONDS = 30.0
+
+
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _cache_ttl(exp: Optional[float]) -> float:
+    """Cache for the configured TTL, but never past the token's own expiry."""
+    ttl = settings.auth_token_cache_ttl_seconds
+    if exp:
+        ttl = min(ttl, exp - time.time())
+    return ttl
+
+
+async def _get_jwk(kid: str) -> Optional[Dict[str, Any]]:
+    """Return the JWKS entry for ``kid``, refreshing the key set when needed."""
+    global _jwks, _jwks_fetched_at
+    age = time.monotonic() - _jwks_fetched_at
+    if kid in _jwks and age < settings.auth_jwks_ttl_seconds:
+        return _jwks[kid]
+    if _jwks_fetched_at and age < _JWKS_MIN_REFRESH_SECONDS:
+        return _jwks.get(kid)
+
+    async with _jwks_lock:
+        # Another request may have refreshed while we waited
+        age = time.monotonic() - _jwks_fetched_at
+        if not _jwks_fetched_at or age >= _JWKS_MIN_REFRESH_SECONDS:
+            try:
+                client = get_httpx_client()
+                response = await client.get(
+                    f"{settings.supabase_url.rstrip('/')}/auth/v1/.well-known/jwks.json",
+                    headers={"apikey": settings.supabase_anon_key},
+                    timeout=5.0,
+                )
+                response.raise_for_status()
+                _jwks = {key["kid"]: key for key in response.json().get("keys", []) if key.get("kid")}
+            except Exception as e:
+                logger.warning("Failed to fetch Supabase JWKS: %s", e)
+            _jwks_fetched_at = time.monotonic()
+    return _jwks.get(kid)
+
+
+async def _verify_token_locally(token: str) -> Optional[Dict[str, Any]]:
+    """Validate signature, expiry and audience without calling GoTrue.
+
+    Returns the token claims, or None when no local key is available for the
+    token (no JWT secret configured, or an unknown signing key). Raises a 401
+    when the token is definitively invalid.
+    """
+    try:
+        header = jwt.get_unverified_header(token)
+    except JWTError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Malformed token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    alg = header.get("alg")
+    if alg == "HS256":
+        key: Any = settings.supabase_jwt_secret
+    elif alg in ("RS256", "ES256") and header.get("kid"):
+        key = await _get_jwk(header["kid"])
+    else:
+        key = None
+    if not key:
+        return None
+
+    try:
+        return jwt.decode(
+            token,
+            key,
+            algorithms=[alg],
+            audience=settings.supabase_jwt_audience,
+        )
+    except ExpiredSignatureError:
+        detail = "Token has expired"
+    except JWTClaimsError as e:
+        detail = f"Invalid token claims: {e}"
+    except JWTError as e:
+        detail = f"Invalid token: {e}"
+    raise HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def _user_from_claims(claims: Dict[str, Any]) -> Optional[AuthenticatedUser]:
+    if not claims.get("sub") or not claims.get("email"):
+        return None
+    return AuthenticatedUser(
+        id=claims["sub"],
+        email=claims["email"],
+        metadata=claims.get("user_metadata") or {},
+    )
+
+
 async def get_current_user(request: Request) -> AuthenticatedUser:
     """Get the current authenticated user from Supabase auth token (header or query param)."""
-    print(f"---- [AUTH DEBUG] get_current_user called for path: {request.url.path} ----")
     token: Optional[str] = None
     auth_header = request.headers.get("Authorization")
-    print(f"[AUTH DEBUG] Raw Authorization header: {auth_header}")
+    debug = logger.isEnabledFor(logging.DEBUG)
 
     if auth_header and auth_header.startswith("Bearer "):
         token = auth_header.split(" ")[1]
-        print(f"[AUTH DEBUG] Token found in Authorization header.")
+        token_source = "header"
     else:
-        print("[AUTH DEBUG] Authorization header missing or not Bearer. Checking query parameters for 'token'...")
         token = request.query_params.get("token")
-        if token:
-            print(f"[AUTH DEBUG] Token found in query parameters.")
-        else:
-            print("[AUTH DEBUG] Token not found in header or query parameters.")
+        token_source = "query"
+        if not token:
+            if debug:
+                logger.debug("No auth token in header or query", extra={"path": request.url.path})
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Missing authentication token in header or query parameter",
@@ -38,23 +154,32 @@ async def get_current_user(request: Request) -> AuthenticatedUser:
             )
 
     if not token:
-        print("[AUTH DEBUG] Token is effectively empty.") # Should be caught by above
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Empty token provided",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
-    print(f"[AUTH DEBUG] Extracted token (first 20 chars): {token[:20]}...")
+
+    cache_key = _token_key(token)
+    cached_user = _token_cache.get(cache_key)
+    if cached_user is not None:
+        return cached_user
+
+    claims = await _verify_token_locally(token)
+    if claims is not None:
+        user = _user_from_claims(claims)
+        if user is not None:
+            _token_cache.set(cache_key, user, ttl=_cache_ttl(claims.get("exp")))
+            return user
 
     try:
-        print("[AUTH DEBUG] Calling supabase.auth.get_user(token)...")
-        user_response = supabase.auth.get_user(token)
+        if debug:
+            logger.debug("Verifying token with Supabase auth", extra={"path": request.url.path, "token_source": token_source})
+        user_response = await run_auth(supabase.auth.get_user, token)
         
         # Check presence of user and error attributes more safely
         has_user = hasattr(user_response, 'user') and user_response.user is not None
         has_error = hasattr(user_response, 'error') and user_response.error is not None
-        print(f"[AUTH DEBUG] Supabase auth.get_user response: User present: {has_user}, Error present: {has_error}")
 
         if has_error: # If an error attribute exists and is not None
             error_obj = user_response.error
@@ -63,14 +188,14 @@ async def get_current_user(request: Request) -> AuthenticatedUser:
             if not isinstance(error_status, int):
                  error_status = status.HTTP_401_UNAUTHORIZED
 
-            print(f"[AUTH DEBUG] Supabase auth.get_user returned an error object: {error_message} (Status: {error_status})")
+            logger.info("Supabase rejected token: %s", error_message, extra={"status": error_status})
             raise HTTPException(
                 status_code=error_status,
                 detail=f"Token validation error: {error_message}"
             )
 
         if not has_user: # If no error, user must be present
-            print("[AUTH DEBUG] No error from Supabase, but no user object returned.")
+            logger.info("Supabase returned no user for token")
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid token or user not found (no user data after successful call)",
@@ -78,25 +203,32 @@ async def get_current_user(request: Request) -> AuthenticatedUser:
         
         user_obj = user_response.user
         if not all(hasattr(user_obj, attr) and getattr(user_obj, attr) is not None for attr in ['id', 'email']):
-            print(f"[AUTH DEBUG] User data from token is incomplete. ID: {getattr(user_obj, 'id', 'MISSING')}, Email: {getattr(user_obj, 'email', 'MISSING')}")
+            logger.info("User data from token is incomplete", extra={"user_id": str(getattr(user_obj, "id", None))})
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="User data from token is incomplete",
             )
 
-        print(f"[AUTH DEBUG] User successfully authenticated: {user_obj.email} (ID: {user_obj.id})")
-        return AuthenticatedUser(
+        if debug:
+            logger.debug("Authenticated via Supabase", extra={"user_id": str(user_obj.id)})
+        user = AuthenticatedUser(
             id=user_obj.id, 
             email=user_obj.email, 
             metadata=user_obj.user_metadata or {}
         )
+        try:
+            exp = jwt.get_unverified_claims(token).get("exp")
+        except JWTError:
+            exp = None
+        _token_cache.set(cache_key, user, ttl=_cache_ttl(exp))
+        return user
     # Specific handling for GoTrue/Auth API errors
     except AuthApiError as e: 
         error_status = getattr(e, 'status', status.HTTP_401_UNAUTHORIZED)
         if not isinstance(error_status, int):
             error_status = status.HTTP_401_UNAUTHORIZED
         error_message = getattr(e, 'message', str(e))
-        print(f"[AUTH DEBUG] GoTrue AuthApiError in get_current_user: Status: {error_status}, Message: {error_message}")
+        logger.info("GoTrue AuthApiError: %s", error_message, extra={"status": error_status})
         raise HTTPException(
             status_code=error_status,
             detail=f"Token validation failed (Auth Error): {error_message}",
@@ -106,8 +238,7 @@ async def get_current_user(request: Request) -> AuthenticatedUser:
         raise e
     # Catch any other unexpected exceptions during the auth process
     except Exception as e:
-        print(f"[AUTH DEBUG] Generic exception in get_current_user: {type(e).__name__} - {str(e)}")
-        traceback.print_exc()
+        logger.exception("Unexpected error verifying token")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=f"Invalid or expired token (Unexpected error: {type(e).__name__})",
@@ -19,6 +19,12 @@ class Settings(BaseSettings):
     supabase_service_key: str = Field(..., env="SUPABASE_SERVICE_KEY")
     supabase_jwt_secret: Optional[str] = Field(None, env="SUPABASE_JWT_SECRET")
     supabase_cron_secret: Optional[str] = Field(None, env="SUPABASE_CRON_SECRET")
+    supabase_jwt_audience: str = Field("authenticated", env="SUPABASE_JWT_AUDIENCE")
+    
+    # Auth token verification
+    auth_token_cache_size: int = Field(10000, env="AUTH_TOKEN_CACHE_SIZE")
+    auth_token_cache_ttl_seconds: float = Field(300.0, env="AUTH_TOKEN_CACHE_TTL_SECONDS")
+    auth_jwks_ttl_seconds: float = Field(600.0, env="AUTH_JWKS_TTL_SECONDS")
     
     # API Keys
     openrouter_api_key: Optional[str] = Field(None, env="OPENROUTER_API_KEY")
@@ -34,6 +40,30 @@ class Settings(BaseSettings):
     # Redis
     redis_url: str = Field("redis://localhost:6379/0", env="REDIS_URL")
     
+    # Subscription entitlement cache (seconds)
+    entitlement_cache_ttl_seconds: int = Field(300, env="ENTITLEMENT_CACHE_TTL_SECONDS")
+    entitlement_negative_ttl_seconds: int = Field(60, env="ENTITLEMENT_NEGATIVE_TTL_SECONDS")
+    entitlement_lock_seconds: int = Field(10, env="ENTITLEMENT_LOCK_SECONDS")
+    
+    # Background job queue (curriculum generation worker)
+    job_queue_enabled: bool = Field(True, env="JOB_QUEUE_ENABLED")
+    job_queue_prefix: str = Field("jobs", env="JOB_QUEUE_PREFIX")
+    job_worker_concurrency: int = Field(2, env="JOB_WORKER_CONCURRENCY")
+    job_lease_seconds: float = Field(60.0, env="JOB_LEASE_SECONDS")
+    job_heartbeat_seconds: float = Field(15.0, env="JOB_HEARTBEAT_SECONDS")
+    job_max_attempts: int = Field(3, env="JOB_MAX_ATTEMPTS")
+    job_queue_poll_seconds: float = Field(1.0, env="JOB_QUEUE_POLL_SECONDS")
+    
+    # Outbound HTTP connection pool
+    http_pool_max_connections: int = Field(100, env="HTTP_POOL_MAX_CONNECTIONS")
+    http_pool_max_per_host: int = Field(20, env="HTTP_POOL_MAX_PER_HOST")
+    http_pool_max_keepalive: int = Field(20, env="HTTP_POOL_MAX_KEEPALIVE")  # idle httpx connections kept, pool-wide
+    http_pool_keepalive_seconds: float = Field(30.0, env="HTTP_POOL_KEEPALIVE_SECONDS")
+    
+    # Thread pools for blocking Supabase / SDK calls
+    db_executor_workers: int = Field(16, env="DB_EXECUTOR_WORKERS")
+    sdk_executor_workers: int = Field(8, env="SDK_EXECUTOR_WORKERS")
+    
     # Frontend
     frontend_url: str = Field("http://localhost:5173", env="FRONTEND_URL")
     
@@ -53,6 +83,23 @@ class Settings(BaseSettings):
     
     # Monitoring
     sentry_dsn: Optional[str] = Field(None, env="SENTRY_DSN")
+    metrics_enabled: bool = Field(True, env="METRICS_ENABLED")
+    metrics_token: Optional[str] = Field(None, env="METRICS_TOKEN")  # /api/metrics requires "Bearer <token>"; without it the route only serves in development
+    metrics_max_series: int = Field(500, env="METRICS_MAX_SERIES")  # label combinations per metric
+    
+    # Logging
+    log_level: str = Field("INFO", env="LOG_LEVEL")
+    log_levels: str = Field("", env="LOG_LEVELS")  # per-module overrides, e.g. "app.core.auth=DEBUG,app.agents=INFO"
+    log_format: str = Field("text", env="LOG_FORMAT")  # "text" or "json"
+    log_queue_size: int = Field(10000, env="LOG_QUEUE_SIZE")  # records buffered before new ones are dropped
+    log_sample_every: int = Field(50, env="LOG_SAMPLE_EVERY")  # per-chunk/per-row debug records: log 1 in N
+    
+    # Raw LLM output archive (see app/services/llm_archive.py)
+    llm_archive_enabled: bool = Field(True, env="LLM_ARCHIVE_ENABLED")
+    llm_archive_dir: str = Field("llm_archive", env="LLM_ARCHIVE_DIR")
+    llm_archive_max_segment_bytes: int = Field(20 * 1024 * 1024, env="LLM_ARCHIVE_MAX_SEGMENT_BYTES")
+    llm_archive_rotate_seconds: float = Field(24 * 3600, env="LLM_ARCHIVE_ROTATE_SECONDS")
+    llm_archive_max_segments: int = Field(30, env="LLM_ARCHIVE_MAX_SEGMENTS")  # compressed segments kept
     
     # Payments
     polar_access_token: Optional[str] = Field(None, env="POLAR_ACCESS_TOKEN")
@@ -61,6 +108,61 @@ class Settings(BaseSettings):
     
     # LLM Providers
     gemini_api_key: Optional[str] = Field(None, env="GEMINI_API_KEY")
+    # OpenAI-compatible Gemini endpoint; point at a local stand-in for benchmarks
+    gemini_base_url: str = Field("https://generativelanguage.googleapis.com/v1beta/openai", env="GEMINI_BASE_URL")
+    
+    # Agent research tools (seconds)
+    tool_timeout_seconds: float = Field(20.0, env="TOOL_TIMEOUT_SECONDS")
+    tools_total_budget_seconds: float = Field(45.0, env="TOOLS_TOTAL_BUDGET_SECONDS")
+    
+    # Research tool result cache (per-tool TTLs live next to each tool)
+    research_cache_enabled: bool = Field(True, env="RESEARCH_CACHE_ENABLED")
+    research_cache_max_entries: int = Field(2048, env="RESEARCH_CACHE_MAX_ENTRIES")
+    research_cache_max_value_bytes: int = Field(262144, env="RESEARCH_CACHE_MAX_VALUE_BYTES")
+    
+    # Chat history: older turns are folded into a running summary
+    chat_summary_trigger_messages: int = Field(40, env="CHAT_SUMMARY_TRIGGER_MESSAGES")
+    chat_summary_keep_recent: int = Field(20, env="CHAT_SUMMARY_KEEP_RECENT")
+    
+    # Lesson chat agent (/api/chat/lc_stream); executors are shared per configuration
+    agent_warmup_enabled: bool = Field(True, env="AGENT_WARMUP_ENABLED")  # build agents in the background at startup
+    chat_agent_model: str = Field("gemini-2.5-pro", env="CHAT_AGENT_MODEL")
+    chat_agent_temperature: float = Field(0.7, env="CHAT_AGENT_TEMPERATURE")
+    chat_agent_max_iterations: int = Field(6, env="CHAT_AGENT_MAX_ITERATIONS")
+    
+    # Chat prompt budgets (estimated tokens)
+    chat_context_budget_tokens: int = Field(16000, env="CHAT_CONTEXT_BUDGET_TOKENS")
+    chat_lesson_budget_tokens: int = Field(8000, env="CHAT_LESSON_BUDGET_TOKENS")
+    chat_history_budget_tokens: int = Field(6000, env="CHAT_HISTORY_BUDGET_TOKENS")
+    chat_summary_budget_tokens: int = Field(600, env="CHAT_SUMMARY_BUDGET_TOKENS")
+    chat_tool_output_budget_tokens: int = Field(3000, env="CHAT_TOOL_OUTPUT_BUDGET_TOKENS")
+    
+    # Per-worker cache of flattened lesson text (chat, practice)
+    lesson_text_cache_max_curricula: int = Field(512, env="LESSON_TEXT_CACHE_MAX_CURRICULA")
+    lesson_text_cache_ttl_seconds: int = Field(300, env="LESSON_TEXT_CACHE_TTL_SECONDS")
+    
+    # Per-worker cache of encoded day responses, keyed by a hash of the day row
+    day_body_cache_max_entries: int = Field(512, env="DAY_BODY_CACHE_MAX_ENTRIES")
+    
+    # Curriculum generation: outline pass, then day bodies in parallel chunks
+    staged_generation_enabled: bool = Field(True, env="STAGED_GENERATION_ENABLED")
+    curriculum_chunk_days: int = Field(7, env="CURRICULUM_CHUNK_DAYS")
+    curriculum_generation_concurrency: int = Field(4, env="CURRICULUM_GENERATION_CONCURRENCY")
+    curriculum_chunk_attempts: int = Field(3, env="CURRICULUM_CHUNK_ATTEMPTS")
+    curriculum_outline_timeout_seconds: float = Field(180.0, env="CURRICULUM_OUTLINE_TIMEOUT_SECONDS")
+    curriculum_chunk_timeout_seconds: float = Field(600.0, env="CURRICULUM_CHUNK_TIMEOUT_SECONDS")
+    sse_keepalive_seconds: float = Field(15.0, env="SSE_KEEPALIVE_SECONDS")
+    generation_status_ttl_seconds: int = Field(3600, env="GENERATION_STATUS_TTL_SECONDS")
+    
+    # Curriculum template cache: reuse finished curricula for near-identical requests
+    template_cache_enabled: bool = Field(True, env="TEMPLATE_CACHE_ENABLED")
+    template_cache_store: str = Field("memory", env="TEMPLATE_CACHE_STORE")  # "memory" or "qdrant"
+    template_cache_collection: str = Field("curriculum_templates", env="TEMPLATE_CACHE_COLLECTION")
+    template_cache_embedding_model: str = Field("text-embedding-004", env="TEMPLATE_CACHE_EMBEDDING_MODEL")
+    template_cache_clone_threshold: float = Field(0.97, env="TEMPLATE_CACHE_CLONE_THRESHOLD")
+    template_cache_warm_start_threshold: float = Field(0.88, env="TEMPLATE_CACHE_WARM_START_THRESHOLD")
+    template_cache_max_entries: int = Field(500, env="TEMPLATE_CACHE_MAX_ENTRIES")
+    template_cache_ttl_days: int = Field(30, env="TEMPLATE_CACHE_TTL_DAYS")
     
     # CORS - store as string from env, parse into list
     cors_origins_env_str: str = Field("https://onemonth.dev,http://localhost:5173,http://127.0.0.1:5173", alias="CORS_ORIGINS")
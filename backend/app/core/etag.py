@@ -0,0 +1,73 @@
+"""Strong ETags and conditional GET for JSON read endpoints.
+
+Responses carry an ``ETag`` and ``Cache-Control: private, no-cache``, so
+browsers keep a copy but revalidate it on every use. A request whose
+``If-None-Match`` names the current tag gets an empty ``304 Not Modified``:
+
+    return conditional_json(request, payload)              # tag = hash of the body
+    return conditional_json(request, payload, etag=tag)    # tag computed by the caller
+
+Endpoints tag the raw rows they loaded so a 304 skips model validation and
+encoding. Where a cheap watermark exists (e.g. a message count), they check
+it first when the request carries ``If-None-Match`` and return
+``not_modified`` without loading the rows at all.
+"""
+
+import hashlib
+from typing import Any, Optional
+
+from app.core.serialization import dumps, dumps_canonical
+from fastapi import Request, Response
+
+CACHE_CONTROL = "private, no-cache"
+
+
+def _tag_bytes(part: Any) -> bytes:
+    if isinstance(part, bytes):
+        return part
+    if isinstance(part, str):
+        return part.encode()
+    return dumps_canonical(part)
+
+
+def compute_etag(*parts: Any) -> str:
+    """Strong, quoted entity tag over ``parts``.
+
+    Bytes and strings are hashed as-is; anything else (rows straight from
+    Supabase, watermark tuples, query parameters) as canonical JSON, which is
+    much cheaper than validating and encoding the response models.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(_tag_bytes(part))
+        digest.update(b"\0")
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether ``If-None-Match`` names ``etag`` (weak comparison, as RFC 9110 specifies for GET)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in {tag.strip().removeprefix("W/") for tag in header.split(",")}
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+
+def conditional_json(request: Request, content: Any, etag: Optional[str] = None) -> Response:
+    """``content`` as JSON with an ETag, or 304 if the client's copy is current.
+
+    ``content`` may be bytes that are already encoded JSON.
+    """
+    if etag is not None and etag_matches(request, etag):
+        return not_modified(etag)
+    body = content if isinstance(content, bytes) else dumps(content)
+    if etag is None:
+        etag = compute_etag(body)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+    return Response(body, media_type="application/json", headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
@@ -0,0 +1,54 @@
+"""Bounded thread pools for blocking calls made from async handlers.
+
+The Supabase client and several third-party SDKs (Resend, youtube-search,
+arxiv, wikipedia-api) are synchronous. Calling them directly inside an
+``async def`` blocks the event loop for every request on the worker, so they
+are run here instead. Each pool has its own size limit so a burst of slow
+scrapes cannot starve database access, and vice versa.
+"""
+
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, TypeVar
+
+from app.core.config import settings
+
+T = TypeVar("T")
+
+# Pool name -> max worker threads
+_POOL_SIZES: Dict[str, Callable[[], int]] = {
+    "db": lambda: settings.db_executor_workers,
+    "sdk": lambda: settings.sdk_executor_workers,
+}
+
+_executors: Dict[str, ThreadPoolExecutor] = {}
+
+
+def _get_executor(pool: str) -> ThreadPoolExecutor:
+    executor = _executors.get(pool)
+    if executor is None:
+        if pool not in _POOL_SIZES:
+            raise ValueError(f"Unknown executor pool: {pool}")
+        executor = ThreadPoolExecutor(max_workers=_POOL_SIZES[pool](), thread_name_prefix=f"{pool}-pool")
+        _executors[pool] = executor
+    return executor
+
+
+async def run_blocking(func: Callable[..., T], *args: Any, pool: str = "sdk", **kwargs: Any) -> T:
+    """Run a blocking callable on the named thread pool and await its result.
+
+    Context variables (e.g. the request ID) are copied into the worker thread.
+    """
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    call = functools.partial(ctx.run, func, *args, **kwargs)
+    return await loop.run_in_executor(_get_executor(pool), call)
+
+
+def shutdown_executors() -> None:
+    """Stop all pools (called on application shutdown)."""
+    for executor in _executors.values():
+        executor.shutdown(wait=False, cancel_futures=True)
+    _executors.clear()
@@ -0,0 +1,145 @@
+"""Shared, pooled HTTP clients for outbound integrations.
+
+One ``aiohttp.ClientSession`` (tools, Gemini) and one ``httpx.AsyncClient``
+(Polar) live for the lifetime of the app, so keep-alive connections are
+reused across requests instead of paying DNS/TCP/TLS on every call.
+
+The pool is opened in the FastAPI ``lifespan`` (``app/main.py``). Code that
+runs outside the web app (scripts, background workers) gets a client created
+lazily on first use.
+"""
+
+import asyncio
+from collections import defaultdict
+from typing import Any, Dict, Optional
+
+import aiohttp
+import httpx
+from app.core.config import settings
+
+
+class HTTPClientPool:
+    """Owns the app-wide HTTP clients and their connection-reuse counters."""
+
+    def __init__(self):
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._httpx_client: Optional[httpx.AsyncClient] = None
+        self._httpx_loop: Optional[asyncio.AbstractEventLoop] = None
+        # host -> {"requests": n, "misses": n}; a miss is a request that had to open a new connection
+        self._host_stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {"requests": 0, "misses": 0})
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    async def open(self) -> None:
+        """Create both clients on the running loop (called from lifespan)."""
+        self.session()
+        self.httpx_client()
+
+    async def close(self) -> None:
+        if self._session and not self._session.closed:
+            await self._session.close()
+        if self._httpx_client and not self._httpx_client.is_closed:
+            await self._httpx_client.aclose()
+        self._session = None
+        self._httpx_client = None
+
+    # ------------------------------------------------------------------
+    # Clients
+    # ------------------------------------------------------------------
+    def session(self) -> aiohttp.ClientSession:
+        """Return the shared aiohttp session, creating it if needed."""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            connector = aiohttp.TCPConnector(
+                limit=settings.http_pool_max_connections,
+                limit_per_host=settings.http_pool_max_per_host,
+                keepalive_timeout=settings.http_pool_keepalive_seconds,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                trace_configs=[self._aiohttp_trace_config()],
+            )
+            self._session_loop = loop
+        return self._session
+
+    def httpx_client(self) -> httpx.AsyncClient:
+        """Return the shared httpx client, creating it if needed."""
+        loop = asyncio.get_running_loop()
+        if self._httpx_client is None or self._httpx_client.is_closed or self._httpx_loop is not loop:
+            limits = httpx.Limits(
+                max_connections=settings.http_pool_max_connections,
+                max_keepalive_connections=settings.http_pool_max_keepalive,
+                keepalive_expiry=settings.http_pool_keepalive_seconds,
+            )
+            self._httpx_client = httpx.AsyncClient(
+                limits=limits,
+                follow_redirects=True,
+                event_hooks={"request": [self._httpx_on_request]},
+            )
+            self._httpx_loop = loop
+        return self._httpx_client
+
+    # ------------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------------
+    def _record(self, host: str, field: str) -> None:
+        self._host_stats[host or "unknown"][field] += 1
+
+    def _aiohttp_trace_config(self) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_request_start(session, ctx, params):
+            ctx.host = params.url.host or ""
+            self._record(ctx.host, "requests")
+
+        async def on_connection_create_end(session, ctx, params):
+            self._record(getattr(ctx, "host", ""), "misses")
+
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        return trace_config
+
+    async def _httpx_on_request(self, request: httpx.Request) -> None:
+        host = request.url.host
+        self._record(host, "requests")
+
+        # httpcore reports every new TCP connection through the trace extension;
+        # requests that never open one were served from the keep-alive pool.
+        async def trace(event_name: str, info: Dict[str, Any]) -> None:
+            if event_name == "connection.connect_tcp.complete":
+                self._record(host, "misses")
+
+        request.extensions["trace"] = trace
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-host request counts and connection pool hits/misses."""
+        hosts = {
+            host: {
+                "requests": counts["requests"],
+                "hits": max(counts["requests"] - counts["misses"], 0),
+                "misses": counts["misses"],
+            }
+            for host, counts in self._host_stats.items()
+        }
+        return {
+            "requests": sum(h["requests"] for h in hosts.values()),
+            "hits": sum(h["hits"] for h in hosts.values()),
+            "misses": sum(h["misses"] for h in hosts.values()),
+            "hosts": hosts,
+        }
+
+
+http_pool = HTTPClientPool()
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """Shared aiohttp session for tools and LLM calls. Do not close it."""
+    return http_pool.session()
+
+
+def get_httpx_client() -> httpx.AsyncClient:
+    """Shared httpx client for Polar and other REST calls. Do not close it."""
+    return http_pool.httpx_client()
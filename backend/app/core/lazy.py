@@ -0,0 +1,44 @@
+"""Deferred imports for heavy SDKs.
+
+Several integrations (arXiv, Wikipedia, YouTube search, Resend) are only used
+by a handful of code paths but cost tens to hundreds of milliseconds and
+several MB each to import. ``lazy_import`` returns a stand-in that imports
+the real module the first time one of its attributes is used, so workers
+only pay for what they actually call. Run ``scripts/bench_startup.py`` to see
+what ``app.main`` still imports eagerly.
+"""
+
+import importlib
+from types import ModuleType
+from typing import Any
+
+
+class LazyModule:
+    """Module proxy that imports ``name`` on first attribute access."""
+
+    def __init__(self, name: str):
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_module", None)
+
+    def _load(self) -> ModuleType:
+        module = self._module
+        if module is None:
+            # importlib serialises concurrent first imports behind the import lock
+            module = importlib.import_module(self._name)
+            object.__setattr__(self, "_module", module)
+        return module
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr: str, value: Any) -> None:
+        setattr(self._load(), attr, value)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_import(name: str) -> Any:
+    """Return a proxy for module ``name`` that imports it when first used."""
+    return LazyModule(name)
@@ -0,0 +1,177 @@
+"""Structured, non-blocking logging.
+
+``configure_logging`` routes every stdlib logger through a ``QueueHandler``:
+the request path only formats the record and drops it on an in-memory queue,
+and a ``QueueListener`` thread writes it to stdout. If the queue fills up
+(stdout blocked, log storm) records are dropped and counted instead of
+stalling the event loop.
+
+Levels are configured per module with ``LOG_LEVELS``, e.g.
+``"app.core.auth=DEBUG,app.agents=INFO"`` on top of the root ``LOG_LEVEL``.
+Hot paths guard debug records with ``logger.isEnabledFor(logging.DEBUG)``
+so they cost a cached level check when debug is off, and use ``Sampler``
+for per-chunk/per-row records so enabling debug doesn't flood the output.
+
+``RequestIdMiddleware`` assigns each request an id (or reuses an incoming
+``X-Request-ID``), returns it in the response headers and stores it in a
+context variable that is stamped on every record logged while handling it,
+including from background tasks spawned by the request.
+"""
+
+import contextvars
+import itertools
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+import uuid
+from typing import Dict, Optional
+
+from app.core.config import settings
+
+request_id_var: contextvars.ContextVar[str] = contextvars.ContextVar("request_id", default="-")
+
+# Attributes every LogRecord has; anything else was passed via ``extra=``
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional["_DroppingQueueHandler"] = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(name)
+
+
+def get_request_id() -> str:
+    return request_id_var.get()
+
+
+class Sampler:
+    """Lets one in every ``every`` calls through, for per-chunk/per-row logs."""
+
+    def __init__(self, every: Optional[int] = None):
+        self.every = max(1, every or settings.log_sample_every)
+        self._counter = itertools.count()
+
+    def hit(self) -> bool:
+        return next(self._counter) % self.every == 0
+
+
+class _RequestIdFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, request id, message and ``extra`` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _parse_levels(spec: str) -> Dict[str, str]:
+    levels: Dict[str, str] = {}
+    for item in spec.split(","):
+        name, _, level = item.strip().partition("=")
+        if name and level:
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging() -> None:
+    """Install the queue-backed root handler and per-module levels (idempotent)."""
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+
+    stream = logging.StreamHandler(sys.stdout)
+    if settings.log_format == "json":
+        stream.setFormatter(JsonFormatter())
+    else:
+        stream.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"))
+
+    _queue_handler = _DroppingQueueHandler(queue.Queue(maxsize=settings.log_queue_size))
+    # Stamp the request id before the record leaves the request's context
+    _queue_handler.addFilter(_RequestIdFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    root.setLevel(settings.log_level.upper())
+    for name, level in _parse_levels(settings.log_levels).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, stream, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def logging_stats() -> Dict[str, int]:
+    if _queue_handler is None:
+        return {"queued": 0, "dropped": 0}
+    return {"queued": _queue_handler.queue.qsize(), "dropped": _queue_handler.dropped}
+
+
+class RequestIdMiddleware:
+    """ASGI middleware binding a request id to the logging context."""
+
+    header = b"x-request-id"
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = dict(scope["headers"]).get(self.header, b"").decode("latin-1")
+        # Accept a caller's id only if it's short and printable; otherwise mint one
+        request_id = incoming if incoming and len(incoming) <= 64 and incoming.isprintable() else uuid.uuid4().hex[:16]
+        token = request_id_var.set(request_id)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(self.header, request_id.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_id_var.reset(token)
@@ -0,0 +1,273 @@
+"""In-process Prometheus-style metrics.
+
+A small registry of counters, gauges and histograms rendered in the
+Prometheus text exposition format at ``/api/metrics``. Each worker process
+keeps its own values, so scrape every worker (or aggregate by instance).
+
+Label cardinality is bounded: routes are labelled by their path template,
+never the raw URL, label values are truncated, and once a metric has
+``settings.metrics_max_series`` label combinations further combinations are
+folded into a single ``"other"`` series.
+
+The metrics themselves are defined at the bottom of this module so every
+instrumented hot path (routes, Supabase queries, research tools, Gemini
+calls, generation stages) shares one vocabulary.
+"""
+
+import asyncio
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+SIZE_BUCKETS = (100, 1_000, 4_000, 16_000, 64_000, 256_000, 1_000_000, 4_000_000)
+
+_OVERFLOW = "other"
+_MAX_LABEL_LENGTH = 64
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, ...], object] = {}
+        REGISTRY.register(self)
+
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        key = tuple(str(labels[name])[:_MAX_LABEL_LENGTH] for name in self.labelnames)
+        if key not in self._series and len(self._series) >= settings.metrics_max_series:
+            return tuple(_OVERFLOW for _ in self.labelnames)
+        return key
+
+    def _label_text(self, key: Tuple[str, ...], extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, key))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            series = sorted(self._series.items())
+        for key, value in series:
+            lines.extend(self._render_series(key, value))
+        return lines
+
+    def _render_series(self, key: Tuple[str, ...], value: object) -> List[str]:
+        return [f"{self.name}{self._label_text(key)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels: object) -> None:
+        with self._lock:
+            key = self._key(labels)
+            self._series[key] = self._series.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, amount: float = 1, **labels: object) -> None:
+        with self._lock:
+            key = self._key(labels)
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: object) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: object) -> None:
+        with self._lock:
+            self._series[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def observe(self, value: float, **labels: object) -> None:
+        with self._lock:
+            key = self._key(labels)
+            series = self._series.get(key)
+            if series is None:
+                # [per-bucket counts..., +Inf count], sum
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, **labels: object) -> Iterator[None]:
+        """Observe the duration of the block.
+
+        If the histogram has an ``outcome`` label it is filled in: ``ok``,
+        ``error`` or ``cancelled``.
+        """
+        started = time.perf_counter()
+        outcome = "ok"
+        try:
+            yield
+        except BaseException as e:
+            outcome = "cancelled" if type(e).__name__ == "CancelledError" else "error"
+            raise
+        finally:
+            if "outcome" in self.labelnames:
+                labels["outcome"] = outcome
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _render_series(self, key: Tuple[str, ...], value: object) -> List[str]:
+        counts, total = value
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets + (math.inf,), counts):
+            cumulative += count
+            lines.append(f"{self.name}_bucket{self._label_text(key, ('le', _format_value(bound)))} {cumulative}")
+        lines.append(f"{self.name}_sum{self._label_text(key)} {_format_value(total)}")
+        lines.append(f"{self.name}_count{self._label_text(key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> None:
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
+
+
+class LLMCallMetrics:
+    """Records one Gemini call: latency, time to first token and sizes."""
+
+    def __init__(self, call: str, prompt_chars: int):
+        self.call = call
+        self.started = time.perf_counter()
+        self.first_token_seen = False
+        self.finished = False
+        GEMINI_PROMPT_CHARS.observe(prompt_chars, call=call)
+
+    def first_token(self) -> None:
+        if not self.first_token_seen:
+            self.first_token_seen = True
+            GEMINI_TTFT_SECONDS.observe(time.perf_counter() - self.started, call=self.call)
+
+    def finish(self, status: str, completion_chars: int = 0) -> None:
+        """Record the outcome (``ok``, ``http_<code>``, ``timeout``, ``error``); later calls are ignored."""
+        if self.finished:
+            return
+        self.finished = True
+        GEMINI_REQUEST_SECONDS.observe(time.perf_counter() - self.started, call=self.call, status=status)
+        if status == "ok":
+            GEMINI_COMPLETION_CHARS.observe(completion_chars, call=self.call)
+
+    def failed(self, error: BaseException) -> None:
+        self.finish("timeout" if isinstance(error, asyncio.TimeoutError) else "error")
+
+
+_METHODS = {"GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS"}
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route request metrics.
+
+    Pure ASGI rather than ``@app.middleware("http")`` so streaming responses
+    are timed until their last chunk, not just until the headers go out.
+    Requests that match no route are labelled ``unmatched``.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"] if scope["method"] in _METHODS else "OTHER"
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                HTTP_RESPONSE_START_SECONDS.observe(time.perf_counter() - started, method=method, route=_route(scope))
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            route = _route(scope)
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, method=method, route=route)
+            HTTP_REQUESTS.inc(method=method, route=route, status=status)
+
+
+def _route(scope) -> str:
+    # The router stores the matched route on the (shared) scope
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+# ----------------------------------------------------------------------
+# Metric definitions
+# ----------------------------------------------------------------------
+
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP requests by route template and status", ("method", "route", "status"))
+HTTP_REQUEST_SECONDS = Histogram("http_request_duration_seconds", "Time until the response body completed", ("method", "route"))
+HTTP_RESPONSE_START_SECONDS = Histogram("http_response_start_seconds", "Time until response headers were sent", ("method", "route"))
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "Requests currently being handled", ())
+
+SUPABASE_QUERY_SECONDS = Histogram("supabase_query_duration_seconds", "Supabase (PostgREST/auth) calls", ("table", "operation", "outcome"))
+
+TOOL_CALL_SECONDS = Histogram("agent_tool_duration_seconds", "Research tool calls made by the curriculum agent", ("tool", "outcome"))
+
+GEMINI_REQUEST_SECONDS = Histogram("gemini_request_duration_seconds", "Gemini calls, from request to last token", ("call", "status"))
+GEMINI_TTFT_SECONDS = Histogram("gemini_time_to_first_token_seconds", "Gemini streaming calls, time to first token", ("call",))
+GEMINI_PROMPT_CHARS = Histogram("gemini_prompt_chars", "Prompt size of Gemini calls (characters)", ("call",), buckets=SIZE_BUCKETS)
+GEMINI_COMPLETION_CHARS = Histogram("gemini_completion_chars", "Completion size of successful Gemini calls (characters)", ("call",), buckets=SIZE_BUCKETS)
+
+GENERATION_STAGE_SECONDS = Histogram("generation_stage_duration_seconds", "Curriculum generation stages", ("stage", "outcome"))
+GENERATIONS = Counter("generations_total", "Finished curriculum generations by path and result", ("mode", "result"))
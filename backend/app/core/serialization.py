@@ -0,0 +1,57 @@
+"""JSON encoding for responses and streams.
+
+``dumps`` returns UTF-8 bytes and uses orjson when it is installed, falling
+back to the stdlib encoder otherwise. Pydantic models are encoded by
+pydantic's own (Rust) serializer, so their output matches what FastAPI
+produces for ``response_model`` routes. ``FastJSONResponse`` is the app's
+default response class; routes with a ``response_model`` keep FastAPI's
+direct pydantic-to-bytes path, everything else is rendered through
+``dumps``. Run ``scripts/bench_json.py`` to compare encoders on curriculum
+payloads.
+"""
+
+import json
+from typing import Any
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# orjson >= 3.9.15 can embed already-encoded JSON, which saves nested models
+# a round trip through dicts
+_Fragment = getattr(orjson, "Fragment", None)
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        if _Fragment is not None:
+            return _Fragment(obj.model_dump_json())
+        return obj.model_dump(mode="json")
+    return jsonable_encoder(obj)
+
+
+def dumps(content: Any) -> bytes:
+    """Compact JSON bytes for ``content`` (models, dicts, lists, datetimes, UUIDs, ...)."""
+    if isinstance(content, BaseModel):
+        return content.model_dump_json().encode()
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(jsonable_encoder(content), ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def dumps_canonical(content: Any) -> bytes:
+    """Like ``dumps`` with sorted keys, for hashing; unknown types fall back to ``str``."""
+    if orjson is not None:
+        return orjson.dumps(content, default=str, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS)
+    return json.dumps(content, sort_keys=True, default=str, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
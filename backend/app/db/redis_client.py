@@ -0,0 +1,33 @@
+from typing import Optional
+
+import redis.asyncio as redis
+from app.core.config import settings
+
+# Global Redis client, created in the app lifespan (or lazily by workers/scripts)
+redis_client: Optional[redis.Redis] = None
+
+
+def init_redis() -> redis.Redis:
+    """Create the shared Redis client (connections are opened on first use)."""
+    global redis_client
+    if redis_client is None:
+        redis_client = redis.from_url(settings.redis_url, decode_responses=True)
+    return redis_client
+
+
+async def close_redis() -> None:
+    global redis_client
+    if redis_client is not None:
+        await redis_client.close()
+        redis_client = None
+
+
+def get_redis() -> Optional[redis.Redis]:
+    """Return the shared Redis client, or None if Redis is not configured.
+
+    Callers treat Redis as an optimisation: on None or a RedisError they fall
+    back to the database / upstream API.
+    """
+    if redis_client is None and settings.redis_url:
+        return init_redis()
+    return redis_client
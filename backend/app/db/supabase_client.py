@@ -1,4 +1,8 @@
+from typing import Any, Tuple
+
 from app.core.config import settings
+from app.core.executors import run_blocking
+from app.core.metrics import SUPABASE_QUERY_SECONDS
 from supabase import Client, create_client
 
 
@@ -20,4 +24,39 @@ supabase_anon = get_supabase_anon_client()
 
 def get_supabase():
     """FastAPI dependency that returns the primary Supabase client."""
-    return supabase 
\ No newline at end of file
+    return supabase
+
+
+# Async data access
+#
+# The supabase-py client is synchronous. Build queries as usual, then await
+# them through run_query so the HTTP round trip happens on the bounded "db"
+# thread pool instead of blocking the event loop:
+#
+#     response = await run_query(supabase.table("curricula").select("*").eq("id", curriculum_id))
+
+_OPERATIONS = {"GET": "select", "PATCH": "update", "DELETE": "delete", "POST": "insert"}
+
+
+def _query_labels(query: Any) -> Tuple[str, str]:
+    """(table, operation) of a PostgREST builder, for metrics."""
+    path = str(getattr(query, "path", "") or "").strip("/")
+    if path.startswith("rpc/"):
+        return path[len("rpc/"):], "rpc"
+    operation = _OPERATIONS.get(str(getattr(query, "http_method", "")).upper(), "other")
+    if operation == "insert" and "merge-duplicates" in str(getattr(query, "headers", {}).get("Prefer", "")):
+        operation = "upsert"
+    return path or "unknown", operation
+
+
+async def run_query(query: Any) -> Any:
+    """Execute a PostgREST query builder off the event loop."""
+    table, operation = _query_labels(query)
+    with SUPABASE_QUERY_SECONDS.time(table=table, operation=operation):
+        return await run_blocking(query.execute, pool="db")
+
+
+async def run_auth(func, *args: Any, **kwargs: Any) -> Any:
+    """Call a blocking Supabase auth (GoTrue) method off the event loop."""
+    with SUPABASE_QUERY_SECONDS.time(table="auth", operation=getattr(func, "__name__", "call")):
+        return await run_blocking(func, *args, pool="db", **kwargs)
@@ -1,34 +1,56 @@
-import logging
+import asyncio
+import secrets
 from contextlib import asynccontextmanager
 from typing import Optional
 
-import redis.asyncio as redis
+from app.agents.chat_executor import chat_executor_configs, warm_chat_executors
+from app.agents.curriculum_agent import curriculum_agent
 from app.api.endpoints import polar  # New: webhook endpoint
 from app.api.endpoints import (auth, chat, checkout, curricula, logbook,
                                notifications, practice, users)
 from app.core.config import settings
-from fastapi import FastAPI, Request
+from app.core.executors import shutdown_executors
+from app.core.http_client import http_pool
+from app.core.log import (RequestIdMiddleware, configure_logging, get_logger,
+                          logging_stats, shutdown_logging)
+from app.core.metrics import CONTENT_TYPE, MetricsMiddleware, render_metrics
+from app.core.serialization import FastJSONResponse
+from app.db.redis_client import close_redis, init_redis
+from app.services.job_queue import queue_stats
+from app.services.lesson_text import lesson_text_cache_stats
+from app.services.llm_archive import llm_archive
+from app.services.research_cache import research_cache_stats
+from app.services.template_cache import template_cache_stats
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.responses import RedirectResponse
+from fastapi.responses import PlainTextResponse, RedirectResponse
+
+# Queue-backed structured logging (see app/core/log.py)
+configure_logging()
+logger = get_logger(__name__)
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
 
-# Global Redis client
-redis_client: Optional[redis.Redis] = None
+async def _warm_up_agents() -> None:
+    try:
+        await asyncio.gather(warm_chat_executors(), curriculum_agent.warm_up())
+    except Exception as e:
+        logger.warning(f"Agent warm-up failed: {e}")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manage application lifespan events."""
     # Startup
-    global redis_client
-    redis_client = redis.from_url(settings.redis_url, decode_responses=True)
+    if settings.redis_url:
+        init_redis()
+    
+    # Shared keep-alive connection pools for outbound integrations
+    await http_pool.open()
+    
+    # Build the agents before the first request needs them, without holding up
+    # startup (LangChain/LangGraph are only imported here, on worker threads)
+    warmup = asyncio.create_task(_warm_up_agents()) if settings.agent_warmup_enabled else None
     
     # Initialize Sentry if configured
     if settings.sentry_dsn:
@@ -39,8 +61,13 @@ async def lifespan(app: FastAPI):
     yield
     
     # Shutdown
-    if redis_client:
-        await redis_client.close()
+    if warmup is not None:
+        warmup.cancel()
+    await http_pool.close()
+    shutdown_executors()
+    await close_redis()
+    llm_archive.close()
+    shutdown_logging()
 
 
 # Create FastAPI app
@@ -50,6 +77,7 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/api/docs",
     redoc_url="/api/redoc",
+    default_response_class=FastJSONResponse,
     lifespan=lifespan
 )
 
@@ -93,11 +121,19 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"], # Allows all methods
     allow_headers=["*"], # Allows all headers
+    expose_headers=["X-Request-ID", "ETag"],  # Request id lets the frontend report errors
     # expose_headers=["*"], # Exposing all headers might be too permissive for production
                                # For streaming, specific headers like 'Content-Type' are usually enough
                                # if needed. Often not required if allow_origins is correct.
 )
 
+# Outermost, so route metrics include time spent in the other middleware
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
+# Outermost of all, so every record logged while handling a request carries its id
+app.add_middleware(RequestIdMiddleware)
+
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(users.router, prefix="/api/users", tags=["users"])
@@ -116,10 +152,35 @@ async def health_check():
     return {
         "status": "healthy",
         "environment": settings.environment,
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "http_pool": http_pool.stats(),
+        "job_queue": await queue_stats(),
+        "research_cache": research_cache_stats(),
+        "lesson_text_cache": lesson_text_cache_stats(),
+        "day_body_cache": curricula.day_body_cache_stats(),
+        "chat_executors": chat_executor_configs(),
+        "template_cache": template_cache_stats(),
+        "logging": logging_stats(),
+        "llm_archive": llm_archive.stats()
     }
 
 
+@app.get("/api/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    """Prometheus text-format metrics for this worker process.
+
+    Outside development the endpoint only exists when METRICS_TOKEN is set.
+    """
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not settings.metrics_token:
+        if settings.environment != "development":
+            raise HTTPException(status_code=404, detail="Not Found")
+    elif not secrets.compare_digest(request.headers.get("authorization", ""), f"Bearer {settings.metrics_token}"):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(render_metrics(), media_type=CONTENT_TYPE)
+
+
 # Redirect any mistaken backend success URL to frontend
 @app.get("/api/payment-success")
 async def payment_success_redirect(checkout_id: str | None = None, customer_session_token: str | None = None):
@@ -57,6 +57,8 @@ class CurriculumDay(BaseModel):
     content: Dict[str, Any]  # Rich text content
     resources: List[Dict[str, Any]] = Field(default_factory=list)
     estimated_hours: Optional[float] = None
+    is_project_day: Optional[bool] = False
+    project_data: Optional[Dict[str, Any]] = None
     created_at: datetime
     updated_at: datetime
     
@@ -64,6 +66,24 @@ class CurriculumDay(BaseModel):
         from_attributes = True
 
 
+class CurriculumDaySummary(BaseModel):
+    """A day without its lesson body; fetch the body with GET /days/{day_id}."""
+    id: UUID
+    day_number: int
+    title: str
+    estimated_hours: Optional[float] = None
+    is_project_day: Optional[bool] = False
+    updated_at: Optional[datetime] = None
+    completed: bool = False
+    completed_at: Optional[datetime] = None
+
+
+class CurriculumOverview(BaseModel):
+    curriculum: Curriculum
+    days: List[CurriculumDaySummary] = Field(default_factory=list)
+    completed_days: int = 0
+
+
 class CurriculumDayCreate(BaseModel):
     day_number: int
     title: str
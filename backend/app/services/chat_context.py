@@ -0,0 +1,138 @@
+"""Token-budgeted prompt context for chat turns.
+
+The lesson text and the conversation history each get a share of
+``settings.chat_context_budget_tokens``; research tool output is capped
+separately (``chat_tool_output_budget_tokens``). Lesson sections are ranked
+by overlap with the current question, and the history keeps the newest turns
+that fit; older turns are represented by the session's running summary (see
+``app.services.chat_history``). Token counts are estimates (about four
+characters per token for Gemini on English text), which is close enough for
+budgeting.
+"""
+
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+
+_WORD = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "can", "do", "does", "for", "from", "how", "i",
+    "in", "is", "it", "me", "my", "of", "on", "or", "so", "that", "the", "this", "to", "what", "when",
+    "where", "which", "who", "why", "with", "you", "your",
+}
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / 4) if text else 0
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut ``text`` to roughly ``max_tokens``, marking the cut."""
+    max_chars = max_tokens * 4
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars] + "... (truncated)"
+
+
+def _terms(text: str) -> List[str]:
+    return [word for word in _WORD.findall(text.lower()) if word not in _STOPWORDS and len(word) > 1]
+
+
+def select_lesson_text(sections: List[Dict[str, str]], question: str, budget_tokens: int) -> str:
+    """The lesson sections most relevant to ``question`` that fit the budget, in lesson order."""
+    if not sections:
+        return ""
+    rendered = [
+        (f"## {section['heading']}\n{section['text']}" if section["heading"] else section["text"]).strip()
+        for section in sections
+    ]
+    if sum(estimate_tokens(text) for text in rendered) <= budget_tokens:
+        return "\n\n".join(rendered)
+
+    # Rank sections by idf-weighted overlap with the question; ties keep lesson order
+    query_terms = set(_terms(question))
+    section_terms = [Counter(_terms(text)) for text in rendered]
+    document_frequency = Counter(term for counts in section_terms for term in counts)
+    total = len(rendered)
+
+    def score(index: int) -> float:
+        counts = section_terms[index]
+        return sum(
+            (1 + math.log(counts[term])) * math.log(1 + total / document_frequency[term])
+            for term in query_terms if counts[term]
+        )
+
+    chosen, used = set(), 0
+    for index in sorted(range(total), key=lambda i: (-score(i), i)):
+        cost = estimate_tokens(rendered[index])
+        if used + cost <= budget_tokens:
+            chosen.add(index)
+            used += cost
+    if not chosen:
+        # Even the best section is over budget: include a truncated copy of it
+        best = min(range(total), key=lambda i: (-score(i), i))
+        return truncate_to_tokens(rendered[best], budget_tokens)
+    omitted = total - len(chosen)
+    text = "\n\n".join(rendered[index] for index in sorted(chosen))
+    if omitted:
+        text += f"\n\n({omitted} less relevant section(s) of the lesson omitted)"
+    return text
+
+
+def fit_history(history: List[Dict[str, Any]], budget_tokens: int) -> List[Dict[str, Any]]:
+    """The newest messages whose combined size fits the budget, oldest first."""
+    kept: List[Dict[str, Any]] = []
+    used = 0
+    for message in reversed(history):
+        cost = estimate_tokens(message.get("content") or "") + 4  # role/framing overhead
+        if used + cost > budget_tokens:
+            break
+        kept.append(message)
+        used += cost
+    kept.reverse()
+    return kept
+
+
+def build_chat_context(
+    question: str,
+    lesson_sections: List[Dict[str, str]],
+    history: List[Dict[str, Any]],
+    summary: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Assemble lesson text, history and summary for one chat turn within budget.
+
+    ``lesson_sections`` are the day's ``{"heading", "text"}`` sections (see
+    ``app.services.lesson_text``). Returns ``{"lesson_text", "history",
+    "summary", "dropped_messages", "tokens"}``.
+    The history budget is whatever the lesson leaves unused of the total, capped
+    at ``settings.chat_history_budget_tokens``; the summary is only included
+    when older turns had to be dropped.
+    """
+    total = settings.chat_context_budget_tokens - estimate_tokens(question)
+    lesson_text = select_lesson_text(
+        lesson_sections, question, min(settings.chat_lesson_budget_tokens, max(total, 0))
+    )
+    remaining = total - estimate_tokens(lesson_text)
+    if summary:
+        remaining -= settings.chat_summary_budget_tokens
+
+    kept = fit_history(history, min(settings.chat_history_budget_tokens, max(remaining, 0)))
+    dropped = len(history) - len(kept)
+    # Older turns that didn't fit are represented by the running summary
+    summary_text = truncate_to_tokens(summary, settings.chat_summary_budget_tokens) if summary and dropped else None
+
+    return {
+        "lesson_text": lesson_text,
+        "history": kept,
+        "summary": summary_text,
+        "dropped_messages": dropped,
+        "tokens": {
+            "question": estimate_tokens(question),
+            "lesson": estimate_tokens(lesson_text),
+            "summary": estimate_tokens(summary_text or ""),
+            "history": sum(estimate_tokens(message.get("content") or "") for message in kept),
+        },
+    }
@@ -0,0 +1,162 @@
+"""Message-level chat history (``chat_messages``) with a running summary.
+
+Each turn is appended with the ``append_chat_turn`` RPC, which locks the
+user's session, inserts the new rows and bumps ``chat_sessions.message_count``
+in one transaction. Reads page backwards through ``chat_messages`` by id.
+Once more than ``settings.chat_summary_trigger_messages`` messages are not yet
+covered by ``chat_sessions.summary``, all but the newest
+``settings.chat_summary_keep_recent`` of them are folded into the summary, so
+every summarisation pass handles a bounded number of messages.
+"""
+
+from typing import Any, Dict, List, Optional
+
+from app.agents.curriculum_agent import curriculum_agent
+from app.core.config import settings
+from app.core.log import get_logger
+from app.db.supabase_client import run_query, supabase
+
+logger = get_logger(__name__)
+
+
+async def append_turn(
+    user_id: str,
+    curriculum_id: Optional[str],
+    messages: List[Dict[str, Any]],
+    session_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Atomically append messages to the user's session.
+
+    Returns ``{"session_id", "created", "message_count", "unsummarized"}``.
+    """
+    response = await run_query(supabase.rpc("append_chat_turn", {
+        "p_user_id": str(user_id),
+        "p_curriculum_id": curriculum_id,
+        "p_messages": [{"role": message["role"], "content": message["content"]} for message in messages],
+        "p_session_id": session_id,
+    }))
+    if not response.data:
+        raise RuntimeError("append_chat_turn returned no session")
+    return response.data[0]
+
+
+async def get_history(
+    user_id: str,
+    curriculum_id: str,
+    before: Optional[int] = None,
+    limit: Optional[int] = None,
+) -> Dict[str, Any]:
+    """One page of a curriculum chat, oldest first.
+
+    Pass the previous page's ``next_cursor`` as ``before`` to load older
+    messages; ``next_cursor`` is None once the start of the conversation is
+    reached. Without a ``limit`` the whole conversation is returned. Also returns the session's running ``summary`` and its
+    ``watermark`` (see ``history_watermark``).
+    """
+    query = (
+        supabase.table("chat_sessions")
+        .select("id, summary, message_count, summarized_through, chat_messages(id, role, content)")
+        .eq("user_id", str(user_id))
+        .eq("curriculum_id", curriculum_id)
+        .order("id", desc=True, foreign_table="chat_messages")
+    )
+    if limit is not None:
+        query = query.limit(limit + 1, foreign_table="chat_messages")
+    if before is not None:
+        query = query.lt("chat_messages.id", before)
+    response = await run_query(query.order("created_at").limit(1))
+
+    if not response or not response.data:
+        return {"messages": [], "next_cursor": None, "summary": None, "watermark": None}
+    session = response.data[0]
+    rows = session.get("chat_messages") or []
+    has_more = limit is not None and len(rows) > limit
+    rows = list(reversed(rows[:limit]))
+    return {
+        "messages": [{"role": row["role"], "content": row["content"]} for row in rows],
+        "next_cursor": rows[0]["id"] if has_more and rows else None,
+        "summary": session.get("summary"),
+        "watermark": _watermark(session),
+    }
+
+
+def _watermark(session: Dict[str, Any]) -> List[Any]:
+    return [session["id"], session.get("message_count"), session.get("summarized_through")]
+
+
+async def history_watermark(user_id: str, curriculum_id: str) -> Optional[List[Any]]:
+    """Cheap version stamp of a curriculum chat, without loading any messages.
+
+    Messages are append-only and ``append_chat_turn`` bumps ``message_count``
+    in the same transaction, while the summary only changes together with
+    ``summarized_through``; so every page of the history is unchanged for as
+    long as this is.
+    """
+    response = await run_query(
+        supabase.table("chat_sessions")
+        .select("id, message_count, summarized_through")
+        .eq("user_id", str(user_id))
+        .eq("curriculum_id", curriculum_id)
+        .order("created_at")
+        .limit(1)
+    )
+    return _watermark(response.data[0]) if response and response.data else None
+
+
+async def get_summary(user_id: str, curriculum_id: str) -> Optional[str]:
+    """Running summary of a curriculum chat's older turns, if any."""
+    response = await run_query(
+        supabase.table("chat_sessions")
+        .select("summary")
+        .eq("user_id", str(user_id))
+        .eq("curriculum_id", curriculum_id)
+        .order("created_at")
+        .limit(1)
+    )
+    return response.data[0].get("summary") if response and response.data else None
+
+
+async def summarize_if_needed(session_id: str, unsummarized: int) -> None:
+    """Fold older messages into the session summary once enough have piled up."""
+    if unsummarized <= settings.chat_summary_trigger_messages:
+        return
+    try:
+        session_resp = await run_query(
+            supabase.table("chat_sessions")
+            .select("summary, summarized_through, summarized_count")
+            .eq("id", session_id)
+            .maybe_single()
+        )
+        if not session_resp or not session_resp.data:
+            return
+        session = session_resp.data
+
+        count = unsummarized - settings.chat_summary_keep_recent
+        query = supabase.table("chat_messages").select("id, role, content").eq("session_id", session_id)
+        if session.get("summarized_through") is not None:
+            query = query.gt("id", session["summarized_through"])
+        rows = (await run_query(query.order("id").limit(count))).data or []
+        if not rows:
+            return
+
+        summary = await curriculum_agent.summarize_conversation(session.get("summary"), rows)
+        if not summary:
+            return
+        update = (
+            supabase.table("chat_sessions")
+            .update({
+                "summary": summary,
+                "summarized_through": rows[-1]["id"],
+                "summarized_count": (session.get("summarized_count") or 0) + len(rows),
+            })
+            .eq("id", session_id)
+        )
+        # Skip the write if a concurrent pass already advanced the summary
+        if session.get("summarized_through") is None:
+            update = update.is_("summarized_through", "null")
+        else:
+            update = update.eq("summarized_through", session["summarized_through"])
+        await run_query(update)
+        logger.info("Summarised %d chat messages for session %s", len(rows), session_id)
+    except Exception as e:
+        logger.warning("Chat summarisation failed for session %s: %s", session_id, e)
@@ -0,0 +1,347 @@
+"""Full-curriculum generation pipeline.
+
+Runs outside the request cycle: jobs are enqueued by the curricula endpoints
+and executed by the generation worker (``backend/worker.py``).
+"""
+
+from typing import Any, Dict, List, Optional
+from uuid import UUID, uuid5
+
+from app.agents.curriculum_agent import curriculum_agent
+from app.core.config import settings
+from app.core.log import get_logger
+from app.core.metrics import GENERATION_STAGE_SECONDS, GENERATIONS
+from app.db.supabase_client import run_query, supabase
+from app.models.curriculum import CurriculumCreate, CurriculumDayCreate
+from app.services.generation_events import publish_event, publish_progress, set_status
+from app.services.job_queue import (enqueue_job, live_workers,
+                                    register_handler)
+from app.services.lesson_text import invalidate as invalidate_lesson_text
+from app.services.lesson_text import lesson_text_columns
+from app.services.llm_archive import archive_llm_output
+from app.services.template_cache import (find_template, outline_from_template,
+                                         store_template)
+from app.services.validation_service import clean_and_validate_json
+from fastapi import BackgroundTasks, HTTPException
+from fastapi.encoders import jsonable_encoder
+
+logger = get_logger(__name__)
+
+GENERATION_JOB = "curriculum_generation"
+
+def day_row_id(curriculum_id: str, day_number: int) -> str:
+    """Deterministic day id so re-emitted or retried days overwrite instead of duplicating."""
+    return str(uuid5(UUID(str(curriculum_id)), f"day-{day_number}"))
+
+
+def _build_day_row(curriculum_id: str, day_data_raw: Dict[str, Any]) -> Dict[str, Any]:
+    """Map a generated day onto a curriculum_days row (raises on invalid data)."""
+    # Extract project fields if present
+    is_project_day = day_data_raw.get("is_project_day", False)
+    project_data = day_data_raw.get("project_data", None) if is_project_day else None
+    
+    # Create the day object without project fields for validation
+    day_fields = {k: v for k, v in day_data_raw.items() if k not in ["is_project_day", "project_data"]}
+    day_create_obj = CurriculumDayCreate(**day_fields)
+    
+    # Add to insert list with project fields
+    day_dict = day_create_obj.model_dump()
+    day_dict.update({
+        "curriculum_id": curriculum_id,
+        "id": day_row_id(curriculum_id, day_create_obj.day_number),
+        "is_project_day": is_project_day,
+        "project_data": project_data,
+        **lesson_text_columns(day_create_obj.content),
+    })
+    return day_dict
+
+
+async def _finish_generation(curriculum_id: str, generation_status: str, message: str) -> None:
+    """Record a terminal generation state and tell any listening clients."""
+    await run_query(supabase.table("curricula").update({
+        "generation_status": generation_status,
+        "generation_progress": message
+    }).eq("id", curriculum_id))
+    # Retries overwrite earlier days in place
+    invalidate_lesson_text(curriculum_id)
+    await set_status(curriculum_id, generation_status=generation_status, generation_progress=message)
+
+
+async def _save_title(curriculum_id: str, title: str, description: str, message: str) -> None:
+    """Persist the generated title/description (a state transition) and report progress."""
+    await run_query(supabase.table("curricula").update({
+        "title": title,
+        "description": description,
+        "generation_progress": message
+    }).eq("id", curriculum_id))
+    await set_status(curriculum_id, generation_status="generating", generation_progress=message, title=title)
+
+
+async def _drop_extra_days(curriculum_id: str, num_days: int) -> None:
+    """Delete days left over from an earlier, longer attempt."""
+    await run_query(
+        supabase.table("curriculum_days")
+        .delete()
+        .eq("curriculum_id", curriculum_id)
+        .gt("day_number", num_days)
+    )
+
+
+async def _clone_template(curriculum_id: str, curriculum_data: CurriculumCreate, template: Dict[str, Any]) -> None:
+    """Fill the curriculum from a matching template without calling the model."""
+    await _save_title(
+        curriculum_id,
+        template["curriculum_title"],
+        template["curriculum_description"],
+        "Found a matching curriculum. Copying lessons...",
+    )
+    rows = [_build_day_row(curriculum_id, day) for day in template["days"]]
+    await run_query(supabase.table("curriculum_days").upsert(rows))
+    for row in rows:
+        await publish_event(curriculum_id, {
+            "type": "day_ready",
+            "id": row["id"],
+            "day_number": row["day_number"],
+            "title": row["title"],
+        })
+    await _drop_extra_days(curriculum_id, curriculum_data.estimated_duration_days)
+    await _finish_generation(curriculum_id, "completed", "Curriculum generated successfully!")
+
+
+async def _generate_staged(
+    curriculum_id: str,
+    curriculum_data: CurriculumCreate,
+    agent_messages: List,
+    agent_context: Dict,
+    transcript: List[str],
+    outline: Optional[Dict[str, Any]] = None,
+) -> Optional[Dict[str, Any]]:
+    """Outline + streamed day chunks; each day is saved and announced as soon as it is ready.
+
+    Returns the generated curriculum, or None if generation failed.
+    """
+    num_days = curriculum_data.estimated_duration_days
+    days_saved = 0
+
+    async def save_outline(outline: Dict[str, Any]) -> None:
+        await _save_title(
+            curriculum_id,
+            outline["curriculum_title"],
+            outline["curriculum_description"],
+            "Outline ready. Writing day-by-day lessons...",
+        )
+
+    async def save_day(day: Dict[str, Any]) -> None:
+        nonlocal days_saved
+        row = _build_day_row(curriculum_id, day)
+        with GENERATION_STAGE_SECONDS.time(stage="save_day"):
+            await run_query(supabase.table("curriculum_days").upsert(row))
+        invalidate_lesson_text(curriculum_id)
+        days_saved += 1
+        await publish_event(curriculum_id, {
+            "type": "day_ready",
+            "id": row["id"],
+            "day_number": row["day_number"],
+            "title": row["title"],
+        })
+        await publish_progress(curriculum_id, f"Writing lessons: {days_saved} of {num_days} days ready...")
+
+    if outline is not None:
+        await save_outline(outline)
+
+    try:
+        generated = await curriculum_agent.generate_curriculum(
+            messages=agent_messages,
+            context=agent_context,
+            num_days=num_days,
+            transcript=transcript,
+            on_outline=save_outline if outline is None else None,
+            on_day=save_day,
+            outline=outline,
+        )
+    except Exception:
+        GENERATIONS.inc(mode="staged", result="failed")
+        logger.exception("Staged curriculum generation failed for %s", curriculum_id)
+        await _finish_generation(
+            curriculum_id,
+            "failed",
+            f"Generation stopped after {days_saved} of {num_days} days. Please retry.",
+        )
+        return None
+
+    await _drop_extra_days(curriculum_id, num_days)
+    await _finish_generation(curriculum_id, "completed", "Curriculum generated successfully!")
+    GENERATIONS.inc(mode="staged", result="completed")
+    return generated
+
+
+async def generate_and_save_curriculum(curriculum_id: str, curriculum_data: CurriculumCreate, agent_messages: List, agent_context: Dict):
+    raw_agent_response = ""
+    transcript: List[str] = []
+    try:
+        # Reuse a finished curriculum for (near-)identical requests
+        with GENERATION_STAGE_SECONDS.time(stage="template_lookup"):
+            template_match = await find_template(curriculum_data)
+        if template_match is not None:
+            logger.info("Curriculum template match for %s: %s (score %.3f)", curriculum_id, template_match["mode"], template_match["score"])
+            if template_match["mode"] == "clone":
+                with GENERATION_STAGE_SECONDS.time(stage="clone"):
+                    await _clone_template(curriculum_id, curriculum_data, template_match["template"])
+                GENERATIONS.inc(mode="clone", result="completed")
+                return
+
+        # Update status: Planning curriculum structure
+        await publish_progress(curriculum_id, "Planning curriculum structure and daily topics...")
+
+        # Call the agent to generate the curriculum structure and content
+        logger.debug("Generating curriculum %s from %d message(s)", curriculum_id, len(agent_messages))
+        if settings.staged_generation_enabled:
+            warm_outline = outline_from_template(template_match["template"]) if template_match else None
+            with GENERATION_STAGE_SECONDS.time(stage="staged_total"):
+                generated = await _generate_staged(curriculum_id, curriculum_data, agent_messages, agent_context, transcript, warm_outline)
+            if generated is not None:
+                with GENERATION_STAGE_SECONDS.time(stage="store_template"):
+                    await store_template(curriculum_data, generated)
+            return
+
+        with GENERATION_STAGE_SECONDS.time(stage="legacy_generate"):
+            raw_agent_response = await curriculum_agent.run(messages=agent_messages, context=agent_context)
+        logger.debug("Agent response length for %s: %d", curriculum_id, len(raw_agent_response or ""))
+
+        with GENERATION_STAGE_SECONDS.time(stage="validate"):
+            validated_data = await clean_and_validate_json(raw_agent_response, curriculum_id=curriculum_id)
+        
+        if not validated_data:
+            # If validation and repair fail, mark as failed
+            GENERATIONS.inc(mode="legacy", result="failed")
+            await _finish_generation(curriculum_id, "failed", "Failed to generate a valid curriculum after multiple repair attempts.")
+            return
+
+        # Update status: Processing content
+        await publish_progress(curriculum_id, "Creating day-by-day content and resources...")
+        
+        # ---------------------------------------------
+        # Use already validated JSON instead of reparsing
+        # ---------------------------------------------
+
+        generated_curriculum = validated_data  # Comes from clean_and_validate_json
+
+        curriculum_title = generated_curriculum.get("curriculum_title", curriculum_data.title or f"Learning {curriculum_data.learning_goal}")
+        curriculum_description = generated_curriculum.get("curriculum_description", curriculum_data.description or curriculum_data.learning_goal)
+        generated_days_data = generated_curriculum.get("days", [])
+
+        logger.info("Validated curriculum %s with %d days", curriculum_id, len(generated_days_data))
+
+        if not isinstance(generated_days_data, list):
+            await _finish_generation(curriculum_id, "failed", "Agent did not return a list of days.")
+            return
+
+        # Update curriculum with title and description from agent
+        await _save_title(
+            curriculum_id,
+            curriculum_title,
+            curriculum_description,
+            f"Creating {len(generated_days_data)} days of content...",
+        )
+
+        # 2. Create CurriculumDay entries for each day generated by the agent
+        days_to_insert = []
+        for i, day_data_raw in enumerate(generated_days_data):
+            # Update progress for each day
+            if i % 5 == 0:
+                await publish_progress(curriculum_id, f"Processing day {i+1} of {len(generated_days_data)}...")
+                
+            # Validate and create CurriculumDayCreate objects
+            # The agent MUST provide data in the format CurriculumDayCreate expects
+            try:
+                days_to_insert.append(_build_day_row(curriculum_id, day_data_raw))
+            except Exception as e: # Catch Pydantic validation errors or others
+                # Log this error, maybe skip this day or fail the whole process
+                logger.warning("Skipping day due to parsing error: %s", e)
+                continue # Or raise HTTPException if one bad day should fail all
+
+        # Update status: Saving curriculum
+        await publish_progress(curriculum_id, "Saving curriculum to database...")
+
+        if days_to_insert:
+            with GENERATION_STAGE_SECONDS.time(stage="save_days"):
+                created_days_response = await run_query(supabase.table("curriculum_days").upsert(days_to_insert))
+            if created_days_response.data is None or len(created_days_response.data) != len(days_to_insert):
+                # Handle partial insert or error - potentially delete the main curriculum entry for consistency
+                await _finish_generation(curriculum_id, "failed", "Failed to save curriculum days")
+                raise HTTPException(status_code=500, detail="Failed to create curriculum days")
+        
+        # Update status: Completed
+        await _finish_generation(curriculum_id, "completed", "Curriculum generated successfully!")
+        GENERATIONS.inc(mode="legacy", result="completed")
+        await store_template(curriculum_data, validated_data)
+        
+        # Return only the ID – UI will poll /api/curricula/{id} for full data
+        return
+
+    except HTTPException as e: # Re-raise HTTPExceptions
+        raise e
+    except Exception as e:
+        # Log the full error for debugging
+        logger.exception("Unexpected error creating curriculum %s", curriculum_id)
+        
+        # Update status to failed
+        await _finish_generation(curriculum_id, "failed", f"Unexpected error: {str(e)}")
+        
+        raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
+
+    finally:
+        # Archive the raw LLM output (written off the event loop)
+        raw_output = raw_agent_response or "\n\n".join(transcript)
+        if raw_output:
+            archive_llm_output("generation", raw_output, curriculum_id, staged=not raw_agent_response)
+
+
+async def queue_curriculum_generation(
+    curriculum_id: str,
+    curriculum_data: CurriculumCreate,
+    agent_messages: List,
+    agent_context: Dict,
+    background_tasks: BackgroundTasks,
+) -> None:
+    """Hand generation to the worker queue, or run it in-process if the queue is unavailable.
+
+    Jobs are only queued while a worker is alive; otherwise they would wait
+    in Redis until one is deployed.
+    """
+    if settings.job_queue_enabled:
+        payload = jsonable_encoder({
+            "curriculum_id": curriculum_id,
+            "curriculum_data": curriculum_data,
+            "agent_messages": agent_messages,
+            "agent_context": agent_context,
+        })
+        try:
+            if not await live_workers():
+                raise RuntimeError("no live worker")
+            queued = await enqueue_job(GENERATION_JOB, f"curriculum:{curriculum_id}", payload)
+            if not queued:
+                logger.info("Generation for curriculum %s is already queued or running", curriculum_id)
+            return
+        except Exception as e:
+            logger.info("Job queue unavailable, generating curriculum %s in-process: %s", curriculum_id, e)
+
+    background_tasks.add_task(generate_and_save_curriculum, curriculum_id, curriculum_data, agent_messages, agent_context)
+
+
+async def run_generation_job(payload: Dict[str, Any]) -> None:
+    await generate_and_save_curriculum(
+        payload["curriculum_id"],
+        CurriculumCreate(**payload["curriculum_data"]),
+        payload["agent_messages"],
+        payload["agent_context"],
+    )
+
+
+async def abandon_generation_job(payload: Dict[str, Any]) -> None:
+    """Mark a curriculum failed after its job was interrupted too many times."""
+    await _finish_generation(payload["curriculum_id"], "failed", "Generation was interrupted. Please retry.")
+
+
+def register_generation_jobs() -> None:
+    register_handler(GENERATION_JOB, run_generation_job, on_dead=abandon_generation_job)
@@ -1,7 +1,10 @@
 import os
 
-import resend
 from app.core.config import settings
+from app.core.executors import run_blocking
+from app.core.lazy import lazy_import
+
+resend = lazy_import("resend")
 
 # Initialize Resend client
 # It's better to fetch the API key directly when needed or ensure settings are loaded.
@@ -12,17 +15,22 @@ from app.core.config import settings
 
 # For Resend Python SDK, the API key is typically set globally once.
 # Let's ensure it's set, and if not, raise an error or log a warning.
-if settings.resend_api_key:
-    resend.api_key = settings.resend_api_key
-else:
+# The SDK itself is only imported (and given the key) when the first email is sent.
+if not settings.resend_api_key:
     print("WARNING: RESEND_API_KEY is not set. Email functionality will be disabled.")
     # You might want to raise an ImproperlyConfigured exception here
     # or handle this case more gracefully depending on your application's needs.
 
+def _send(params: dict) -> dict:
+    # Runs on the worker thread, so the first call's SDK import stays off the event loop
+    resend.api_key = settings.resend_api_key
+    return resend.Emails.send(params)
+
+
 class EmailService:
     @staticmethod
     async def send_email(to: str, subject: str, html_content: str) -> bool:
-        if not resend.api_key:
+        if not settings.resend_api_key:
             print(f"Email not sent to {to} (subject: {subject}) because RESEND_API_KEY is not configured.")
             return False
 
@@ -33,7 +41,7 @@ class EmailService:
                 "subject": subject,
                 "html": html_content,
             }
-            email_response = resend.Emails.send(params)
+            email_response = await run_blocking(_send, params)
             
             print(f"Email send attempt to {to}, response: {email_response}") # Log response for debugging
 
@@ -0,0 +1,258 @@
+"""Subscription entitlement lookups with a Redis cache.
+
+Resolving whether a user has an active subscription means reading
+``subscription_status`` and, when that row is missing or inactive, two
+sequential Polar API calls. Results are cached in Redis (short TTL for
+active users, shorter for inactive ones) and concurrent lookups for the same
+user are collapsed into one: in-process via a shared future, across workers
+via a short Redis lock. The Polar webhook invalidates entries so plan changes
+show up immediately; invalidating also bumps a per-user version, and a
+lookup only writes its result back if the version is unchanged since it
+started, so a lookup that was already in flight can't restore the old entry.
+"""
+
+import asyncio
+import json
+import secrets
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.core.http_client import get_httpx_client
+from app.core.log import get_logger
+from app.db.redis_client import get_redis
+from app.db.supabase_client import run_query, supabase
+from redis.exceptions import RedisError
+
+logger = get_logger(__name__)
+
+POLAR_API_URL = "https://api.polar.sh/v1/"
+
+_KEY_PREFIX = "entitlement:"
+_LOCK_PREFIX = "entitlement:lock:"
+_VERSION_PREFIX = "entitlement:version:"
+# Outlives any lookup by far; an expired version only makes a lookup skip its write
+_VERSION_TTL_SECONDS = 86400
+
+# Write the entry only if no invalidation happened since the lookup started
+_WRITE_IF_CURRENT_LUA = """
+if (redis.call('GET', KEYS[2]) or '0') == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+    return 1
+end
+return 0
+"""
+
+# Release the lookup lock only if this caller still holds it
+_RELEASE_LOCK_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# user_id -> in-flight lookup shared by concurrent requests in this process
+_inflight: Dict[str, "asyncio.Future[Dict[str, Any]]"] = {}
+
+
+def _cache_key(user_id: str) -> str:
+    return f"{_KEY_PREFIX}{user_id}"
+
+
+async def _read_cache(user_id: str) -> Optional[Dict[str, Any]]:
+    client = get_redis()
+    if client is None:
+        return None
+    try:
+        raw = await client.get(_cache_key(user_id))
+    except RedisError as e:
+        logger.warning("Entitlement cache read failed: %s", e)
+        return None
+    return json.loads(raw) if raw else None
+
+
+async def _read_version(user_id: str) -> str:
+    client = get_redis()
+    if client is None:
+        return "0"
+    try:
+        return await client.get(f"{_VERSION_PREFIX}{user_id}") or "0"
+    except RedisError as e:
+        logger.warning("Entitlement version read failed: %s", e)
+        return "0"
+
+
+async def _write_cache(user_id: str, entitlement: Dict[str, Any], version: str) -> None:
+    client = get_redis()
+    if client is None:
+        return
+    ttl = (
+        settings.entitlement_cache_ttl_seconds
+        if entitlement["status"] == "active"
+        else settings.entitlement_negative_ttl_seconds
+    )
+    try:
+        await client.eval(
+            _WRITE_IF_CURRENT_LUA, 2,
+            _cache_key(user_id), f"{_VERSION_PREFIX}{user_id}",
+            version, json.dumps(entitlement), ttl,
+        )
+    except RedisError as e:
+        logger.warning("Entitlement cache write failed: %s", e)
+
+
+async def invalidate_entitlement(user_id: str) -> None:
+    """Drop the cached entitlement for a user (e.g. after a Polar webhook).
+
+    Lookups already in flight keep their answer but no longer cache it, and
+    later callers start a fresh lookup instead of joining one of them.
+    """
+    user_id = str(user_id)
+    _inflight.pop(user_id, None)
+    client = get_redis()
+    if client is None:
+        return
+    version_key = f"{_VERSION_PREFIX}{user_id}"
+    try:
+        async with client.pipeline(transaction=True) as pipe:
+            pipe.incr(version_key)
+            pipe.expire(version_key, _VERSION_TTL_SECONDS)
+            pipe.delete(_cache_key(user_id), f"{_LOCK_PREFIX}{user_id}")
+            await pipe.execute()
+    except RedisError as e:
+        logger.warning("Entitlement cache invalidation failed: %s", e)
+
+
+async def _lookup_polar(user_id: str, email: str) -> Optional[Dict[str, Any]]:
+    """Ask Polar for an active subscription. Returns None if Polar is unreachable."""
+    if not settings.polar_access_token:
+        return None
+    headers = {"Authorization": f"Bearer {settings.polar_access_token}"}
+    try:
+        client = get_httpx_client()
+        customers_response = await client.get(f"{POLAR_API_URL}customers", headers=headers, params={"email": email})
+        if customers_response.status_code != 200:
+            return None
+        customers = customers_response.json().get("items") or []
+        if not customers:
+            return {"status": "none", "customer_id": None}
+
+        customer_id = customers[0]["id"]
+        subs_response = await client.get(
+            f"{POLAR_API_URL}subscriptions",
+            headers=headers,
+            params={"customer_id": customer_id, "status": "active"},
+        )
+        if subs_response.status_code != 200:
+            return None
+        if not subs_response.json().get("items"):
+            return {"status": "none", "customer_id": customer_id}
+    except Exception as e:
+        logger.warning("Polar entitlement lookup failed: %s", e)
+        return None
+
+    # Update DB for next time
+    updated_at = datetime.utcnow().isoformat()
+    try:
+        await run_query(supabase.table("subscription_status").upsert({
+            "user_id": user_id,
+            "status": "active",
+            "customer_id": customer_id,
+            "updated_at": updated_at,
+        }))
+    except Exception as e:
+        logger.error("Failed to persist active subscription for %s: %s", user_id, e)
+    return {"status": "active", "customer_id": customer_id, "updated_at": updated_at}
+
+
+async def _resolve(user_id: str, email: str) -> Dict[str, Any]:
+    """Resolve a user's entitlement from the database, then Polar."""
+    version = await _read_version(user_id)
+    entitlement: Dict[str, Any] = {"status": "none", "customer_id": None, "updated_at": None}
+    try:
+        res = await run_query(
+            supabase.table("subscription_status")
+            .select("status, customer_id, updated_at")
+            .eq("user_id", user_id)
+            .maybe_single()
+        )
+        if res and getattr(res, "data", None):
+            entitlement.update(res.data)
+    except Exception as e:
+        logger.error("Supabase select subscription_status error: %s", e)
+
+    if entitlement["status"] == "active":
+        await _write_cache(user_id, entitlement, version)
+        return entitlement
+
+    polar_result = await _lookup_polar(user_id, email)
+    if polar_result is None:
+        # Polar unavailable: answer from the DB but don't cache a guess
+        return entitlement
+    entitlement.update(polar_result)
+    await _write_cache(user_id, entitlement, version)
+    return entitlement
+
+
+async def _resolve_single_flight(user_id: str, email: str) -> Dict[str, Any]:
+    """Resolve under a short Redis lock so only one worker hits Polar per user."""
+    client = get_redis()
+    lock_key = f"{_LOCK_PREFIX}{user_id}"
+    # Unique per holder, so a holder whose lock expired can't release a newer one
+    token = secrets.token_hex(16)
+    acquired = True
+    if client is not None:
+        try:
+            acquired = bool(await client.set(lock_key, token, nx=True, ex=settings.entitlement_lock_seconds))
+        except RedisError:
+            acquired = True
+
+    if not acquired:
+        # Another worker is resolving; wait briefly for it to fill the cache
+        deadline = asyncio.get_running_loop().time() + settings.entitlement_lock_seconds
+        while asyncio.get_running_loop().time() < deadline:
+            await asyncio.sleep(0.1)
+            cached = await _read_cache(user_id)
+            if cached is not None:
+                return cached
+        return await _resolve(user_id, email)
+
+    try:
+        return await _resolve(user_id, email)
+    finally:
+        if client is not None:
+            try:
+                await client.eval(_RELEASE_LOCK_LUA, 1, lock_key, token)
+            except RedisError:
+                pass
+
+
+async def get_entitlement(user_id: str, email: str) -> Dict[str, Any]:
+    """Return ``{"status", "customer_id", "updated_at"}`` for a user, cached."""
+    user_id = str(user_id)
+    cached = await _read_cache(user_id)
+    if cached is not None:
+        return cached
+
+    future = _inflight.get(user_id)
+    if future is not None:
+        return await asyncio.shield(future)
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[user_id] = future
+    try:
+        entitlement = await _resolve_single_flight(user_id, email)
+        future.set_result(entitlement)
+        return entitlement
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        # Mark retrieved so an unobserved failure doesn't log a warning
+        future.exception()
+        raise
+    finally:
+        # invalidate_entitlement may already have replaced this lookup
+        if _inflight.get(user_id) is future:
+            del _inflight[user_id]
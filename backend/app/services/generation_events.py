@@ -0,0 +1,119 @@
+"""Per-curriculum generation status and events over Redis.
+
+The generation worker publishes events (``day_ready``, ``status``) on
+``curriculum:<id>:events``; the SSE endpoints in the curricula router
+subscribe and forward them to the browser. The latest status is also kept
+as a hash at ``curriculum:<id>:status`` so ``/status`` can answer without
+touching Postgres, which is only written at state transitions (queued,
+outline ready, completed, failed). Everything here is best-effort: if Redis
+is down, readers fall back to the database.
+"""
+
+import asyncio
+import json
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.core.log import get_logger
+from app.core.serialization import dumps
+from app.db.redis_client import get_redis
+from redis.exceptions import RedisError
+
+logger = get_logger(__name__)
+
+
+def event_channel(curriculum_id: str) -> str:
+    return f"curriculum:{curriculum_id}:events"
+
+
+def status_key(curriculum_id: str) -> str:
+    return f"curriculum:{curriculum_id}:status"
+
+
+async def publish_event(curriculum_id: str, event: Dict[str, Any]) -> None:
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        await client.publish(event_channel(curriculum_id), json.dumps(event))
+    except RedisError as e:
+        logger.warning("Failed to publish generation event for %s: %s", curriculum_id, e)
+
+
+async def set_status(curriculum_id: str, **fields: Any) -> None:
+    """Merge fields (generation_status, generation_progress, title, user_id) into the
+    status snapshot and publish them as a ``status`` event."""
+    client = get_redis()
+    if client is None:
+        return
+    fields = {name: str(value) for name, value in fields.items() if value is not None}
+    key = status_key(curriculum_id)
+    try:
+        async with client.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping=fields)
+            pipe.expire(key, settings.generation_status_ttl_seconds)
+            pipe.publish(event_channel(curriculum_id), json.dumps({"type": "status", **fields}))
+            await pipe.execute()
+    except RedisError as e:
+        logger.warning("Failed to update generation status for %s: %s", curriculum_id, e)
+
+
+async def publish_progress(curriculum_id: str, message: str) -> None:
+    """Report an in-progress message (Redis only; not written to Postgres)."""
+    await set_status(curriculum_id, generation_status="generating", generation_progress=message)
+
+
+async def get_status(curriculum_id: str) -> Optional[Dict[str, str]]:
+    """Latest status snapshot, or None if unknown or Redis is unavailable."""
+    client = get_redis()
+    if client is None:
+        return None
+    try:
+        snapshot = await client.hgetall(status_key(curriculum_id))
+    except RedisError as e:
+        logger.warning("Failed to read generation status for %s: %s", curriculum_id, e)
+        return None
+    return snapshot or None
+
+
+class EventSubscription:
+    """Async context manager yielding events for one curriculum.
+
+    Subscribe *before* reading current state from the database so no event
+    published in between is missed.
+    """
+
+    def __init__(self, curriculum_id: str):
+        self.channel = event_channel(curriculum_id)
+        self._pubsub = None
+
+    async def __aenter__(self) -> "EventSubscription":
+        client = get_redis()
+        if client is None:
+            raise RedisError("Redis is not configured")
+        self._pubsub = client.pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.subscribe(self.channel)
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        if self._pubsub is not None:
+            try:
+                await self._pubsub.unsubscribe(self.channel)
+                await self._pubsub.aclose()
+            except RedisError:
+                pass
+
+    async def next_event(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """Wait up to ``timeout`` seconds for the next event; None on timeout."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while (remaining := deadline - loop.time()) > 0:
+            # Subscribe confirmations come back as None; keep waiting for a real message
+            message = await self._pubsub.get_message(timeout=remaining)
+            if message is not None and message.get("type") == "message":
+                return json.loads(message["data"])
+        return None
+
+
+def format_sse(event: str, data: Any) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + dumps(data) + b"\n\n"
@@ -0,0 +1,306 @@
+"""Durable Redis-backed job queue for long-running work (curriculum generation).
+
+Layout in Redis (all keys under ``settings.job_queue_prefix``):
+
+- ``<prefix>:pending``      list of job ids waiting to run (LPUSH / RPOP)
+- ``<prefix>:leases``       sorted set of running job ids scored by lease expiry
+- ``<prefix>:job:<id>``     JSON job record (kind, payload)
+- ``<prefix>:attempts``     hash of job id -> number of times it was claimed
+- ``<prefix>:dead``         list of job ids that exhausted their attempts
+- ``<prefix>:stats``        hash of counters (enqueued, completed, failed, ...)
+- ``<prefix>:workers``      sorted set of worker ids scored by last heartbeat
+
+A job id doubles as the idempotency key: enqueueing an id whose record still
+exists is a no-op, so a curriculum can only be generated by one job at a time.
+Workers renew their lease with heartbeats; a job whose lease expires (worker
+crashed or was redeployed) is moved back to ``pending`` by the reaper that
+every worker runs. The API only queues jobs while some worker has announced
+itself within the last lease period (``live_workers``), so a deployment
+without a worker keeps generating in-process.
+"""
+
+import asyncio
+import json
+import os
+import socket
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from app.core.config import settings
+from app.core.log import get_logger
+from app.db.redis_client import get_redis
+
+logger = get_logger(__name__)
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+# kind -> coroutine run for each job
+_handlers: Dict[str, JobHandler] = {}
+# kind -> coroutine run once when a job is abandoned after max attempts
+_dead_handlers: Dict[str, JobHandler] = {}
+
+
+def _key(name: str) -> str:
+    return f"{settings.job_queue_prefix}:{name}"
+
+
+# Atomically create the job record (if absent) and queue it
+_ENQUEUE_LUA = """
+if redis.call('SET', KEYS[1], ARGV[2], 'NX') then
+    redis.call('LPUSH', KEYS[2], ARGV[1])
+    redis.call('HINCRBY', KEYS[3], 'enqueued', 1)
+    return 1
+end
+return 0
+"""
+
+# Pop the oldest pending job, lease it and count the attempt in one step
+_CLAIM_LUA = """
+local job_id = redis.call('RPOP', KEYS[1])
+if not job_id then
+    return nil
+end
+local raw = redis.call('GET', ARGV[2] .. job_id)
+if not raw then
+    return nil
+end
+local attempts = redis.call('HINCRBY', KEYS[3], job_id, 1)
+redis.call('ZADD', KEYS[2], ARGV[1], job_id)
+return {raw, attempts}
+"""
+
+# Move expired leases back to pending (or to dead after max attempts)
+_REAP_LUA = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, 100)
+local dead = {}
+for _, job_id in ipairs(expired) do
+    redis.call('ZREM', KEYS[1], job_id)
+    local job_key = ARGV[3] .. job_id
+    local raw = redis.call('GET', job_key)
+    if raw then
+        local attempts = tonumber(redis.call('HGET', KEYS[5], job_id) or '0')
+        if attempts >= tonumber(ARGV[2]) then
+            redis.call('LPUSH', KEYS[3], job_id)
+            redis.call('HINCRBY', KEYS[4], 'dead', 1)
+            redis.call('DEL', job_key)
+            redis.call('HDEL', KEYS[5], job_id)
+            table.insert(dead, raw)
+        else
+            redis.call('LPUSH', KEYS[2], job_id)
+            redis.call('HINCRBY', KEYS[4], 'requeued', 1)
+        end
+    end
+end
+return dead
+"""
+
+
+def register_handler(kind: str, handler: JobHandler, on_dead: Optional[JobHandler] = None) -> None:
+    """Register the coroutine that runs jobs of ``kind`` (and an optional dead-letter hook)."""
+    _handlers[kind] = handler
+    if on_dead is not None:
+        _dead_handlers[kind] = on_dead
+
+
+async def enqueue_job(kind: str, job_id: str, payload: Dict[str, Any]) -> bool:
+    """Queue a job. Returns False if a job with the same id is already queued or running.
+
+    Raises ``redis.exceptions.RedisError`` if Redis is unreachable so callers
+    can decide how to degrade.
+    """
+    client = get_redis()
+    if client is None:
+        raise RuntimeError("Redis is not configured")
+    record = json.dumps({
+        "id": job_id,
+        "kind": kind,
+        "payload": payload,
+        "enqueued_at": time.time(),
+    })
+    created = await client.eval(
+        _ENQUEUE_LUA, 3,
+        _key(f"job:{job_id}"), _key("pending"), _key("stats"),
+        job_id, record,
+    )
+    return bool(created)
+
+
+async def live_workers() -> int:
+    """Number of workers that sent a heartbeat within the last lease period."""
+    client = get_redis()
+    if client is None:
+        return 0
+    return await client.zcount(_key("workers"), time.time() - settings.job_lease_seconds, "+inf")
+
+
+async def queue_stats() -> Dict[str, Any]:
+    """Queue depth and lifetime counters (exposed via /api/health)."""
+    client = get_redis()
+    if client is None:
+        return {"available": False}
+    try:
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.llen(_key("pending"))
+            pipe.zcard(_key("leases"))
+            pipe.llen(_key("dead"))
+            pipe.zcount(_key("workers"), time.time() - settings.job_lease_seconds, "+inf")
+            pipe.hgetall(_key("stats"))
+            pending, running, dead, workers, counters = await pipe.execute()
+    except Exception as e:
+        return {"available": False, "error": str(e)}
+
+    return {
+        "available": True,
+        "pending": pending,
+        "running": running,
+        "dead": dead,
+        "workers": workers,
+        **{name: int(value) for name, value in counters.items()},
+    }
+
+
+class JobWorker:
+    """Claims jobs from the queue and runs up to ``concurrency`` of them at once."""
+
+    def __init__(self, concurrency: Optional[int] = None):
+        self.concurrency = concurrency or settings.job_worker_concurrency
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._tasks: Set[asyncio.Task] = set()
+        self._stopping = asyncio.Event()
+
+    def stop(self) -> None:
+        """Stop claiming new jobs; running jobs are allowed to finish."""
+        self._stopping.set()
+
+    async def run(self) -> None:
+        client = get_redis()
+        if client is None:
+            raise RuntimeError("Redis is not configured")
+        logger.info("Job worker %s started (concurrency=%d, kinds=%s)", self.worker_id, self.concurrency, sorted(_handlers))
+
+        await self._announce()
+        reaper = asyncio.create_task(self._reap_forever())
+        try:
+            while not self._stopping.is_set():
+                await self._semaphore.acquire()
+                job = None
+                try:
+                    job = await self._claim()
+                except Exception as e:
+                    logger.warning("Job claim failed: %s", e)
+                if job is None:
+                    self._semaphore.release()
+                    await self._sleep(settings.job_queue_poll_seconds)
+                    continue
+                task = asyncio.create_task(self._execute(job))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+        finally:
+            reaper.cancel()
+            if self._tasks:
+                logger.info("Waiting for %d running job(s) to finish", len(self._tasks))
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+            try:
+                await client.zrem(_key("workers"), self.worker_id)
+            except Exception as e:
+                logger.warning("Failed to deregister worker %s: %s", self.worker_id, e)
+            logger.info("Job worker %s stopped", self.worker_id)
+
+    async def _sleep(self, seconds: float) -> None:
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _claim(self) -> Optional[Dict[str, Any]]:
+        client = get_redis()
+        lease_until = time.time() + settings.job_lease_seconds
+        claimed = await client.eval(
+            _CLAIM_LUA, 3, _key("pending"), _key("leases"), _key("attempts"),
+            lease_until, _key("job:"),
+        )
+        if not claimed:
+            return None
+        raw, attempts = claimed
+        job = json.loads(raw)
+        job["attempts"] = int(attempts)
+        return job
+
+    async def _heartbeat(self, job_id: str) -> None:
+        client = get_redis()
+        while True:
+            await asyncio.sleep(settings.job_heartbeat_seconds)
+            try:
+                await client.zadd(_key("leases"), {job_id: time.time() + settings.job_lease_seconds}, xx=True)
+            except Exception as e:
+                logger.warning("Heartbeat for job %s failed: %s", job_id, e)
+
+    async def _execute(self, job: Dict[str, Any]) -> None:
+        client = get_redis()
+        job_id = job["id"]
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+        outcome = "completed"
+        started = time.monotonic()
+        try:
+            handler = _handlers.get(job["kind"])
+            if handler is None:
+                raise RuntimeError(f"No handler registered for job kind '{job['kind']}'")
+            logger.info("Job %s started (attempt %d)", job_id, job["attempts"])
+            await handler(job["payload"])
+        except Exception:
+            # Handlers record their own failure state; a failed job is not retried
+            outcome = "failed"
+            logger.exception("Job %s failed", job_id)
+        finally:
+            heartbeat.cancel()
+            self._semaphore.release()
+            try:
+                async with client.pipeline(transaction=True) as pipe:
+                    pipe.zrem(_key("leases"), job_id)
+                    pipe.delete(_key(f"job:{job_id}"))
+                    pipe.hdel(_key("attempts"), job_id)
+                    pipe.hincrby(_key("stats"), outcome, 1)
+                    await pipe.execute()
+            except Exception as e:
+                logger.error("Failed to release job %s: %s", job_id, e)
+            logger.info("Job %s %s in %.1fs", job_id, outcome, time.monotonic() - started)
+
+    async def _announce(self) -> None:
+        """Record this worker as alive and drop workers that stopped announcing."""
+        client = get_redis()
+        now = time.time()
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.zadd(_key("workers"), {self.worker_id: now})
+            pipe.zremrangebyscore(_key("workers"), "-inf", now - settings.job_lease_seconds)
+            await pipe.execute()
+
+    async def _reap_forever(self) -> None:
+        while True:
+            try:
+                await self._announce()
+            except Exception as e:
+                logger.warning("Worker heartbeat failed: %s", e)
+            try:
+                await self.reap_expired()
+            except Exception as e:
+                logger.warning("Job reaper error: %s", e)
+            await asyncio.sleep(settings.job_heartbeat_seconds)
+
+    async def reap_expired(self) -> None:
+        """Requeue jobs whose lease expired; dead-letter those out of attempts."""
+        client = get_redis()
+        dead = await client.eval(
+            _REAP_LUA, 5,
+            _key("leases"), _key("pending"), _key("dead"), _key("stats"), _key("attempts"),
+            time.time(), settings.job_max_attempts, _key("job:"),
+        )
+        for raw in dead or []:
+            job = json.loads(raw)
+            logger.warning("Job %s abandoned after %d attempts", job["id"], settings.job_max_attempts)
+            on_dead = _dead_handlers.get(job["kind"])
+            if on_dead is not None:
+                try:
+                    await on_dead(job["payload"])
+                except Exception as e:
+                    logger.error("Dead-letter handler for job %s failed: %s", job["id"], e)
@@ -0,0 +1,190 @@
+"""Plain-text form of curriculum day lessons, computed once per write.
+
+Day content is a TipTap/ProseMirror document. Whenever a day is written
+(generation, edits, regeneration, custom days) ``lesson_text_columns`` flattens
+it into three ``curriculum_days`` columns:
+
+- ``content_text``: the lesson as plain text, one block per section
+  (heading line, then body), sections separated by a blank line;
+- ``content_sections``: ``[{"heading", "start", "end", "tokens"}]`` where
+  ``start``/``end`` delimit the section body within ``content_text``;
+- ``content_tokens``: estimated tokens of the whole text.
+
+Readers (chat, practice) go through ``get_lesson_text``, which serves these
+from a per-worker LRU grouped by curriculum and falls back to parsing
+``content`` (and backfilling the columns) for rows written before they
+existed. Writers call ``invalidate`` so the local worker sees edits at once;
+other workers pick them up within ``settings.lesson_text_cache_ttl_seconds``.
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.log import get_logger
+from app.db.supabase_client import run_query, supabase
+from app.services.chat_context import estimate_tokens
+
+logger = get_logger(__name__)
+
+_COLUMNS = "id, day_number, content_text, content_sections, content_tokens"
+
+# curriculum_id -> {day_number: record}
+_cache = TTLCache(settings.lesson_text_cache_max_curricula, ttl=settings.lesson_text_cache_ttl_seconds)
+
+
+def node_text(node: Dict[str, Any]) -> str:
+    """All text in a TipTap node, space-joined."""
+    parts: List[str] = []
+
+    def walk(current: Dict[str, Any]) -> None:
+        if current.get("type") == "text" and current.get("text"):
+            parts.append(current["text"])
+        for child in current.get("content") or []:
+            if isinstance(child, dict):
+                walk(child)
+
+    walk(node)
+    return " ".join(parts).strip()
+
+
+def lesson_sections(content: Any) -> List[Dict[str, str]]:
+    """Split lesson content into ``{"heading", "text"}`` sections at TipTap headings."""
+    if isinstance(content, str):
+        return [{"heading": "", "text": content}] if content.strip() else []
+    if not (isinstance(content, dict) and content.get("type") == "doc" and isinstance(content.get("content"), list)):
+        return []
+
+    sections: List[Dict[str, str]] = []
+    heading, texts = "", []
+    for node in content["content"]:
+        if not isinstance(node, dict):
+            continue
+        text = node_text(node)
+        if node.get("type") == "heading":
+            if texts:
+                sections.append({"heading": heading, "text": " ".join(texts)})
+            heading, texts = text, []
+        elif text:
+            texts.append(text)
+    if texts or heading:
+        sections.append({"heading": heading, "text": " ".join(texts)})
+    return sections
+
+
+def build_lesson_text(content: Any) -> Dict[str, Any]:
+    """Flatten lesson content into ``{"text", "sections", "tokens"}`` (see module docstring)."""
+    blocks: List[str] = []
+    sections: List[Dict[str, Any]] = []
+    offset = 0
+    for section in lesson_sections(content):
+        prefix = f"{section['heading']}\n" if section["heading"] else ""
+        block = prefix + section["text"]
+        if blocks:
+            offset += 2  # "\n\n" separator
+        start = offset + len(prefix)
+        sections.append({
+            "heading": section["heading"],
+            "start": start,
+            "end": start + len(section["text"]),
+            "tokens": estimate_tokens(block),
+        })
+        blocks.append(block)
+        offset += len(block)
+    text = "\n\n".join(blocks)
+    return {"text": text, "sections": sections, "tokens": estimate_tokens(text)}
+
+
+def lesson_text_columns(content: Any) -> Dict[str, Any]:
+    """``curriculum_days`` column values derived from ``content``."""
+    lesson = build_lesson_text(content)
+    return {
+        "content_text": lesson["text"],
+        "content_sections": lesson["sections"],
+        "content_tokens": lesson["tokens"],
+    }
+
+
+def section_texts(lesson: Dict[str, Any]) -> List[Dict[str, str]]:
+    """``{"heading", "text"}`` sections of a stored lesson, for prompt selection."""
+    text = lesson["text"]
+    return [{"heading": s["heading"], "text": text[s["start"]:s["end"]]} for s in lesson["sections"]]
+
+
+def plain_text(content: Any) -> str:
+    """Plain text of any TipTap document (or JSON string of one)."""
+    if isinstance(content, str):
+        try:
+            content = json.loads(content)
+        except ValueError:
+            return content
+    return node_text(content) if isinstance(content, dict) else ""
+
+
+def _record(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": str(row["id"]),
+        "day_number": row["day_number"],
+        "text": row["content_text"],
+        "sections": row["content_sections"] or [],
+        "tokens": row.get("content_tokens") or estimate_tokens(row["content_text"]),
+    }
+
+
+async def _load(curriculum_id: str, day_number: Optional[int], day_id: Optional[str]) -> Optional[Dict[str, Any]]:
+    query = supabase.table("curriculum_days").select(_COLUMNS).eq("curriculum_id", curriculum_id)
+    query = query.eq("id", day_id) if day_id else query.eq("day_number", day_number)
+    response = await run_query(query.maybe_single())
+    if not response or not response.data:
+        return None
+    row = response.data
+    if row.get("content_text") is None:
+        # Written before the columns existed: parse once and backfill
+        content_resp = await run_query(supabase.table("curriculum_days").select("content").eq("id", row["id"]).maybe_single())
+        columns = lesson_text_columns(content_resp.data.get("content") if content_resp and content_resp.data else None)
+        row.update(columns)
+        try:
+            await run_query(supabase.table("curriculum_days").update(columns).eq("id", row["id"]))
+        except Exception as e:
+            logger.warning("Failed to backfill lesson text for day %s: %s", row["id"], e)
+    return _record(row)
+
+
+async def get_lesson_text(
+    curriculum_id: str,
+    day_number: Optional[int] = None,
+    day_id: Optional[str] = None,
+) -> Optional[Dict[str, Any]]:
+    """Stored lesson text of one day, by number or id.
+
+    Returns ``{"id", "day_number", "text", "sections", "tokens"}`` or None if
+    the day doesn't exist.
+    """
+    curriculum_id = str(curriculum_id)
+    days = _cache.get(curriculum_id)
+    if days is not None:
+        if day_id is None and day_number in days:
+            return days[day_number]
+        if day_id is not None:
+            for record in days.values():
+                if record["id"] == str(day_id):
+                    return record
+
+    record = await _load(curriculum_id, day_number, str(day_id) if day_id else None)
+    if record is not None:
+        days = _cache.get(curriculum_id)
+        if days is None:
+            days = {}
+            _cache.set(curriculum_id, days)
+        days[record["day_number"]] = record
+    return record
+
+
+def invalidate(curriculum_id: str) -> None:
+    """Drop cached lesson text for a curriculum after any of its days change."""
+    _cache.pop(str(curriculum_id))
+
+
+def lesson_text_cache_stats() -> Dict[str, Any]:
+    return _cache.stats()
@@ -0,0 +1,225 @@
+"""Archive of raw LLM outputs, indexed by curriculum.
+
+Replaces appending to ``llm_responses.log``. Records are JSON lines written
+by a single background thread, so callers on the event loop only enqueue:
+
+- ``<dir>/segment-<stamp>.jsonl`` is the active segment. It is rotated once
+  it exceeds ``llm_archive_max_segment_bytes`` or is older than
+  ``llm_archive_rotate_seconds``; closed segments are gzip-compressed and
+  only the newest ``llm_archive_max_segments`` are kept.
+- ``<dir>/index.jsonl`` has one line per record
+  (``curriculum_id, ts, kind, segment, offset, length``) where ``offset`` is
+  the uncompressed byte offset within the segment, so a record can be read
+  back without scanning the archive.
+
+``scripts/llm_archive.py`` is the CLI for looking records up.
+"""
+
+import gzip
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.core.config import settings
+from app.core.log import get_logger
+
+logger = get_logger(__name__)
+
+INDEX_FILE = "index.jsonl"
+
+_STOP = object()
+
+
+class LLMArchive:
+    def __init__(
+        self,
+        directory: str,
+        max_segment_bytes: int = 20 * 1024 * 1024,
+        rotate_seconds: float = 24 * 3600,
+        max_segments: int = 30,
+        queue_size: int = 1000,
+    ):
+        self.directory = Path(directory)
+        self.max_segment_bytes = max_segment_bytes
+        self.rotate_seconds = rotate_seconds
+        self.max_segments = max_segments
+        self.dropped = 0
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._segment: Optional[Path] = None
+        self._segment_opened = 0.0
+
+    # -- producer side (any thread, including the event loop) --
+
+    def record(self, kind: str, text: str, curriculum_id: Optional[str] = None, **fields: Any) -> None:
+        """Queue one raw output for archiving; never blocks."""
+        entry = {
+            "ts": datetime.now(timezone.utc).isoformat(),
+            "kind": kind,
+            "curriculum_id": str(curriculum_id) if curriculum_id else None,
+            **fields,
+            "text": text,
+        }
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Flush queued records and stop the writer thread."""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "directory": str(self.directory),
+            "queued": self._queue.qsize(),
+            "dropped": self.dropped,
+            "segment": self._segment.name if self._segment else None,
+        }
+
+    def _ensure_writer(self) -> None:
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="llm-archive", daemon=True)
+                self._thread.start()
+
+    # -- writer thread --
+
+    def _run(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        while True:
+            entry = self._queue.get()
+            if entry is _STOP:
+                return
+            try:
+                self._write(entry)
+            except Exception:
+                logger.exception("LLM archive write failed")
+
+    def _write(self, entry: Dict[str, Any]) -> None:
+        segment = self._current_segment()
+        line = (json.dumps(entry, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+        with open(segment, "ab") as f:
+            offset = f.tell()
+            f.write(line)
+        index_entry = {
+            "curriculum_id": entry["curriculum_id"],
+            "ts": entry["ts"],
+            "kind": entry["kind"],
+            "segment": segment.name,
+            "offset": offset,
+            "length": len(line),
+        }
+        with open(self.directory / INDEX_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(index_entry) + "\n")
+
+    def _current_segment(self) -> Path:
+        segment = self._segment
+        if segment is None:
+            # Resume the newest uncompressed segment after a restart
+            existing = sorted(self.directory.glob("segment-*.jsonl"))
+            if existing:
+                segment = existing[-1]
+                self._segment_opened = segment.stat().st_mtime
+        if segment is not None and segment.exists():
+            too_big = segment.stat().st_size >= self.max_segment_bytes
+            too_old = time.time() - self._segment_opened >= self.rotate_seconds
+            if too_big or too_old:
+                self._compress(segment)
+                segment = None
+        if segment is None:
+            stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+            segment = self.directory / f"segment-{stamp}.jsonl"
+            self._segment_opened = time.time()
+            self._prune()
+        self._segment = segment
+        return segment
+
+    def _compress(self, segment: Path) -> None:
+        with open(segment, "rb") as src, gzip.open(f"{segment}.gz", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        segment.unlink()
+
+    def _prune(self) -> None:
+        closed = sorted(self.directory.glob("segment-*.jsonl.gz"))
+        expired = closed[: max(0, len(closed) - self.max_segments)]
+        if not expired:
+            return
+        for path in expired:
+            path.unlink()
+        # Drop index lines pointing at deleted segments
+        gone = {path.name[: -len(".gz")] for path in expired}
+        index = self.directory / INDEX_FILE
+        if index.exists():
+            kept = [line for line in index.read_text(encoding="utf-8").splitlines() if json.loads(line)["segment"] not in gone]
+            tmp = index.with_suffix(".tmp")
+            tmp.write_text("".join(line + "\n" for line in kept), encoding="utf-8")
+            os.replace(tmp, index)
+
+    # -- readers (CLI, debugging) --
+
+    def lookup(self, curriculum_id: Optional[str] = None, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Index entries, oldest first, optionally filtered by curriculum and kind."""
+        index = self.directory / INDEX_FILE
+        if not index.exists():
+            return []
+        entries = []
+        with open(index, encoding="utf-8") as f:
+            for line in f:
+                entry = json.loads(line)
+                if curriculum_id and entry["curriculum_id"] != str(curriculum_id):
+                    continue
+                if kind and entry["kind"] != kind:
+                    continue
+                entries.append(entry)
+        return entries
+
+    def read(self, index_entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """The archived record an index entry points at (None if it was pruned)."""
+        plain = self.directory / index_entry["segment"]
+        compressed = Path(f"{plain}.gz")
+        if plain.exists():
+            opener = open
+            path = plain
+        elif compressed.exists():
+            opener = gzip.open
+            path = compressed
+        else:
+            return None
+        with opener(path, "rb") as f:
+            f.seek(index_entry["offset"])
+            return json.loads(f.read(index_entry["length"]))
+
+    def iter_records(self, curriculum_id: Optional[str] = None, kind: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        for entry in self.lookup(curriculum_id, kind):
+            record = self.read(entry)
+            if record is not None:
+                yield record
+
+
+llm_archive = LLMArchive(
+    settings.llm_archive_dir,
+    max_segment_bytes=settings.llm_archive_max_segment_bytes,
+    rotate_seconds=settings.llm_archive_rotate_seconds,
+    max_segments=settings.llm_archive_max_segments,
+)
+
+
+def archive_llm_output(kind: str, text: str, curriculum_id: Optional[str] = None, **fields: Any) -> None:
+    """Archive a raw LLM output (no-op when ``LLM_ARCHIVE_ENABLED`` is off)."""
+    if settings.llm_archive_enabled:
+        llm_archive.record(kind, text, curriculum_id, **fields)
@@ -0,0 +1,217 @@
+"""Two-tier cache for knowledge-source tool results.
+
+Research tools (YouTube, arXiv, Wikipedia, GitHub, Wolfram Alpha, Perplexity,
+Exa, Firecrawl) are wrapped with ``research_cached``. Results are keyed on the
+tool name, the normalised query and the remaining call parameters, and looked
+up in an in-process LRU, then Redis, then the tool itself.
+
+Each tool has its own freshness TTL. Once an entry goes stale it is still
+served for a further ``stale_ttl`` while a single background call refreshes
+it (guarded across workers by a short Redis lock). Error and empty results are
+never cached, and neither are results larger than
+``settings.research_cache_max_value_bytes``.
+"""
+
+import asyncio
+import functools
+import hashlib
+import inspect
+import json
+import time
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.log import get_logger
+from app.db.redis_client import get_redis
+from redis.exceptions import RedisError
+
+logger = get_logger(__name__)
+
+_KEY_PREFIX = "research:"
+_LOCK_PREFIX = "research:lock:"
+
+# key -> {"raw": json, "fresh_until": epoch, "stale_until": epoch}
+_local = TTLCache(settings.research_cache_max_entries)
+# key -> fetch shared by concurrent callers in this process
+_inflight: Dict[str, "asyncio.Task[Any]"] = {}
+# background refreshes (kept referenced until they finish)
+_refreshing: Set["asyncio.Task[Any]"] = set()
+# tool -> counter -> value
+_counters: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+
+def normalize_query(query: Any) -> str:
+    """Case- and whitespace-insensitive form of a query used in cache keys."""
+    return " ".join(str(query).split()).casefold()
+
+
+def cache_key(tool: str, params: Dict[str, Any]) -> str:
+    payload = json.dumps(params, sort_keys=True, default=str)
+    digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+    return f"{_KEY_PREFIX}{tool}:{digest}"
+
+
+def _is_cacheable(result: Any) -> bool:
+    """Tools report failures in-band as ``{"error": ...}`` (or a list of them)."""
+    if isinstance(result, dict):
+        return "error" not in result
+    if isinstance(result, list):
+        return bool(result) and not all(isinstance(item, dict) and "error" in item for item in result)
+    return result is not None
+
+
+async def _read_redis(key: str) -> Optional[Dict[str, Any]]:
+    client = get_redis()
+    if client is None:
+        return None
+    try:
+        raw = await client.get(key)
+    except RedisError as e:
+        logger.warning("Research cache read failed: %s", e)
+        return None
+    return json.loads(raw) if raw else None
+
+
+async def _store(tool: str, key: str, result: Any, ttl: float, stale_ttl: float) -> None:
+    if not _is_cacheable(result):
+        _counters[tool]["uncacheable"] += 1
+        return
+    raw = json.dumps(result, default=str)
+    if len(raw) > settings.research_cache_max_value_bytes:
+        _counters[tool]["too_large"] += 1
+        return
+
+    now = time.time()
+    entry = {"raw": raw, "fresh_until": now + ttl, "stale_until": now + ttl + stale_ttl}
+    _local.set(key, entry, ttl=ttl + stale_ttl)
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        await client.set(key, json.dumps(entry), px=int((ttl + stale_ttl) * 1000))
+    except RedisError as e:
+        logger.warning("Research cache write failed: %s", e)
+
+
+def _fetch(tool: str, key: str, call: Callable[[], Awaitable[Any]], ttl: float, stale_ttl: float) -> "asyncio.Task[Any]":
+    """Start (or join) the single in-process call that fills ``key``."""
+    task = _inflight.get(key)
+    if task is not None:
+        return task
+
+    async def fetch_and_store() -> Any:
+        result = await call()
+        await _store(tool, key, result, ttl, stale_ttl)
+        return result
+
+    task = asyncio.create_task(fetch_and_store())
+    _inflight[key] = task
+
+    def done(finished: "asyncio.Task[Any]") -> None:
+        if _inflight.get(key) is finished:
+            del _inflight[key]
+        if not finished.cancelled() and finished.exception() is not None:
+            logger.warning("Research tool %s failed: %s", tool, finished.exception())
+
+    task.add_done_callback(done)
+    return task
+
+
+def _refresh_in_background(tool: str, key: str, call: Callable[[], Awaitable[Any]], ttl: float, stale_ttl: float) -> None:
+    if key in _inflight:
+        return
+
+    async def refresh() -> None:
+        client = get_redis()
+        if client is not None:
+            try:
+                # Only one worker refreshes a given entry
+                if not await client.set(f"{_LOCK_PREFIX}{key}", "1", nx=True, ex=60):
+                    return
+            except RedisError:
+                pass
+        _counters[tool]["refreshes"] += 1
+        await _fetch(tool, key, call, ttl, stale_ttl)
+
+    task = asyncio.create_task(refresh())
+    _refreshing.add(task)
+    task.add_done_callback(_refreshing.discard)
+
+
+async def cached_call(
+    tool: str,
+    params: Dict[str, Any],
+    call: Callable[[], Awaitable[Any]],
+    ttl: float,
+    stale_ttl: float,
+) -> Any:
+    """Return ``call()``'s result for ``params`` through the local and Redis caches."""
+    if not settings.research_cache_enabled:
+        return await call()
+
+    key = cache_key(tool, params)
+    counters = _counters[tool]
+    now = time.time()
+    entry = _local.get(key)
+    source = "local_hits"
+    if entry is None:
+        entry = await _read_redis(key)
+        source = "redis_hits"
+        if entry is not None and entry["stale_until"] > now:
+            _local.set(key, entry, ttl=entry["stale_until"] - now)
+
+    if entry is not None and entry["stale_until"] > now:
+        if entry["fresh_until"] <= now:
+            source = "stale_hits"
+            _refresh_in_background(tool, key, call, ttl, stale_ttl)
+        counters[source] += 1
+        return json.loads(entry["raw"])
+
+    counters["misses"] += 1
+    # Shielded so a caller timing out doesn't abort the call others are waiting on
+    return await asyncio.shield(_fetch(tool, key, call, ttl, stale_ttl))
+
+
+def research_cached(tool: str, ttl: float, stale_ttl: Optional[float] = None, ignore: Iterable[str] = ()):
+    """Cache an async tool function's results (see module docstring).
+
+    ``ignore`` names parameters left out of the cache key, e.g. credentials.
+    The undecorated function stays available as ``.uncached``.
+    """
+    stale_ttl = ttl if stale_ttl is None else stale_ttl
+    ignored = set(ignore)
+
+    def decorator(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            params = {
+                name: normalize_query(value) if name == "query" else value
+                for name, value in bound.arguments.items()
+                if name not in ignored
+            }
+            return await cached_call(tool, params, lambda: func(*args, **kwargs), ttl, stale_ttl)
+
+        wrapper.uncached = func
+        return wrapper
+
+    return decorator
+
+
+def research_cache_stats() -> Dict[str, Any]:
+    """Per-tool hit/miss counters and local tier size (exposed via /api/health)."""
+    tools = {}
+    for tool, counters in _counters.items():
+        hits = counters["local_hits"] + counters["redis_hits"] + counters["stale_hits"]
+        lookups = hits + counters["misses"]
+        tools[tool] = {**counters, "hit_rate": round(hits / lookups, 3) if lookups else None}
+    return {
+        "enabled": settings.research_cache_enabled,
+        "local": _local.stats(),
+        "tools": tools,
+    }
@@ -0,0 +1,102 @@
+"""Incremental parsing of streamed LLM JSON output."""
+
+import json
+from typing import Any, Dict, List, Optional
+
+import json_repair
+
+
+class JSONArrayStreamParser:
+    """Emit elements of a top-level array field as soon as each one closes.
+
+    Feed it text deltas from a streamed completion of the form
+    ``{"<key>": [ {...}, {...} ]}`` (optionally wrapped in a ```json fence);
+    ``feed`` returns every object element of ``<key>`` completed by that
+    delta. Only the scanner state is kept between calls, so the cost is linear
+    in the response length.
+    """
+
+    def __init__(self, array_key: str = "days"):
+        self.array_key = array_key
+        self._buf = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_key: Optional[str] = None
+        self._array_depth: Optional[int] = None
+        self._element_start: Optional[int] = None
+        self._started = False
+        self.array_closed = False
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        self._buf += text
+        elements: List[Dict[str, Any]] = []
+        buf = self._buf
+        i = self._pos
+        while i < len(buf):
+            ch = buf[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_key = buf[self._string_start + 1:i]
+            elif not self._started:
+                # Skip any preamble (e.g. a ```json fence) before the root object
+                if ch == "{":
+                    self._started = True
+                    self._depth = 1
+            elif ch == '"':
+                self._in_string = True
+                self._string_start = i
+            elif ch in "{[":
+                if (
+                    ch == "["
+                    and self._depth == 1
+                    and self._array_depth is None
+                    and self._last_key == self.array_key
+                ):
+                    self._array_depth = 2
+                elif ch == "{" and self._depth == self._array_depth:
+                    self._element_start = i
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if ch == "}" and self._element_start is not None and self._depth == self._array_depth:
+                    element = self._decode(buf[self._element_start:i + 1])
+                    if element is not None:
+                        elements.append(element)
+                    self._element_start = None
+                elif ch == "]" and self._array_depth is not None and self._depth == self._array_depth - 1:
+                    self._array_depth = None
+                    self.array_closed = True
+            i += 1
+
+        # Drop text that can no longer be part of an element
+        if self._element_start is None and not self._in_string:
+            self._buf = ""
+            self._pos = 0
+        else:
+            start = self._element_start if self._element_start is not None else self._string_start
+            self._buf = buf[start:]
+            self._pos = i - start
+            if self._element_start is not None:
+                self._element_start = 0
+            self._string_start -= start
+        return elements
+
+    @staticmethod
+    def _decode(text: str) -> Optional[Dict[str, Any]]:
+        try:
+            value = json.loads(text)
+        except json.JSONDecodeError:
+            try:
+                value = json_repair.loads(text)
+            except Exception:
+                return None
+        return value if isinstance(value, dict) else None
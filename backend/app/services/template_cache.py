@@ -0,0 +1,309 @@
+"""Reusable curriculum templates for near-identical generation requests.
+
+A finished curriculum is stored as a template under a parameter *bucket*
+(difficulty, duration, number of projects, daily time, learning style and
+prerequisites — these must match exactly) and an embedding of the normalised
+learning goal. A new request in the same bucket
+whose goal is close enough reuses it:
+
+- score >= ``template_cache_clone_threshold`` (or the exact same goal): the
+  days are cloned into the new curriculum without calling the model;
+- score >= ``template_cache_warm_start_threshold``: the template's titles are
+  used as the outline and only the day bodies are generated.
+
+Templates live in Qdrant (``template_cache_store = "qdrant"``) so every worker
+shares them, or in a bounded in-process index (``"memory"``). Entries expire
+after ``template_cache_ttl_days`` and the oldest are evicted past
+``template_cache_max_entries``. Everything here is best-effort: any failure is
+treated as a miss.
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import NAMESPACE_URL, uuid5
+
+import aiohttp
+from app.core.config import settings
+from app.core.http_client import get_http_session
+from app.core.log import get_logger
+from app.models.curriculum import CurriculumCreate
+from app.services.validation_service import CurriculumResponse
+
+logger = get_logger(__name__)
+
+
+def _normalize_goal(goal: str) -> str:
+    return " ".join(re.sub(r"[^\w\s+#.]", " ", goal.casefold()).split())
+
+
+def template_key(curriculum_data: CurriculumCreate) -> Tuple[str, str]:
+    """Return ``(bucket, fingerprint)`` for a generation request."""
+    # Same defaults as the generation prompt, so "unset" and the default share a bucket
+    prerequisites = _normalize_goal(curriculum_data.prerequisites or "") or "none"
+    bucket = ":".join([
+        (curriculum_data.difficulty_level or "").casefold(),
+        str(curriculum_data.estimated_duration_days),
+        str(curriculum_data.num_projects or 0),
+        str(curriculum_data.daily_time_commitment_minutes or 60),
+        _normalize_goal(curriculum_data.learning_style or "") or "balanced",
+        hashlib.sha256(prerequisites.encode("utf-8")).hexdigest()[:16],
+    ])
+    fingerprint = hashlib.sha256(f"{bucket}:{_normalize_goal(curriculum_data.learning_goal)}".encode("utf-8")).hexdigest()
+    return bucket, fingerprint
+
+
+def _unit(vector: List[float]) -> List[float]:
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+async def embed_goal(goal: str) -> Optional[List[float]]:
+    """Unit-length embedding of a learning goal, or None if embeddings are unavailable."""
+    if not settings.gemini_api_key:
+        return None
+    headers = {
+        "Authorization": f"Bearer {settings.gemini_api_key}",
+        "Content-Type": "application/json",
+    }
+    payload = {"model": settings.template_cache_embedding_model, "input": _normalize_goal(goal)}
+    try:
+        session = get_http_session()
+        timeout = aiohttp.ClientTimeout(total=10)
+        async with session.post(f"{settings.gemini_base_url}/embeddings", headers=headers, json=payload, timeout=timeout) as response:
+            if response.status != 200:
+                logger.warning("Embedding request failed: %s %s", response.status, (await response.text())[:200])
+                return None
+            data = await response.json()
+        return _unit(data["data"][0]["embedding"])
+    except Exception as e:
+        logger.warning("Embedding request failed: %s", e)
+        return None
+
+
+class _MemoryIndex:
+    """In-process template index (per worker), LRU-bounded."""
+
+    def __init__(self):
+        # fingerprint -> {"bucket", "vector", "template", "created_at"}
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def _expired(self, entry: Dict[str, Any]) -> bool:
+        return entry["created_at"] < time.time() - settings.template_cache_ttl_days * 86400
+
+    async def get(self, fingerprint: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(fingerprint)
+        if entry is None or self._expired(entry):
+            return None
+        self._entries.move_to_end(fingerprint)
+        return entry["template"]
+
+    async def search(self, bucket: str, vector: List[float]) -> Optional[Tuple[float, Dict[str, Any]]]:
+        best: Optional[Tuple[float, str]] = None
+        for fingerprint, entry in self._entries.items():
+            if entry["bucket"] != bucket or entry["vector"] is None or self._expired(entry):
+                continue
+            score = sum(a * b for a, b in zip(vector, entry["vector"]))
+            if best is None or score > best[0]:
+                best = (score, fingerprint)
+        if best is None:
+            return None
+        self._entries.move_to_end(best[1])
+        return best[0], self._entries[best[1]]["template"]
+
+    async def put(self, bucket: str, fingerprint: str, vector: Optional[List[float]], template: Dict[str, Any]) -> None:
+        self._entries[fingerprint] = {"bucket": bucket, "vector": vector, "template": template, "created_at": time.time()}
+        self._entries.move_to_end(fingerprint)
+        for stale in [key for key, entry in self._entries.items() if self._expired(entry)]:
+            del self._entries[stale]
+        while len(self._entries) > settings.template_cache_max_entries:
+            self._entries.popitem(last=False)
+
+
+class _QdrantIndex:
+    """Template index shared by all workers through Qdrant."""
+
+    def __init__(self):
+        self._client = None
+        self._ready = False
+        self._lock = asyncio.Lock()
+
+    def _point_id(self, fingerprint: str) -> str:
+        return str(uuid5(NAMESPACE_URL, f"curriculum-template:{fingerprint}"))
+
+    async def _collection(self, vector_size: Optional[int] = None):
+        """Return the client once the collection exists (created on the first write)."""
+        from qdrant_client import AsyncQdrantClient, models
+
+        if self._client is None:
+            self._client = AsyncQdrantClient(url=settings.qdrant_url, api_key=settings.qdrant_api_key, timeout=10)
+        if self._ready:
+            return self._client
+        async with self._lock:
+            name = settings.template_cache_collection
+            if not await self._client.collection_exists(name):
+                if vector_size is None:
+                    return None
+                await self._client.create_collection(
+                    name,
+                    vectors_config=models.VectorParams(size=vector_size, distance=models.Distance.COSINE),
+                )
+                await self._client.create_payload_index(name, "bucket", models.PayloadSchemaType.KEYWORD)
+                await self._client.create_payload_index(name, "created_at", models.PayloadSchemaType.FLOAT)
+            self._ready = True
+        return self._client
+
+    async def get(self, fingerprint: str) -> Optional[Dict[str, Any]]:
+        client = await self._collection()
+        if client is None:
+            return None
+        points = await client.retrieve(settings.template_cache_collection, ids=[self._point_id(fingerprint)], with_payload=True)
+        if not points or self._expired(points[0].payload):
+            return None
+        return json.loads(points[0].payload["template"])
+
+    async def search(self, bucket: str, vector: List[float]) -> Optional[Tuple[float, Dict[str, Any]]]:
+        from qdrant_client import models
+
+        client = await self._collection()
+        if client is None:
+            return None
+        result = await client.query_points(
+            settings.template_cache_collection,
+            query=vector,
+            query_filter=models.Filter(must=[
+                models.FieldCondition(key="bucket", match=models.MatchValue(value=bucket)),
+                models.FieldCondition(key="created_at", range=models.Range(gte=self._cutoff())),
+            ]),
+            limit=1,
+            with_payload=True,
+        )
+        if not result.points:
+            return None
+        point = result.points[0]
+        return point.score, json.loads(point.payload["template"])
+
+    async def put(self, bucket: str, fingerprint: str, vector: Optional[List[float]], template: Dict[str, Any]) -> None:
+        from qdrant_client import models
+
+        if vector is None:
+            # Points need a vector; without embeddings the memory index is the only option
+            return
+        client = await self._collection(vector_size=len(vector))
+        name = settings.template_cache_collection
+        await client.upsert(name, points=[models.PointStruct(
+            id=self._point_id(fingerprint),
+            vector=vector,
+            payload={"bucket": bucket, "created_at": time.time(), "template": json.dumps(template)},
+        )])
+        await self._evict(client)
+
+    def _cutoff(self) -> float:
+        return time.time() - settings.template_cache_ttl_days * 86400
+
+    def _expired(self, payload: Dict[str, Any]) -> bool:
+        return payload.get("created_at", 0) < self._cutoff()
+
+    async def _evict(self, client) -> None:
+        from qdrant_client import models
+
+        name = settings.template_cache_collection
+        await client.delete(name, points_selector=models.FilterSelector(filter=models.Filter(must=[
+            models.FieldCondition(key="created_at", range=models.Range(lt=self._cutoff())),
+        ])))
+        excess = (await client.count(name, exact=True)).count - settings.template_cache_max_entries
+        if excess > 0:
+            oldest, _ = await client.scroll(
+                name,
+                limit=excess,
+                order_by=models.OrderBy(key="created_at", direction=models.Direction.ASC),
+                with_payload=False,
+            )
+            await client.delete(name, points_selector=models.PointIdsList(points=[point.id for point in oldest]))
+
+
+_index = _QdrantIndex() if settings.template_cache_store == "qdrant" else _MemoryIndex()
+_stats: Dict[str, int] = {"clones": 0, "warm_starts": 0, "misses": 0, "stored": 0, "errors": 0}
+
+
+async def find_template(curriculum_data: CurriculumCreate) -> Optional[Dict[str, Any]]:
+    """Look up a reusable template for a request.
+
+    Returns ``{"mode": "clone" | "warm_start", "score": float, "template": {...}}``
+    or None. ``template`` has the ``CurriculumResponse`` shape.
+    """
+    if not settings.template_cache_enabled:
+        return None
+    bucket, fingerprint = template_key(curriculum_data)
+    try:
+        template = await _index.get(fingerprint)
+        if template is not None:
+            _stats["clones"] += 1
+            return {"mode": "clone", "score": 1.0, "template": template}
+
+        vector = await embed_goal(curriculum_data.learning_goal)
+        found = await _index.search(bucket, vector) if vector is not None else None
+    except Exception as e:
+        _stats["errors"] += 1
+        logger.warning("Template lookup failed: %s", e)
+        return None
+
+    if found is not None:
+        score, template = found
+        if score >= settings.template_cache_clone_threshold:
+            _stats["clones"] += 1
+            return {"mode": "clone", "score": score, "template": template}
+        if score >= settings.template_cache_warm_start_threshold:
+            _stats["warm_starts"] += 1
+            return {"mode": "warm_start", "score": score, "template": template}
+    _stats["misses"] += 1
+    return None
+
+
+async def store_template(curriculum_data: CurriculumCreate, generated: Dict[str, Any]) -> None:
+    """Save a successfully generated curriculum as a template (validated first)."""
+    if not settings.template_cache_enabled:
+        return
+    try:
+        CurriculumResponse.model_validate(generated)
+        template = {
+            "curriculum_title": generated["curriculum_title"],
+            "curriculum_description": generated["curriculum_description"],
+            "days": sorted(generated["days"], key=lambda day: day["day_number"]),
+        }
+        if len(template["days"]) != curriculum_data.estimated_duration_days:
+            return
+        bucket, fingerprint = template_key(curriculum_data)
+        vector = await embed_goal(curriculum_data.learning_goal)
+        await _index.put(bucket, fingerprint, vector, template)
+        _stats["stored"] += 1
+    except Exception as e:
+        _stats["errors"] += 1
+        logger.warning("Failed to store curriculum template: %s", e)
+
+
+def outline_from_template(template: Dict[str, Any]) -> Dict[str, Any]:
+    """Outline (see ``CurriculumOutline``) reusing a template's day titles."""
+    return {
+        "curriculum_title": template["curriculum_title"],
+        "curriculum_description": template["curriculum_description"],
+        "days": [
+            {
+                "day_number": day["day_number"],
+                "title": day["title"],
+                "objectives": [],
+                "is_project_day": bool(day.get("is_project_day")),
+                "project_title": (day.get("project_data") or {}).get("title"),
+            }
+            for day in template["days"]
+        ],
+    }
+
+
+def template_cache_stats() -> Dict[str, Any]:
+    return {"enabled": settings.template_cache_enabled, "store": settings.template_cache_store, **_stats}
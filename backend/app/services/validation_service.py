@@ -1,10 +1,15 @@
 import json
+import logging
 import re
 from typing import Any, Dict, List, Literal, Optional
 
 import json_repair
+from app.core.log import get_logger
+from app.services.llm_archive import archive_llm_output
 from pydantic import BaseModel, Field, ValidationError
 
+logger = get_logger(__name__)
+
 
 # Pydantic Schemas for Validation
 class TipTapNode(BaseModel):
@@ -46,6 +51,19 @@ class CurriculumResponse(BaseModel):
     curriculum_description: str
     days: List[CurriculumDay]
 
+# Two-stage generation: outline first, then day bodies in chunks
+class OutlineDay(BaseModel):
+    day_number: int
+    title: str
+    objectives: List[str] = Field(default_factory=list)
+    is_project_day: bool = False
+    project_title: Optional[str] = None
+
+class CurriculumOutline(BaseModel):
+    curriculum_title: str
+    curriculum_description: str
+    days: List[OutlineDay]
+
 def repair_json(json_str: str, error: str = "") -> str:
     """
     Simplified JSON repair function using json_repair library.
@@ -54,31 +72,21 @@ def repair_json(json_str: str, error: str = "") -> str:
     try:
         # Use the library's repair_json function which returns a repaired JSON string
         repaired_json_str = json_repair.repair_json(json_str)
-        print(f"[REPAIR] Successfully repaired JSON using json_repair library")
+        logger.debug("Repaired JSON with json_repair")
         return repaired_json_str
     except Exception as e:
-        print(f"[REPAIR] json_repair failed: {str(e)}")
+        logger.warning("json_repair failed: %s", e)
         return json_str
 
-async def clean_and_validate_json(json_str: str) -> Optional[Dict[str, Any]]:
-    """
-    Cleans a JSON string using json_repair and validates it against the CurriculumResponse schema.
-    Uses a specialized library designed specifically for fixing LLM JSON output.
-    """
-    # Log the raw input for debugging
-    print(f"[VALIDATION] Raw response length: {len(json_str)}")
-    print(f"[VALIDATION] Raw response preview: {json_str[:200]}..." if len(json_str) > 200 else json_str)
-    
-    # 1. Extract JSON from markdown code blocks if present
+def extract_json_block(json_str: str) -> str:
+    """Strip a ```json markdown fence (or generic fence) around an LLM response."""
     # Handle different markdown variations
     if json_str.strip().startswith("```json") and json_str.strip().endswith("```"):
         # Clean markdown code block format
         json_str = json_str.strip()[7:-3].strip()  # Remove ```json and ```
-        print(f"[VALIDATION] Extracted JSON from markdown code block")
     elif json_str.strip().startswith("```") and json_str.strip().endswith("```"):
         # Generic code block
         json_str = json_str.strip()[3:-3].strip()
-        print(f"[VALIDATION] Extracted from generic code block")
     elif "```json" in json_str:
         # Find the first ```json and last ```
         start_idx = json_str.find("```json")
@@ -90,45 +98,79 @@ async def clean_and_validate_json(json_str: str) -> Optional[Dict[str, Any]]:
             end_idx = json_str.find("```", start_idx)
             if end_idx != -1:
                 json_str = json_str[start_idx:end_idx].strip()
-                print(f"[VALIDATION] Extracted JSON from markdown code block (mid-string)")
-    
-    print(f"[VALIDATION] After markdown extraction, JSON preview: {json_str[:200]}..." if len(json_str) > 200 else json_str)
+    return json_str
+
+async def clean_and_validate_json(json_str: str, curriculum_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Cleans a JSON string using json_repair and validates it against the CurriculumResponse schema.
+    Uses a specialized library designed specifically for fixing LLM JSON output.
+    Failures are recorded in the LLM archive under ``curriculum_id``.
+    """
+    # 1. Extract JSON from markdown code blocks if present
+    raw_length = len(json_str)
+    json_str = extract_json_block(json_str)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Validating curriculum JSON: %d chars raw, %d after fence extraction", raw_length, len(json_str))
 
     # 2. Use json_repair to fix any JSON corruption
     try:
         # json_repair.loads directly returns a Python object. It has no extra arguments.
         data = json_repair.loads(json_str)
-        print(f"[VALIDATION] Successfully parsed and repaired JSON with json_repair")
 
         # --- Post-process: ensure required optional fields are present ---
         if isinstance(data, dict) and isinstance(data.get("days"), list):
             for day in data["days"]:
                 # Ensure resources key exists and is a list
                 if "resources" not in day or day["resources"] is None:
-                    print(f"[VALIDATION] 'resources' missing for day {day.get('day_number')} – inserting []")
+                    logger.debug("'resources' missing for day %s, inserting []", day.get("day_number"))
                     day["resources"] = []
         
     except Exception as e:
-        print(f"[VALIDATION] json_repair failed: {str(e)}")
-        # Log the failure
-        import datetime
-        with open("llm_responses.log", "a") as f:
-            f.write(f"\n\n=== FAILED JSON REPAIR at {datetime.datetime.now()} ===\n")
-            f.write(f"Error: {str(e)}\n")
-            f.write(f"JSON String Preview:\n{json_str[:1000]}\n")
+        logger.warning("json_repair failed: %s", e)
+        archive_llm_output("json_repair_failed", json_str, curriculum_id, error=str(e))
         return None
         
     # 3. Validate with Pydantic
     try:
         CurriculumResponse.model_validate(data)
-        print(f"[VALIDATION] Successfully validated with Pydantic")
         return data
     except (ValidationError, Exception) as e:
-        print(f"[VALIDATION] Pydantic validation failed: {str(e)}")
-        # Log validation failure
-        import datetime
-        with open("llm_responses.log", "a") as f:
-            f.write(f"\n\n=== PYDANTIC VALIDATION FAILED at {datetime.datetime.now()} ===\n")
-            f.write(f"Error: {str(e)}\n")
-            f.write(f"Data keys: {list(data.keys()) if isinstance(data, dict) else 'Not a dict'}\n")
-        return None 
\ No newline at end of file
+        logger.warning("Curriculum validation failed: %s", e)
+        archive_llm_output(
+            "validation_failed",
+            json_str,
+            curriculum_id,
+            error=str(e),
+            data_keys=list(data.keys()) if isinstance(data, dict) else None,
+        )
+        return None
+
+def _load_repaired(json_str: str) -> Any:
+    data = json_repair.loads(extract_json_block(json_str))
+    if not isinstance(data, dict):
+        raise ValueError(f"Expected a JSON object, got {type(data).__name__}")
+    return data
+
+def parse_outline(json_str: str, expected_days: int) -> Dict[str, Any]:
+    """Parse and validate a curriculum outline. Raises ValueError when unusable."""
+    data = _load_repaired(json_str)
+    try:
+        outline = CurriculumOutline.model_validate(data)
+    except ValidationError as e:
+        raise ValueError(f"Outline failed validation: {e}") from e
+
+    day_numbers = [day.day_number for day in outline.days]
+    if day_numbers != list(range(1, expected_days + 1)):
+        raise ValueError(f"Outline has days {day_numbers[:5]}... ({len(day_numbers)}), expected 1..{expected_days}")
+    return outline.model_dump()
+
+def validate_day(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Validate one generated day against CurriculumDay. Raises ValueError when unusable."""
+    if data.get("resources") is None:
+        data["resources"] = []
+    try:
+        CurriculumDay.model_validate(data)
+    except ValidationError as e:
+        raise ValueError(f"Day {data.get('day_number')} failed validation: {e}") from e
+    # Keep the model's raw dict (validated above) so optional keys stay as generated
+    return data
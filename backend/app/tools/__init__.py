@@ -3,7 +3,6 @@ import json
 from typing import Any, Optional
 
 import httpx
-from langchain.tools import Tool
 
 
 # Placeholder tool implementations - replace with actual implementations
@@ -61,66 +60,33 @@ async def python_repl(code: str) -> str:
     return f"Code execution result: {code[:50]}..."
 
 
-# Create tool instances
-firecrawl_tool = Tool(
-    name="firecrawl",
-    description="Deep web scraping for comprehensive content extraction",
-    func=lambda q: firecrawl_search(q),
-    coroutine=firecrawl_search
-)
-
-perplexity_tool = Tool(
-    name="perplexity",
-    description="Live search-based Q&A for current information",
-    func=lambda q: perplexity_search(q),
-    coroutine=perplexity_search
-)
-
-exa_tool = Tool(
-    name="exa",
-    description="Document search and retrieval",
-    func=lambda q: exa_search(q),
-    coroutine=exa_search
-)
-
-arxiv_tool = Tool(
-    name="arxiv",
-    description="Search academic papers and research",
-    func=lambda q: arxiv_search(q),
-    coroutine=arxiv_search
-)
-
-github_tool = Tool(
-    name="github",
-    description="Search GitHub repositories and code",
-    func=lambda q: github_search(q),
-    coroutine=github_search
-)
-
-youtube_tool = Tool(
-    name="youtube",
-    description="Search educational YouTube videos",
-    func=lambda q: youtube_search(q),
-    coroutine=youtube_search
-)
-
-wolfram_tool = Tool(
-    name="wolfram",
-    description="Math and logic queries",
-    func=lambda q: wolfram_query(q),
-    coroutine=wolfram_query
-)
-
-wikipedia_tool = Tool(
-    name="wikipedia",
-    description="General reference information",
-    func=lambda q: wikipedia_search(q),
-    coroutine=wikipedia_search
-)
-
-code_interpreter_tool = Tool(
-    name="python",
-    description="Execute Python code",
-    func=lambda code: python_repl(code),
-    coroutine=python_repl
-) 
\ No newline at end of file
+# Tool instances are built on first access (``from app.tools import exa_tool``)
+# so importing any app.tools submodule doesn't load LangChain.
+_TOOL_SPECS = {
+    "firecrawl_tool": ("firecrawl", "Deep web scraping for comprehensive content extraction", firecrawl_search),
+    "perplexity_tool": ("perplexity", "Live search-based Q&A for current information", perplexity_search),
+    "exa_tool": ("exa", "Document search and retrieval", exa_search),
+    "arxiv_tool": ("arxiv", "Search academic papers and research", arxiv_search),
+    "github_tool": ("github", "Search GitHub repositories and code", github_search),
+    "youtube_tool": ("youtube", "Search educational YouTube videos", youtube_search),
+    "wolfram_tool": ("wolfram", "Math and logic queries", wolfram_query),
+    "wikipedia_tool": ("wikipedia", "General reference information", wikipedia_search),
+    "code_interpreter_tool": ("python", "Execute Python code", python_repl),
+}
+
+
+def __getattr__(name: str) -> Any:
+    spec = _TOOL_SPECS.get(name)
+    if spec is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from langchain.tools import Tool
+
+    tool_name, description, coroutine = spec
+    tool = Tool(
+        name=tool_name,
+        description=description,
+        func=lambda q, coroutine=coroutine: coroutine(q),
+        coroutine=coroutine
+    )
+    globals()[name] = tool
+    return tool
@@ -2,17 +2,25 @@
 
 from typing import Any, Dict, List, Optional
 
-import aiohttp
-import arxiv
-import wikipediaapi
-from youtube_search import YoutubeSearch
+from app.core.executors import run_blocking
+from app.core.http_client import get_http_session
+from app.core.lazy import lazy_import
+from app.services.research_cache import research_cached
 
+# Imported on first use, inside the worker thread that makes the blocking call
+arxiv = lazy_import("arxiv")
+wikipediaapi = lazy_import("wikipediaapi")
+youtube_search_sdk = lazy_import("youtube_search")
 
+
+@research_cached("youtube_search", ttl=3 * 24 * 3600, stale_ttl=4 * 24 * 3600)
 async def youtube_search(query: str, max_results: int = 10) -> List[Dict[str, Any]]:
     """Search YouTube for educational videos."""
     try:
         # Search for more results initially since we'll filter out shorts
-        results = YoutubeSearch(query, max_results=max_results * 5).to_dict()
+        results = await run_blocking(
+            lambda: youtube_search_sdk.YoutubeSearch(query, max_results=max_results * 5).to_dict()
+        )
         
         formatted_results = []
         for video in results:
@@ -47,17 +55,23 @@ async def youtube_search(query: str, max_results: int = 10) -> List[Dict[str, An
         return [{"error": f"YouTube search failed: {str(e)}"}]
 
 
+@research_cached("arxiv_search", ttl=7 * 24 * 3600)
 async def arxiv_search(query: str, max_results: int = 10) -> List[Dict[str, Any]]:
     """Search arXiv for academic papers."""
     try:
-        search = arxiv.Search(
-            query=query,
-            max_results=max_results,
-            sort_by=arxiv.SortCriterion.Relevance
-        )
-        
+        def fetch_papers():
+            search = arxiv.Search(
+                query=query,
+                max_results=max_results,
+                sort_by=arxiv.SortCriterion.Relevance
+            )
+            # arxiv pages through results lazily with blocking HTTP calls
+            return list(search.results())
+
+        papers = await run_blocking(fetch_papers)
+
         results = []
-        for paper in search.results():
+        for paper in papers:
             results.append({
                 "title": paper.title,
                 "authors": [author.name for author in paper.authors],
@@ -74,17 +88,32 @@ async def arxiv_search(query: str, max_results: int = 10) -> List[Dict[str, Any]
         return [{"error": f"arXiv search failed: {str(e)}"}]
 
 
+def _wikipedia_page(lang: str, title: str) -> Optional[Dict[str, Any]]:
+    """Fetch a page and its fields (blocking; every attribute access may hit the API)."""
+    wiki = wikipediaapi.Wikipedia(
+        user_agent='OneMonth.dev/1.0 (https://onemonth.dev)',
+        language=lang
+    )
+    page = wiki.page(title)
+    if not page.exists():
+        return None
+    return {
+        "title": page.title,
+        "summary": page.summary,
+        "content": page.text[:5000] + "..." if len(page.text) > 5000 else page.text,
+        "url": page.fullurl,
+        "categories": list(page.categories.keys())[:10],
+        "links": list(page.links.keys())[:20]
+    }
+
+
+@research_cached("wikipedia_search", ttl=7 * 24 * 3600)
 async def wikipedia_search(query: str, lang: str = "en") -> Dict[str, Any]:
     """Search and retrieve Wikipedia articles."""
     try:
-        wiki = wikipediaapi.Wikipedia(
-            user_agent='OneMonth.dev/1.0 (https://onemonth.dev)',
-            language=lang
-        )
+        result = await run_blocking(_wikipedia_page, lang, query)
         
-        page = wiki.page(query)
-        
-        if not page.exists():
+        if result is None:
             # Try searching for the page
             search_url = f"https://{lang}.wikipedia.org/w/api.php"
             params = {
@@ -95,26 +124,19 @@ async def wikipedia_search(query: str, lang: str = "en") -> Dict[str, Any]:
                 "srlimit": 5
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(search_url, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        search_results = data.get("query", {}).get("search", [])
-                        
-                        if search_results:
-                            # Get the first result
-                            first_result = search_results[0]
-                            page = wiki.page(first_result["title"])
+            session = get_http_session()
+            async with session.get(search_url, params=params) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    search_results = data.get("query", {}).get("search", [])
+                    
+                    if search_results:
+                        # Get the first result
+                        first_result = search_results[0]
+                        result = await run_blocking(_wikipedia_page, lang, first_result["title"])
             
-        if page.exists():
-            return {
-                "title": page.title,
-                "summary": page.summary,
-                "content": page.text[:5000] + "..." if len(page.text) > 5000 else page.text,
-                "url": page.fullurl,
-                "categories": list(page.categories.keys())[:10],
-                "links": list(page.links.keys())[:20]
-            }
+        if result is not None:
+            return result
         else:
             return {"error": f"No Wikipedia page found for: {query}"}
             
@@ -122,6 +144,7 @@ async def wikipedia_search(query: str, lang: str = "en") -> Dict[str, Any]:
         return {"error": f"Wikipedia search failed: {str(e)}"}
 
 
+@research_cached("github_search", ttl=24 * 3600)
 async def github_search(query: str, max_results: int = 10) -> List[Dict[str, Any]]:
     """Search GitHub for repositories and code."""
     try:
@@ -139,31 +162,32 @@ async def github_search(query: str, max_results: int = 10) -> List[Dict[str, Any
             "per_page": max_results
         }
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(search_url, headers=headers, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    
-                    results = []
-                    for repo in data.get("items", []):
-                        results.append({
-                            "name": repo["full_name"],
-                            "description": repo["description"],
-                            "url": repo["html_url"],
-                            "stars": repo["stargazers_count"],
-                            "language": repo["language"],
-                            "topics": repo.get("topics", []),
-                            "updated_at": repo["updated_at"]
-                        })
-                    
-                    return results
-                else:
-                    return [{"error": f"GitHub API error: {response.status}"}]
-                    
+        session = get_http_session()
+        async with session.get(search_url, headers=headers, params=params) as response:
+            if response.status == 200:
+                data = await response.json()
+                
+                results = []
+                for repo in data.get("items", []):
+                    results.append({
+                        "name": repo["full_name"],
+                        "description": repo["description"],
+                        "url": repo["html_url"],
+                        "stars": repo["stargazers_count"],
+                        "language": repo["language"],
+                        "topics": repo.get("topics", []),
+                        "updated_at": repo["updated_at"]
+                    })
+                
+                return results
+            else:
+                return [{"error": f"GitHub API error: {response.status}"}]
+                
     except Exception as e:
         return [{"error": f"GitHub search failed: {str(e)}"}]
 
 
+@research_cached("wolfram_alpha_query", ttl=30 * 24 * 3600, ignore=("app_id",))
 async def wolfram_alpha_query(query: str, app_id: Optional[str] = None) -> Dict[str, Any]:
     """Query Wolfram Alpha for computational knowledge."""
     if not app_id:
@@ -178,34 +202,34 @@ async def wolfram_alpha_query(query: str, app_id: Optional[str] = None) -> Dict[
             "output": "json"
         }
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(base_url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    
-                    result = {
-                        "query": query,
-                        "success": data["queryresult"]["success"],
-                        "pods": []
-                    }
-                    
-                    if data["queryresult"]["success"]:
-                        for pod in data["queryresult"].get("pods", []):
-                            pod_data = {
-                                "title": pod["title"],
-                                "subpods": []
-                            }
-                            
-                            for subpod in pod.get("subpods", []):
-                                if "plaintext" in subpod and subpod["plaintext"]:
-                                    pod_data["subpods"].append(subpod["plaintext"])
-                            
-                            if pod_data["subpods"]:
-                                result["pods"].append(pod_data)
-                    
-                    return result
-                else:
-                    return {"error": f"Wolfram Alpha API error: {response.status}"}
-                    
+        session = get_http_session()
+        async with session.get(base_url, params=params) as response:
+            if response.status == 200:
+                data = await response.json()
+                
+                result = {
+                    "query": query,
+                    "success": data["queryresult"]["success"],
+                    "pods": []
+                }
+                
+                if data["queryresult"]["success"]:
+                    for pod in data["queryresult"].get("pods", []):
+                        pod_data = {
+                            "title": pod["title"],
+                            "subpods": []
+                        }
+                        
+                        for subpod in pod.get("subpods", []):
+                            if "plaintext" in subpod and subpod["plaintext"]:
+                                pod_data["subpods"].append(subpod["plaintext"])
+                        
+                        if pod_data["subpods"]:
+                            result["pods"].append(pod_data)
+                
+                return result
+            else:
+                return {"error": f"Wolfram Alpha API error: {response.status}"}
+                
     except Exception as e:
         return {"error": f"Wolfram Alpha query failed: {str(e)}"} 
\ No newline at end of file
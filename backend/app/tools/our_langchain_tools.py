@@ -3,6 +3,8 @@
 import asyncio
 from typing import Any, Dict, Optional
 
+from app.core.config import settings
+from app.services.chat_context import truncate_to_tokens
 from app.tools.scraping import \
     firecrawl_scrape as original_firecrawl_scrape_url
 # Need to import the actual underlying search/scrape functions
@@ -39,7 +41,7 @@ async def exa_search_lc_tool(query: str) -> str:
                 formatted_results.append(f"Result {i+1}:\nTitle: {title}\nURL: {url}\nSnippet: {snippet[:200]}...\n")
             return "\n".join(formatted_results) if formatted_results else "No results found from Exa."
 
-        return str(result) if result else "No results found from Exa."
+        return truncate_to_tokens(str(result), settings.chat_tool_output_budget_tokens) if result else "No results found from Exa."
     except Exception as e:
         print(f"Error in exa_search_lc_tool: {e}")
         return f"Error performing Exa search: {str(e)}"
@@ -60,7 +62,7 @@ async def perplexity_search_lc_tool(query: str) -> str:
         # Let's prioritize concise_answer if available
         answer = result_dict.get('concise_answer') or result_dict.get('answer')
         
-        return str(answer) if answer else "Perplexity couldn't find an answer."
+        return truncate_to_tokens(str(answer), settings.chat_tool_output_budget_tokens) if answer else "Perplexity couldn't find an answer."
     except Exception as e:
         print(f"Error in perplexity_search_lc_tool: {e}")
         return f"Error performing Perplexity search: {str(e)}"
@@ -121,7 +123,7 @@ async def firecrawl_scrape_url_lc_tool(url: str) -> str:
             data = result_dict.get("data", {})
             markdown_content = data.get("markdown")
             if markdown_content:
-                return str(markdown_content)
+                return truncate_to_tokens(str(markdown_content), settings.chat_tool_output_budget_tokens)
             # Fallback if markdown key is missing but data exists
             return f"Scraped data (no specific markdown found): {str(data)[:1000]}..."
         return f"Failed to scrape URL or no content: {result_dict.get('error', 'Unknown error') if result_dict else 'No response'}"
@@ -3,10 +3,12 @@
 import asyncio
 from typing import Any, Dict, List, Optional
 
-import aiohttp
 from app.core.config import settings
+from app.core.http_client import get_http_session
+from app.services.research_cache import research_cached
 
 
+@research_cached("firecrawl_search", ttl=24 * 3600)
 async def firecrawl_search(query: str, limit: int = 5) -> List[Dict[str, Any]]:
     """Search the web and get full content using Firecrawl's search endpoint.
     
@@ -31,33 +33,33 @@ async def firecrawl_search(query: str, limit: int = 5) -> List[Dict[str, Any]]:
         }
     }
     
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.post(
-                "https://api.firecrawl.dev/v1/search",
-                headers=headers,
-                json=payload
-            ) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    if data.get("success") and data.get("data"):
-                        results = []
-                        for item in data["data"]:
-                            results.append({
-                                "url": item.get("url", ""),
-                                "title": item.get("metadata", {}).get("title", ""),
-                                "description": item.get("metadata", {}).get("description", ""),
-                                "markdown": item.get("markdown", ""),
-                                "metadata": item.get("metadata", {})
-                            })
-                        return results
-                    else:
-                        return [{"error": "No results found"}]
+    session = get_http_session()
+    try:
+        async with session.post(
+            "https://api.firecrawl.dev/v1/search",
+            headers=headers,
+            json=payload
+        ) as response:
+            if response.status == 200:
+                data = await response.json()
+                if data.get("success") and data.get("data"):
+                    results = []
+                    for item in data["data"]:
+                        results.append({
+                            "url": item.get("url", ""),
+                            "title": item.get("metadata", {}).get("title", ""),
+                            "description": item.get("metadata", {}).get("description", ""),
+                            "markdown": item.get("markdown", ""),
+                            "metadata": item.get("metadata", {})
+                        })
+                    return results
                 else:
-                    error_data = await response.text()
-                    return [{"error": f"Firecrawl search error: {response.status} - {error_data}"}]
-        except Exception as e:
-            return [{"error": f"Search failed: {str(e)}"}]
+                    return [{"error": "No results found"}]
+            else:
+                error_data = await response.text()
+                return [{"error": f"Firecrawl search error: {response.status} - {error_data}"}]
+    except Exception as e:
+        return [{"error": f"Search failed: {str(e)}"}]
 
 
 async def firecrawl_scrape(url: str, wait_for_selector: Optional[str] = None, extract_schema: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
@@ -85,33 +87,33 @@ async def firecrawl_scrape(url: str, wait_for_selector: Optional[str] = None, ex
             "schema": extract_schema
         }
     
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.post(
-                "https://api.firecrawl.dev/v1/scrape",
-                headers=headers,
-                json=payload
-            ) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    result = {
-                        "success": True,
-                        "markdown": data.get("data", {}).get("markdown", ""),
-                        "metadata": data.get("data", {}).get("metadata", {}),
-                        "url": url
-                    }
-                    
-                    if extract_schema:
-                        result["extracted_data"] = data.get("data", {}).get("json", {})
-                    else:
-                        result["html"] = data.get("data", {}).get("html", "")
-                    
-                    return result
+    session = get_http_session()
+    try:
+        async with session.post(
+            "https://api.firecrawl.dev/v1/scrape",
+            headers=headers,
+            json=payload
+        ) as response:
+            if response.status == 200:
+                data = await response.json()
+                result = {
+                    "success": True,
+                    "markdown": data.get("data", {}).get("markdown", ""),
+                    "metadata": data.get("data", {}).get("metadata", {}),
+                    "url": url
+                }
+                
+                if extract_schema:
+                    result["extracted_data"] = data.get("data", {}).get("json", {})
                 else:
-                    error_data = await response.text()
-                    return {"error": f"Firecrawl API error: {response.status} - {error_data}"}
-        except Exception as e:
-            return {"error": f"Scraping failed: {str(e)}"}
+                    result["html"] = data.get("data", {}).get("html", "")
+                
+                return result
+            else:
+                error_data = await response.text()
+                return {"error": f"Firecrawl API error: {response.status} - {error_data}"}
+    except Exception as e:
+        return {"error": f"Scraping failed: {str(e)}"}
 
 
 async def firecrawl_crawl(url: str, max_depth: int = 2, limit: int = 10) -> Dict[str, Any]:
@@ -134,39 +136,39 @@ async def firecrawl_crawl(url: str, max_depth: int = 2, limit: int = 10) -> Dict
         "onlyMainContent": True
     }
     
-    async with aiohttp.ClientSession() as session:
-        try:
-            # Start the crawl job
-            async with session.post(
-                "https://api.firecrawl.dev/v1/crawl",
-                headers=headers,
-                json=payload
-            ) as response:
-                if response.status == 200:
-                    job_data = await response.json()
-                    job_id = job_data.get("id")
+    session = get_http_session()
+    try:
+        # Start the crawl job
+        async with session.post(
+            "https://api.firecrawl.dev/v1/crawl",
+            headers=headers,
+            json=payload
+        ) as response:
+            if response.status == 200:
+                job_data = await response.json()
+                job_id = job_data.get("id")
+                
+                # Poll for job completion
+                for _ in range(30):  # Max 30 seconds
+                    await asyncio.sleep(1)
                     
-                    # Poll for job completion
-                    for _ in range(30):  # Max 30 seconds
-                        await asyncio.sleep(1)
-                        
-                        async with session.get(
-                            f"https://api.firecrawl.dev/v1/crawl/{job_id}",
-                            headers=headers
-                        ) as status_response:
-                            if status_response.status == 200:
-                                status_data = await status_response.json()
-                                if status_data.get("status") == "completed":
-                                    return {
-                                        "success": True,
-                                        "data": status_data.get("data", []),
-                                        "total": status_data.get("total", 0)
-                                    }
-                                elif status_data.get("status") == "failed":
-                                    return {"error": "Crawl job failed"}
-                    
-                    return {"error": "Crawl job timed out"}
-                else:
-                    return {"error": f"Firecrawl API error: {response.status}"}
-        except Exception as e:
-            return {"error": f"Crawling failed: {str(e)}"} 
\ No newline at end of file
+                    async with session.get(
+                        f"https://api.firecrawl.dev/v1/crawl/{job_id}",
+                        headers=headers
+                    ) as status_response:
+                        if status_response.status == 200:
+                            status_data = await status_response.json()
+                            if status_data.get("status") == "completed":
+                                return {
+                                    "success": True,
+                                    "data": status_data.get("data", []),
+                                    "total": status_data.get("total", 0)
+                                }
+                            elif status_data.get("status") == "failed":
+                                return {"error": "Crawl job failed"}
+                
+                return {"error": "Crawl job timed out"}
+            else:
+                return {"error": f"Firecrawl API error: {response.status}"}
+    except Exception as e:
+        return {"error": f"Crawling failed: {str(e)}"} 
\ No newline at end of file
@@ -2,10 +2,13 @@
 
 from typing import Any, Dict, List
 
-import aiohttp
 from app.core.config import settings
+from app.core.http_client import get_http_session
+from app.services.research_cache import research_cached
 
 
+# Answers are filtered to the last month, so keep them fresh for hours rather than days
+@research_cached("perplexity_search", ttl=6 * 3600, stale_ttl=12 * 3600)
 async def perplexity_search(query: str, max_results: int = 5) -> List[Dict[str, Any]]:
     """Search using Perplexity API for up-to-date information."""
     if not settings.perplexity_api_key:
@@ -37,25 +40,26 @@ async def perplexity_search(query: str, max_results: int = 5) -> List[Dict[str,
         "stream": False
     }
     
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.post(
-                "https://api.perplexity.ai/chat/completions",
-                headers=headers,
-                json=payload
-            ) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    return [{
-                        "content": data["choices"][0]["message"]["content"],
-                        "citations": data.get("citations", [])
-                    }]
-                else:
-                    return [{"error": f"Perplexity API error: {response.status}"}]
-        except Exception as e:
-            return [{"error": f"Search failed: {str(e)}"}]
+    session = get_http_session()
+    try:
+        async with session.post(
+            "https://api.perplexity.ai/chat/completions",
+            headers=headers,
+            json=payload
+        ) as response:
+            if response.status == 200:
+                data = await response.json()
+                return [{
+                    "content": data["choices"][0]["message"]["content"],
+                    "citations": data.get("citations", [])
+                }]
+            else:
+                return [{"error": f"Perplexity API error: {response.status}"}]
+    except Exception as e:
+        return [{"error": f"Search failed: {str(e)}"}]
 
 
+@research_cached("exa_search", ttl=24 * 3600)
 async def exa_search(query: str, use_autoprompt: bool = True, num_results: int = 10) -> List[Dict[str, Any]]:
     """Search using Exa API for high-quality web content."""
     if not settings.exa_api_key:
@@ -76,17 +80,17 @@ async def exa_search(query: str, use_autoprompt: bool = True, num_results: int =
         }
     }
     
-    async with aiohttp.ClientSession() as session:
-        try:
-            async with session.post(
-                "https://api.exa.ai/search",
-                headers=headers,
-                json=payload
-            ) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    return data.get("results", [])
-                else:
-                    return [{"error": f"Exa API error: {response.status}"}]
-        except Exception as e:
-            return [{"error": f"Exa search failed: {str(e)}"}] 
\ No newline at end of file
+    session = get_http_session()
+    try:
+        async with session.post(
+            "https://api.exa.ai/search",
+            headers=headers,
+            json=payload
+        ) as response:
+            if response.status == 200:
+                data = await response.json()
+                return data.get("results", [])
+            else:
+                return [{"error": f"Exa API error: {response.status}"}]
+    except Exception as e:
+        return [{"error": f"Exa search failed: {str(e)}"}] 
\ No newline at end of file
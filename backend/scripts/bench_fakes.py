@@ -0,0 +1,517 @@
+"""Local stand-ins for Gemini and Supabase, shared by the benchmark scripts.
+
+- ``FakeGeminiServer``: an aiohttp server speaking the OpenAI-compatible
+  ``/chat/completions`` (streamed or not) and ``/embeddings`` endpoints.
+  It recognises the curriculum outline and day-chunk prompts and answers
+  with canned, schema-valid JSON; anything else gets prose. Time to first
+  token and token rate are configurable. Point the app at it with
+  ``settings.gemini_base_url = server.base_url``.
+- ``FakeSupabase``: an in-memory stand-in for the supabase-py client
+  supporting the query-builder calls the app makes. Each ``execute()``
+  sleeps ``latency`` seconds (it runs on the "db" pool like the real thing)
+  and is counted per ``(table, operation)``. ``install`` swaps it in for the
+  module-level ``supabase`` clients. The day-resequencing RPCs from
+  ``supabase_migrations.sql`` are registered by default.
+
+Neither touches the network beyond localhost.
+"""
+
+import asyncio
+import copy
+import json
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+from aiohttp import web
+
+# ----------------------------------------------------------------------
+# Gemini
+# ----------------------------------------------------------------------
+
+_PARAGRAPH = (
+    "This lesson builds on the previous day by working through a concrete example step by step, "
+    "explaining why each step matters and which mistakes are common for beginners. "
+)
+
+
+def fake_day(day: Dict[str, Any], paragraphs: int = 12) -> Dict[str, Any]:
+    """A schema-valid generated day for an outline entry."""
+    nodes: List[Dict[str, Any]] = []
+    for section in range(max(1, paragraphs // 3)):
+        nodes.append({"type": "heading", "attrs": {"level": 2}, "content": [{"type": "text", "text": f"Part {section + 1}: {day['title']}"}]})
+        for _ in range(3):
+            nodes.append({"type": "paragraph", "content": [{"type": "text", "text": _PARAGRAPH * 3}]})
+    result = {
+        "day_number": day["day_number"],
+        "title": day["title"],
+        "is_project_day": bool(day.get("is_project_day")),
+        "content": {"type": "doc", "content": nodes},
+        "resources": [{"title": f"Reading for day {day['day_number']}", "url": f"https://example.com/day/{day['day_number']}"}],
+        "estimated_hours": 2,
+    }
+    if result["is_project_day"]:
+        result["project_data"] = {
+            "title": day.get("project_title") or f"Project {day['day_number']}",
+            "description": "Build a small end-to-end project using the material so far.",
+            "objectives": ["Apply the week's concepts"],
+            "requirements": ["Working code"],
+            "deliverables": ["A repository"],
+            "evaluation_criteria": ["It runs"],
+        }
+    return result
+
+
+def fake_outline(num_days: int) -> Dict[str, Any]:
+    return {
+        "curriculum_title": f"Benchmark curriculum ({num_days} days)",
+        "curriculum_description": "Generated by the local Gemini stand-in.",
+        "days": [
+            {
+                "day_number": n,
+                "title": f"Topic {n}",
+                "objectives": [f"Understand topic {n}", f"Practice topic {n}", f"Review topic {n - 1 or 1}"],
+                "is_project_day": n % 7 == 0,
+                **({"project_title": f"Week {n // 7} project"} if n % 7 == 0 else {}),
+            }
+            for n in range(1, num_days + 1)
+        ],
+    }
+
+
+def fake_full_curriculum(num_days: int, paragraphs: int = 12) -> Dict[str, Any]:
+    """What the legacy single-call path returns for ``num_days`` days."""
+    outline = fake_outline(num_days)
+    return {**outline, "days": [fake_day(day, paragraphs) for day in outline["days"]]}
+
+
+def _fenced(data: Dict[str, Any]) -> str:
+    return "```json\n" + json.dumps(data, indent=2) + "\n```"
+
+
+class FakeGeminiServer:
+    """OpenAI-compatible Gemini stand-in on 127.0.0.1."""
+
+    def __init__(
+        self,
+        tokens_per_second: float = 2000.0,
+        ttft: float = 0.2,
+        tokens_per_chunk: int = 20,
+        paragraphs_per_day: int = 12,
+        chat_reply_tokens: int = 400,
+    ):
+        self.tokens_per_second = tokens_per_second
+        self.ttft = ttft
+        self.tokens_per_chunk = tokens_per_chunk
+        self.paragraphs_per_day = paragraphs_per_day
+        self.chat_reply_tokens = chat_reply_tokens
+        self.calls: Counter = Counter()
+        self.base_url = ""
+        self._runner: Optional[web.AppRunner] = None
+
+    async def start(self) -> str:
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post("/chat/completions", self._chat)
+        app.router.add_post("/embeddings", self._embeddings)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{port}"
+        return self.base_url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def _reply_for(self, messages: List[Dict[str, str]]) -> str:
+        system = messages[0]["content"] if messages else ""
+        user = messages[-1]["content"] if messages else ""
+        outline_match = re.search(r"Plan a (\d+)-day learning curriculum", system)
+        if outline_match:
+            self.calls["outline"] += 1
+            return _fenced(fake_outline(int(outline_match.group(1))))
+        if "writing the full lesson content" in system:
+            self.calls["day_chunk"] += 1
+            todo = json.loads(user.split("following their outline entries:\n", 1)[1].split("\n\nSupporting Research", 1)[0])
+            return _fenced({"days": [fake_day(day, self.paragraphs_per_day) for day in todo]})
+        self.calls["chat"] += 1
+        words = ("Here is an explanation of the concept with an example. " * (self.chat_reply_tokens // 10 + 1)).split(" ")
+        return " ".join(words[: self.chat_reply_tokens])
+
+    async def _chat(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        text = self._reply_for(body.get("messages", []))
+        await asyncio.sleep(self.ttft)
+        if not body.get("stream"):
+            await asyncio.sleep(len(text) / 4 / self.tokens_per_second)
+            return web.json_response({"choices": [{"message": {"role": "assistant", "content": text}, "finish_reason": "stop"}]})
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        step = self.tokens_per_chunk * 4  # ~4 characters per token
+        delay = self.tokens_per_chunk / self.tokens_per_second
+        for start in range(0, len(text), step):
+            chunk = {"choices": [{"delta": {"content": text[start:start + step]}, "finish_reason": None}]}
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            await asyncio.sleep(delay)
+        await response.write(b'data: {"choices": [{"delta": {}, "finish_reason": "stop"}]}\n\n')
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def _embeddings(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        self.calls["embeddings"] += 1
+        seed = sum(map(ord, str(body.get("input", ""))))
+        return web.json_response({"data": [{"embedding": [((seed * (i + 1)) % 97) / 97.0 for i in range(64)]}]})
+
+
+async def fake_research_tool(query: str, *args: Any, latency: float = 0.05, **kwargs: Any) -> List[Dict[str, str]]:
+    """Stand-in for the keyless research tools (YouTube, arXiv, GitHub, ...)."""
+    await asyncio.sleep(latency)
+    return [{"title": f"Result {i} for {query[:40]}", "url": f"https://example.com/{i}", "snippet": _PARAGRAPH} for i in range(5)]
+
+
+# ----------------------------------------------------------------------
+# Supabase
+# ----------------------------------------------------------------------
+
+_METHODS = {"select": "GET", "insert": "POST", "upsert": "POST", "update": "PATCH", "delete": "DELETE", "rpc": "POST"}
+
+
+class FakeResponse:
+    def __init__(self, data: Any, count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+class FakeQuery:
+    def __init__(self, db: "FakeSupabase", table: str):
+        self._db = db
+        self.table_name = table
+        self.operation = "select"
+        self.columns = "*"
+        self.payload: Any = None
+        self.filters: List[Callable[[Dict[str, Any]], bool]] = []
+        self.orders: List[tuple] = []
+        self.embedded_filters: Dict[str, List[Callable[[Dict[str, Any]], bool]]] = {}
+        self.embedded_orders: Dict[str, List[tuple]] = {}
+        self.embedded_limits: Dict[str, int] = {}
+        self.row_range: Optional[tuple] = None
+        self.single_mode: Optional[str] = None
+        self.count_mode: Optional[str] = None
+        self.headers: Dict[str, str] = {}
+
+    # PostgREST-builder attributes read by run_query's metrics labels
+    @property
+    def path(self) -> str:
+        return f"/{self.table_name}"
+
+    @property
+    def http_method(self) -> str:
+        return _METHODS[self.operation]
+
+    # Operations
+    def select(self, columns: str = "*", count: Optional[str] = None) -> "FakeQuery":
+        self.columns, self.count_mode = columns, count
+        return self
+
+    def insert(self, rows: Any, **kwargs: Any) -> "FakeQuery":
+        self.operation, self.payload = "insert", rows
+        return self
+
+    def upsert(self, rows: Any, **kwargs: Any) -> "FakeQuery":
+        self.operation, self.payload = "upsert", rows
+        self.headers["Prefer"] = "resolution=merge-duplicates"
+        return self
+
+    def update(self, values: Dict[str, Any], **kwargs: Any) -> "FakeQuery":
+        self.operation, self.payload = "update", values
+        return self
+
+    def delete(self, **kwargs: Any) -> "FakeQuery":
+        self.operation = "delete"
+        return self
+
+    # Filters and modifiers. A dotted column ("curriculum_days.progress.user_id")
+    # filters the embedded resource at that path instead of the top-level rows.
+    def _filter(self, column: str, test: Callable[[Any], bool]) -> "FakeQuery":
+        path, _, name = column.rpartition(".")
+        predicate = lambda row: test(row.get(name))  # noqa: E731
+        if path:
+            self.embedded_filters.setdefault(path, []).append(predicate)
+        else:
+            self.filters.append(predicate)
+        return self
+
+    def eq(self, column: str, value: Any) -> "FakeQuery":
+        return self._filter(column, lambda v: str(v) == str(value))
+
+    def neq(self, column: str, value: Any) -> "FakeQuery":
+        return self._filter(column, lambda v: str(v) != str(value))
+
+    def gt(self, column: str, value: Any) -> "FakeQuery":
+        return self._filter(column, lambda v: v is not None and v > value)
+
+    def gte(self, column: str, value: Any) -> "FakeQuery":
+        return self._filter(column, lambda v: v is not None and v >= value)
+
+    def lt(self, column: str, value: Any) -> "FakeQuery":
+        return self._filter(column, lambda v: v is not None and v < value)
+
+    def lte(self, column: str, value: Any) -> "FakeQuery":
+        return self._filter(column, lambda v: v is not None and v <= value)
+
+    def in_(self, column: str, values: List[Any]) -> "FakeQuery":
+        allowed = {str(v) for v in values}
+        return self._filter(column, lambda v: str(v) in allowed)
+
+    def is_(self, column: str, value: Any) -> "FakeQuery":
+        return self._filter(column, lambda v: v is None if value in (None, "null") else v == value)
+
+    def order(self, column: str, desc: bool = False, foreign_table: Optional[str] = None, **kwargs: Any) -> "FakeQuery":
+        if foreign_table:
+            self.embedded_orders.setdefault(foreign_table, []).append((column, desc))
+        else:
+            self.orders.append((column, desc))
+        return self
+
+    def limit(self, count: int, foreign_table: Optional[str] = None, **kwargs: Any) -> "FakeQuery":
+        if foreign_table:
+            self.embedded_limits[foreign_table] = count
+            return self
+        start = self.row_range[0] if self.row_range else 0
+        self.row_range = (start, start + count - 1)
+        return self
+
+    def range(self, start: int, end: int) -> "FakeQuery":
+        self.row_range = (start, end)
+        return self
+
+    def single(self) -> "FakeQuery":
+        self.single_mode = "single"
+        return self
+
+    def maybe_single(self) -> "FakeQuery":
+        self.single_mode = "maybe_single"
+        return self
+
+    def execute(self) -> Optional[FakeResponse]:
+        return self._db.execute(self)
+
+
+class FakeRpc:
+    def __init__(self, db: "FakeSupabase", name: str, params: Dict[str, Any]):
+        self._db = db
+        self.name = name
+        self.params = params
+        self.operation = "rpc"
+        self.headers: Dict[str, str] = {}
+
+    @property
+    def path(self) -> str:
+        return f"/rpc/{self.name}"
+
+    http_method = "POST"
+
+    def execute(self) -> FakeResponse:
+        return self._db.execute_rpc(self)
+
+
+def _split_columns(columns: str) -> List[str]:
+    """Top-level items of a PostgREST select list (commas inside embeds don't split)."""
+    items, depth, current = [], 0, ""
+    for char in columns:
+        if char == "," and depth == 0:
+            items.append(current.strip())
+            current = ""
+            continue
+        depth += {"(": 1, ")": -1}.get(char, 0)
+        current += char
+    items.append(current.strip())
+    return [item for item in items if item]
+
+
+_EMBED = re.compile(r"^(?:(\w+):)?(\w+)(?:!(\w+))?\((.*)\)$", re.S)
+_JSON_PATH = re.compile(r"^(?:(\w+):)?(\w+)(->>?)(\w+)$")
+_ALIAS = re.compile(r"^(?:(\w+):)?(\w+)$")
+_SINGULAR = {"curricula": "curriculum", "curriculum_days": "day", "chat_sessions": "session"}
+
+
+def _sort(rows: List[Dict[str, Any]], orders: List[tuple]) -> None:
+    for column, desc in reversed(orders):
+        rows.sort(key=lambda row: (row.get(column) is None, row.get(column)), reverse=desc)
+
+
+_DAY_TITLE = re.compile(r"^Day [^:]*:")
+
+
+def _renumber(row: Dict[str, Any], day_number: int) -> None:
+    row["day_number"] = day_number
+    if row.get("title"):
+        row["title"] = _DAY_TITLE.sub(f"Day {day_number}:", row["title"], count=1)
+
+
+def _resequence_curriculum_days(db: "FakeSupabase", params: Dict[str, Any]) -> int:
+    order = {entry["id"]: entry["day_number"] for entry in params["p_order"] if entry.get("day_number") is not None}
+    updated = 0
+    for row in db.tables.get("curriculum_days", []):
+        if row.get("curriculum_id") == params["p_curriculum_id"] and row.get("id") in order:
+            _renumber(row, order[row["id"]])
+            updated += 1
+    return updated
+
+
+def _delete_curriculum_day(db: "FakeSupabase", params: Dict[str, Any]) -> Optional[int]:
+    rows = db.tables.get("curriculum_days", [])
+    target = next((row for row in rows if row.get("id") == params["p_day_id"]
+                   and row.get("curriculum_id") == params["p_curriculum_id"]), None)
+    if target is None:
+        return None
+    rows.remove(target)
+    for row in rows:
+        if row.get("curriculum_id") == params["p_curriculum_id"] and row["day_number"] > target["day_number"]:
+            _renumber(row, row["day_number"] - 1)
+    return target["day_number"]
+
+
+class FakeSupabase:
+    """In-memory supabase-py stand-in. ``tables`` maps table name -> list of row dicts."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.tables: Dict[str, List[Dict[str, Any]]] = {}
+        self.calls: Counter = Counter()
+        self.rpcs: Dict[str, Callable[["FakeSupabase", Dict[str, Any]], Any]] = {
+            "resequence_curriculum_days": _resequence_curriculum_days,
+            "delete_curriculum_day": _delete_curriculum_day,
+        }
+        self._lock = threading.Lock()
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def from_(self, name: str) -> FakeQuery:
+        return self.table(name)
+
+    def rpc(self, name: str, params: Optional[Dict[str, Any]] = None) -> FakeRpc:
+        return FakeRpc(self, name, params or {})
+
+    def reset_calls(self) -> None:
+        self.calls.clear()
+
+    def execute_rpc(self, rpc: FakeRpc) -> FakeResponse:
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.calls[(rpc.name, "rpc")] += 1
+            handler = self.rpcs.get(rpc.name)
+            return FakeResponse(handler(self, rpc.params) if handler else None)
+
+    def _project(self, table: str, row: Dict[str, Any], columns: str, query: FakeQuery, path: str = "") -> Optional[Dict[str, Any]]:
+        """Select ``columns`` from ``row``: aliases, ``col->key`` paths and embedded resources.
+
+        Embeds are joined by naming convention (``curriculum_days.curriculum_id`` ->
+        ``curricula.id``). Returns None when an ``!inner`` embed comes back empty.
+        """
+        projected: Dict[str, Any] = {}
+        for item in _split_columns(columns):
+            if item == "*":
+                projected.update(copy.deepcopy(row))
+            elif embed := _EMBED.match(item):
+                alias, child, hint, child_columns = embed.groups()
+                child_path = f"{path}.{child}" if path else child
+                parent_key = f"{_SINGULAR.get(table, table.rstrip('s'))}_id"
+                child_key = f"{_SINGULAR.get(child, child.rstrip('s'))}_id"
+                candidates = self.tables.get(child, [])
+                one_to_many = any(parent_key in candidate for candidate in candidates)
+                if one_to_many:
+                    related = [candidate for candidate in candidates if str(candidate.get(parent_key)) == str(row.get("id"))]
+                else:
+                    related = [candidate for candidate in candidates if str(candidate.get("id")) == str(row.get(child_key))]
+                related = [candidate for candidate in related
+                           if all(predicate(candidate) for predicate in query.embedded_filters.get(child_path, []))]
+                _sort(related, query.embedded_orders.get(child, []))
+                if child in query.embedded_limits:
+                    related = related[:query.embedded_limits[child]]
+                nested = [self._project(child, candidate, child_columns, query, child_path) for candidate in related]
+                nested = [item for item in nested if item is not None]
+                value: Any = nested if one_to_many else (nested[0] if nested else None)
+                if hint == "inner" and not value:
+                    return None
+                projected[alias or child] = value
+            elif json_path := _JSON_PATH.match(item):
+                alias, column, arrow, key = json_path.groups()
+                value = (row.get(column) or {}).get(key)
+                projected[alias or key] = str(value) if arrow == "->>" and value is not None else copy.deepcopy(value)
+            elif plain := _ALIAS.match(item):
+                alias, column = plain.groups()
+                projected[alias or column] = copy.deepcopy(row.get(column))
+        return projected
+
+    def execute(self, query: FakeQuery) -> Optional[FakeResponse]:
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.calls[(query.table_name, query.operation)] += 1
+            rows = self.tables.setdefault(query.table_name, [])
+            matches = [row for row in rows if all(predicate(row) for predicate in query.filters)]
+
+            if query.operation in ("insert", "upsert"):
+                payload = query.payload if isinstance(query.payload, list) else [query.payload]
+                written = []
+                for new_row in payload:
+                    new_row = copy.deepcopy(new_row)
+                    new_row.setdefault("id", str(uuid.uuid4()))
+                    existing = next((row for row in rows if str(row.get("id")) == str(new_row["id"])), None)
+                    if existing is not None and query.operation == "upsert":
+                        existing.update(new_row)
+                        written.append(copy.deepcopy(existing))
+                    else:
+                        rows.append(new_row)
+                        written.append(copy.deepcopy(new_row))
+                return FakeResponse(written)
+            if query.operation == "update":
+                for row in matches:
+                    row.update(copy.deepcopy(query.payload))
+                return FakeResponse([copy.deepcopy(row) for row in matches])
+            if query.operation == "delete":
+                doomed = {id(row) for row in matches}
+                self.tables[query.table_name] = [row for row in rows if id(row) not in doomed]
+                return FakeResponse([copy.deepcopy(row) for row in matches])
+
+            _sort(matches, query.orders)
+            data = [self._project(query.table_name, row, query.columns, query) for row in matches]
+            data = [row for row in data if row is not None]
+            count = len(data) if query.count_mode else None
+            if query.row_range:
+                data = data[query.row_range[0]:query.row_range[1] + 1]
+
+        if query.single_mode == "single":
+            if len(data) != 1:
+                raise RuntimeError(f"single() expected 1 row from {query.table_name}, got {len(data)}")
+            return FakeResponse(data[0], count)
+        if query.single_mode == "maybe_single":
+            # supabase-py returns None rather than an empty response
+            return FakeResponse(data[0], count) if data else None
+        return FakeResponse(data, count)
+
+    def install(self) -> None:
+        """Replace the module-level ``supabase`` clients in every loaded ``app`` module."""
+        import app.db.supabase_client as client_module
+
+        real = client_module.supabase
+        for name, module in list(sys.modules.items()):
+            if (name == "app" or name.startswith("app.")) and getattr(module, "supabase", None) is real:
+                module.supabase = self
+        client_module.get_supabase_client = lambda: self
+
+    def summary(self) -> Dict[str, int]:
+        return {f"{table}.{operation}": count for (table, operation), count in sorted(self.calls.items())}
@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+"""Benchmark the curriculum generation pipeline against local stand-ins.
+
+Runs ``generate_and_save_curriculum`` (the staged outline + day-chunk path)
+end to end for 7-, 30- and 90-day curricula against ``FakeGeminiServer`` and
+``FakeSupabase`` from ``bench_fakes.py``. It reports for each size:
+- latency percentiles;
+- peak traced memory (from one extra run under tracemalloc);
+- Supabase calls per run, by table and operation;
+- Gemini calls per run.
+It also times ``clean_and_validate_json`` on the equivalent single-call
+output and the chat stream's time to first chunk:
+
+    uv run scripts/bench_generation.py --runs 5
+    uv run scripts/bench_generation.py --days 90 --tokens-per-second 300 --ttft-ms 800
+    uv run scripts/bench_generation.py --json > bench.json
+
+Nothing leaves localhost: research tools are replaced by a fixed-latency
+stand-in, the template cache is off (so every run really generates) and
+Redis is disabled. ``--max-p50-ms`` makes it exit non-zero on a regression.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import math
+import os
+import sys
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Settings are read at import time; keep everything local and deterministic
+BENCH_ENV = {
+    "SECRET_KEY": "bench",
+    "SUPABASE_URL": "http://127.0.0.1:9",
+    "SUPABASE_ANON_KEY": "bench",
+    "SUPABASE_SERVICE_KEY": "bench",
+    "GEMINI_API_KEY": "bench",
+    "REDIS_URL": "",
+    "TEMPLATE_CACHE_ENABLED": "false",
+    "LLM_ARCHIVE_ENABLED": "false",
+    "JOB_QUEUE_ENABLED": "false",
+    "FIRECRAWL_API_KEY": "",
+    "PERPLEXITY_API_KEY": "",
+    "EXA_API_KEY": "",
+    "WOLFRAM_ALPHA_APP_ID": "",
+}
+
+KEYLESS_TOOLS = ("youtube_search", "arxiv_search", "wikipedia_search", "github_search")
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def latency_summary(seconds: List[float]) -> Dict[str, float]:
+    ms = [s * 1000 for s in seconds]
+    return {
+        "p50_ms": round(percentile(ms, 50), 1),
+        "p90_ms": round(percentile(ms, 90), 1),
+        "p99_ms": round(percentile(ms, 99), 1),
+        "min_ms": round(min(ms), 1),
+        "max_ms": round(max(ms), 1),
+    }
+
+
+@contextlib.contextmanager
+def quiet(enabled: bool):
+    """Swallow the pipeline's progress prints unless --verbose."""
+    if not enabled:
+        yield
+        return
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+async def measure(run: Callable[[], Any], runs: int, verbose: bool) -> Dict[str, Any]:
+    """Time ``runs`` calls, then one more under tracemalloc for peak memory."""
+    durations = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        with quiet(not verbose):
+            await run()
+        durations.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    try:
+        with quiet(not verbose):
+            await run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {**latency_summary(durations), "peak_traced_mb": round(peak / 1024 / 1024, 2)}
+
+
+async def bench(args: argparse.Namespace) -> Dict[str, Any]:
+    from bench_fakes import (FakeGeminiServer, FakeSupabase,
+                             fake_full_curriculum, fake_research_tool)
+
+    from app.agents.curriculum_agent import curriculum_agent
+    from app.core.config import settings
+    from app.core.executors import shutdown_executors
+    from app.core.http_client import http_pool
+    from app.models.curriculum import CurriculumCreate
+    from app.services import curriculum_generation
+    from app.services.validation_service import clean_and_validate_json
+
+    server = FakeGeminiServer(
+        tokens_per_second=args.tokens_per_second,
+        ttft=args.ttft_ms / 1000,
+        paragraphs_per_day=args.paragraphs,
+    )
+    settings.gemini_base_url = await server.start()
+    db = FakeSupabase(latency=args.db_latency_ms / 1000)
+    db.install()
+
+    async def research_tool(query: str, *a: Any, **kw: Any) -> Any:
+        return await fake_research_tool(query, latency=args.tool_latency_ms / 1000)
+
+    for name in KEYLESS_TOOLS:
+        curriculum_agent.tools[name] = research_tool
+
+    await http_pool.open()
+    results: Dict[str, Any] = {"config": vars(args), "generation": {}, "validation": {}, "chat": {}}
+    try:
+        for num_days in args.days:
+            curriculum_data = CurriculumCreate(
+                title=f"Benchmark {num_days}",
+                learning_goal="Learn Python programming from scratch",
+                difficulty_level="beginner",
+                estimated_duration_days=num_days,
+                num_projects=max(1, num_days // 7),
+            )
+
+            async def generate() -> None:
+                curriculum_id = str(uuid.uuid4())
+                db.tables.setdefault("curricula", []).append({"id": curriculum_id, "generation_status": "generating"})
+                messages = [{"role": "user", "content": f"Generate a {num_days}-day curriculum for: {curriculum_data.learning_goal}"}]
+                context = {**curriculum_data.model_dump(), "curriculum_id": curriculum_id, "intent": "create_curriculum"}
+                await curriculum_generation.generate_and_save_curriculum(curriculum_id, curriculum_data, messages, context)
+                row = next(row for row in db.tables["curricula"] if row["id"] == curriculum_id)
+                if row["generation_status"] != "completed":
+                    raise RuntimeError(f"{num_days}-day generation ended as {row['generation_status']}: {row.get('generation_progress')}")
+
+            db.reset_calls()
+            server.calls.clear()
+            stats = await measure(generate, args.runs, args.verbose)
+            total_runs = args.runs + 1
+            stats["db_calls_per_run"] = {key: round(count / total_runs, 1) for key, count in db.summary().items()}
+            stats["db_calls_total_per_run"] = round(sum(db.calls.values()) / total_runs, 1)
+            stats["gemini_calls_per_run"] = {key: round(count / total_runs, 1) for key, count in sorted(server.calls.items())}
+            results["generation"][num_days] = stats
+            db.tables.clear()
+
+            raw = "```json\n" + json.dumps(fake_full_curriculum(num_days, args.paragraphs), indent=2) + "\n```"
+
+            async def validate() -> None:
+                if await clean_and_validate_json(raw) is None:
+                    raise RuntimeError("validation failed on canned output")
+
+            results["validation"][num_days] = {**await measure(validate, args.runs, args.verbose), "input_kb": round(len(raw) / 1024, 1)}
+
+        first_chunk: List[float] = []
+
+        async def chat() -> None:
+            started = time.perf_counter()
+            seen = False
+            async for _ in curriculum_agent.stream_chat_response("explain_concept", "Explain list comprehensions", [], []):
+                if not seen:
+                    first_chunk.append(time.perf_counter() - started)
+                    seen = True
+
+        results["chat"] = await measure(chat, args.runs, args.verbose)
+        results["chat"]["time_to_first_chunk"] = latency_summary(first_chunk)
+    finally:
+        await http_pool.close()
+        await server.stop()
+        shutdown_executors()
+    return results
+
+
+def report(results: Dict[str, Any]) -> None:
+    print(f"\n{'generate':<10}{'days':>6}{'p50':>10}{'p90':>10}{'p99':>10}{'peak MB':>10}{'db calls':>10}")
+    for days, stats in results["generation"].items():
+        print(f"{'':<10}{days:>6}{stats['p50_ms']:>10.0f}{stats['p90_ms']:>10.0f}{stats['p99_ms']:>10.0f}"
+              f"{stats['peak_traced_mb']:>10.1f}{stats['db_calls_total_per_run']:>10.1f}")
+    for days, stats in results["generation"].items():
+        calls = ", ".join(f"{key}={count:g}" for key, count in stats["db_calls_per_run"].items())
+        gemini = ", ".join(f"{key}={count:g}" for key, count in stats["gemini_calls_per_run"].items())
+        print(f"  {days}-day per run: db[{calls}] gemini[{gemini}]")
+
+    print(f"\n{'validate':<10}{'days':>6}{'p50':>10}{'p90':>10}{'p99':>10}{'peak MB':>10}{'input KB':>10}")
+    for days, stats in results["validation"].items():
+        print(f"{'':<10}{days:>6}{stats['p50_ms']:>10.1f}{stats['p90_ms']:>10.1f}{stats['p99_ms']:>10.1f}"
+              f"{stats['peak_traced_mb']:>10.1f}{stats['input_kb']:>10.0f}")
+
+    chat = results["chat"]
+    ttfc = chat["time_to_first_chunk"]
+    print(f"\nchat stream: total p50 {chat['p50_ms']:.0f} ms, p90 {chat['p90_ms']:.0f} ms; "
+          f"first chunk p50 {ttfc['p50_ms']:.0f} ms, p90 {ttfc['p90_ms']:.0f} ms; peak {chat['peak_traced_mb']:.1f} MB")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, nargs="+", default=[7, 30, 90])
+    parser.add_argument("--runs", type=int, default=5, help="timed runs per size (plus one traced run)")
+    parser.add_argument("--tokens-per-second", type=float, default=20000.0, help="fake Gemini output rate")
+    parser.add_argument("--ttft-ms", type=float, default=50.0, help="fake Gemini time to first token")
+    parser.add_argument("--paragraphs", type=int, default=12, help="paragraphs per generated day")
+    parser.add_argument("--db-latency-ms", type=float, default=2.0, help="added to every fake Supabase call")
+    parser.add_argument("--tool-latency-ms", type=float, default=50.0, help="research tool stand-in latency")
+    parser.add_argument("--max-p50-ms", type=float, default=None, help="fail if any generation p50 exceeds this")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("--verbose", action="store_true", help="show the pipeline's own output")
+    args = parser.parse_args(argv)
+
+    for key, value in BENCH_ENV.items():
+        os.environ.setdefault(key, value)
+    sys.path[:0] = [str(BACKEND_DIR), str(Path(__file__).resolve().parent)]
+
+    results = asyncio.run(bench(args))
+    if args.json:
+        print(json.dumps(results, indent=2, default=str))
+    else:
+        report(results)
+
+    if args.max_p50_ms is not None:
+        slow = {days: stats["p50_ms"] for days, stats in results["generation"].items() if stats["p50_ms"] > args.max_p50_ms}
+        if slow:
+            print(f"\nFAIL: generation p50 over {args.max_p50_ms:.0f} ms: {slow}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
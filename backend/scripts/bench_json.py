@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+"""Benchmark JSON encoding of curriculum and chat payloads.
+
+Builds realistic payloads from ``bench_fakes.fake_day`` (TipTap documents of
+the size the generator produces):
+- a single day;
+- the overview of an N-day curriculum;
+- all N day rows;
+- a chat reply streamed as small chunks.
+It then compares the encoders the app can use on each:
+
+- ``jsonable_encoder+json``: FastAPI's path for routes without a response model
+- ``pydantic dump_json``: FastAPI's path for routes with a response model
+- ``serialization.dumps``: ``app/core/serialization.py`` (orjson when installed)
+- ``cached bytes``: a hit in the day-body cache
+- ``json sort_keys`` / ``dumps_canonical``: hashing input for ETags
+- ``f-string+json`` / ``bytes+dumps``: a streamed chat reply, chunk by chunk
+
+For each it reports time per operation and peak traced allocation per
+operation:
+
+    uv run scripts/bench_json.py
+    uv run scripts/bench_json.py --days 90 --paragraphs 24 --json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def measure(func: Callable[[], Any], repeat: int, min_seconds: float) -> Dict[str, float]:
+    """Median time per call over ``repeat`` rounds, and peak traced bytes for one call."""
+    func()
+    loops, elapsed = 1, 0.0
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_seconds / repeat or loops >= 1_000_000:
+            break
+        loops *= 2
+
+    rounds = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        rounds.append((time.perf_counter() - started) / loops)
+
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        result = func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    size = len(result) if isinstance(result, (bytes, str)) else 0
+    return {"us_per_op": round(statistics.median(rounds) * 1e6, 1), "peak_kb": round(peak / 1024, 1), "out_kb": round(size / 1024, 1)}
+
+
+def build_payloads(num_days: int, paragraphs: int) -> Dict[str, Any]:
+    from bench_fakes import fake_day, fake_outline
+
+    from app.models.curriculum import (Curriculum, CurriculumDay,
+                                       CurriculumDaySummary,
+                                       CurriculumOverview)
+
+    now = datetime.now(timezone.utc).isoformat()
+    curriculum_id = str(uuid.uuid4())
+    rows = []
+    for entry in fake_outline(num_days)["days"]:
+        day = fake_day(entry, paragraphs)
+        rows.append({
+            "id": str(uuid.uuid4()),
+            "curriculum_id": curriculum_id,
+            "day_number": day["day_number"],
+            "title": day["title"],
+            "content": day["content"],
+            "resources": day["resources"],
+            "estimated_hours": day["estimated_hours"],
+            "created_at": now,
+            "updated_at": now,
+        })
+    days = [CurriculumDay(**row) for row in rows]
+    curriculum = Curriculum(
+        id=curriculum_id, user_id=uuid.uuid4(), title="Benchmark", learning_goal="Learn Python",
+        difficulty_level="beginner", estimated_duration_days=num_days, created_at=now, updated_at=now,
+    )
+    overview = CurriculumOverview(
+        curriculum=curriculum,
+        days=[CurriculumDaySummary(id=day.id, day_number=day.day_number, title=day.title,
+                                   estimated_hours=day.estimated_hours, updated_at=day.updated_at,
+                                   completed=day.day_number % 3 == 0) for day in days],
+    )
+    words = ("Sure, let's walk through list comprehensions with a worked example and a few " * 60).split()
+    chunks = [" ".join(words[i:i + 4]) + " " for i in range(0, len(words), 4)]
+    return {"rows": rows, "days": days, "overview": overview, "chunks": chunks}
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    from fastapi.encoders import jsonable_encoder
+    from pydantic import TypeAdapter
+
+    from app.core import serialization
+    from app.core.cache import TTLCache
+    from app.core.etag import compute_etag
+    from app.models.curriculum import CurriculumDay, CurriculumOverview
+
+    payloads = build_payloads(args.days, args.paragraphs)
+    rows, days, overview, chunks = payloads["rows"], payloads["days"], payloads["overview"], payloads["chunks"]
+    day_adapter = TypeAdapter(CurriculumDay)
+    days_adapter = TypeAdapter(List[CurriculumDay])
+    overview_adapter = TypeAdapter(CurriculumOverview)
+
+    def stdlib(content: Any) -> bytes:
+        return json.dumps(jsonable_encoder(content), ensure_ascii=False, separators=(",", ":")).encode()
+
+    cache = TTLCache(maxsize=16)
+    tag = compute_etag(rows[0])
+    cache.set(tag, serialization.dumps(days[0]))
+
+    # What reaches the socket: Starlette encodes str chunks itself
+    def stream_fstring() -> bytes:
+        return b"".join(f"0:{json.dumps(chunk)}\n".encode() for chunk in chunks)
+
+    def stream_bytes() -> bytes:
+        return b"".join(b"0:" + serialization.dumps(chunk) + b"\n" for chunk in chunks)
+
+    cases: List[Tuple[str, str, Callable[[], Any]]] = [
+        ("day", "jsonable_encoder+json", lambda: stdlib(days[0])),
+        ("day", "pydantic dump_json", lambda: day_adapter.dump_json(days[0])),
+        ("day", "serialization.dumps", lambda: serialization.dumps(days[0])),
+        ("day", "cached bytes", lambda: cache.get(tag)),
+        (f"overview {args.days}d", "jsonable_encoder+json", lambda: stdlib(overview)),
+        (f"overview {args.days}d", "pydantic dump_json", lambda: overview_adapter.dump_json(overview)),
+        (f"overview {args.days}d", "serialization.dumps", lambda: serialization.dumps(overview)),
+        (f"days {args.days}d (models)", "jsonable_encoder+json", lambda: stdlib(days)),
+        (f"days {args.days}d (models)", "pydantic dump_json", lambda: days_adapter.dump_json(days)),
+        (f"days {args.days}d (models)", "serialization.dumps", lambda: serialization.dumps(days)),
+        (f"days {args.days}d (rows)", "json.dumps", lambda: json.dumps(rows, ensure_ascii=False, separators=(",", ":")).encode()),
+        (f"days {args.days}d (rows)", "serialization.dumps", lambda: serialization.dumps(rows)),
+        (f"etag {args.days}d rows", "json sort_keys", lambda: json.dumps(rows, sort_keys=True, default=str, separators=(",", ":")).encode()),
+        (f"etag {args.days}d rows", "dumps_canonical", lambda: serialization.dumps_canonical(rows)),
+        (f"chat {len(chunks)} chunks", "f-string+json", stream_fstring),
+        (f"chat {len(chunks)} chunks", "bytes+dumps", stream_bytes),
+    ]
+
+    results: Dict[str, Any] = {
+        "config": {**vars(args), "orjson": getattr(serialization.orjson, "__version__", None)},
+        "cases": [],
+    }
+    for payload, encoder, func in cases:
+        if args.only and args.only not in payload:
+            continue
+        results["cases"].append({"payload": payload, "encoder": encoder, **measure(func, args.repeat, args.min_seconds)})
+    return results
+
+
+def report(results: Dict[str, Any]) -> None:
+    orjson_version = results["config"]["orjson"]
+    print(f"orjson: {orjson_version or 'not installed (stdlib fallback)'}\n")
+    print(f"{'payload':<24}{'encoder':<24}{'us/op':>12}{'peak KB':>10}{'out KB':>10}{'vs first':>10}")
+    baseline: Dict[str, float] = {}
+    for case in results["cases"]:
+        first = baseline.setdefault(case["payload"], case["us_per_op"])
+        ratio = first / case["us_per_op"] if case["us_per_op"] else float("inf")
+        print(f"{case['payload']:<24}{case['encoder']:<24}{case['us_per_op']:>12.1f}{case['peak_kb']:>10.1f}"
+              f"{case['out_kb']:>10.1f}{ratio:>9.1f}x")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=30, help="days in the curriculum payloads")
+    parser.add_argument("--paragraphs", type=int, default=12, help="paragraphs per day")
+    parser.add_argument("--repeat", type=int, default=5, help="timed rounds per case (median is reported)")
+    parser.add_argument("--min-seconds", type=float, default=1.0, help="approximate time budget per case")
+    parser.add_argument("--only", help="only run payloads whose name contains this")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    # Settings are read at import time; nothing here connects anywhere
+    for key in ("SECRET_KEY", "SUPABASE_URL", "SUPABASE_ANON_KEY", "SUPABASE_SERVICE_KEY"):
+        os.environ.setdefault(key, "bench")
+    sys.path[:0] = [str(BACKEND_DIR), str(Path(__file__).resolve().parent)]
+
+    results = run(args)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        report(results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+"""Startup benchmark: import time and memory of ``app.main`` in a fresh interpreter.
+
+Runs ``python -X importtime -c "import app.main"`` a few times and reports the
+median total import time, peak RSS and the slowest modules. It exits non-zero
+if any module in ``--forbid`` (heavy SDKs that must stay lazy, see
+``app/core/lazy.py``) was imported at startup, or if ``--budget-ms`` is
+exceeded, so it can gate CI:
+
+    uv run scripts/bench_startup.py --runs 5 --budget-ms 2500
+
+Dummy values are filled in for required settings that aren't in the
+environment; nothing connects to Supabase or Redis at import time.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+DEFAULT_FORBIDDEN = [
+    "langchain",
+    "langchain_core",
+    "langchain_community",
+    "langchain_google_genai",
+    "langgraph",
+    "langsmith",
+    "arxiv",
+    "wikipediaapi",
+    "youtube_search",
+    "resend",
+    "json5",
+    "sqlalchemy",
+    "qdrant_client",
+]
+
+REQUIRED_ENV = {
+    "SECRET_KEY": "bench",
+    "SUPABASE_URL": "http://127.0.0.1:9",
+    "SUPABASE_ANON_KEY": "bench",
+    "SUPABASE_SERVICE_KEY": "bench",
+}
+
+_PROBE = "import resource, app.main; print('maxrss', resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)"
+
+
+def run_once(module_env: Dict[str, str]) -> Tuple[int, int, Dict[str, int]]:
+    """Return (total_us, maxrss_kb, {module: cumulative_us}) for one cold import."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE],
+        cwd=BACKEND_DIR,
+        env=module_env,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr[-4000:])
+        raise SystemExit(f"import app.main failed (exit {proc.returncode})")
+
+    modules: Dict[str, int] = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if cumulative.strip().isdigit():
+            modules[name.strip()] = int(cumulative)
+    maxrss = next(int(line.split()[1]) for line in proc.stdout.splitlines() if line.startswith("maxrss"))
+    return modules.get("app.main", 0), maxrss, modules
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15, help="slowest modules to list")
+    parser.add_argument("--budget-ms", type=float, default=None, help="fail if the median import exceeds this")
+    parser.add_argument("--forbid", nargs="*", default=DEFAULT_FORBIDDEN, help="top-level packages that must not load")
+    args = parser.parse_args(argv)
+
+    env = {**REQUIRED_ENV, **os.environ}
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(BACKEND_DIR), os.environ.get("PYTHONPATH")]))
+
+    totals, rss, last_modules = [], [], {}
+    for _ in range(args.runs):
+        total, maxrss, last_modules = run_once(env)
+        totals.append(total)
+        rss.append(maxrss)
+
+    median_ms = statistics.median(totals) / 1000
+    print(f"import app.main: median {median_ms:.0f} ms over {args.runs} run(s) "
+          f"(min {min(totals) / 1000:.0f}, max {max(totals) / 1000:.0f})")
+    print(f"peak RSS: {statistics.median(rss) / 1024:.1f} MB")
+    print(f"modules imported: {len(last_modules)}")
+    print("\nslowest top-level imports (cumulative, last run):")
+    top_level = {name: us for name, us in last_modules.items() if "." not in name}
+    for name, us in sorted(top_level.items(), key=lambda item: -item[1])[: args.top]:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    failed = False
+    loaded = sorted({name.split(".")[0] for name in last_modules} & set(args.forbid))
+    if loaded:
+        print(f"\nFAIL: imported at startup but should be lazy: {', '.join(loaded)}")
+        failed = True
+    if args.budget_ms is not None and median_ms > args.budget_ms:
+        print(f"\nFAIL: median import {median_ms:.0f} ms exceeds budget {args.budget_ms:.0f} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
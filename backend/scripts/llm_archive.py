@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+"""Look up raw LLM outputs in the archive written by ``app/services/llm_archive.py``.
+
+    uv run scripts/llm_archive.py list <curriculum_id>
+    uv run scripts/llm_archive.py show <curriculum_id> [--kind generation] [--nth -1]
+    uv run scripts/llm_archive.py recent [-n 20] [--kind validation_failed]
+
+``--dir`` defaults to ``LLM_ARCHIVE_DIR`` (``llm_archive``). Only the
+archive directory is read; nothing connects to Supabase or Redis.
+"""
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def _archive(directory: str):
+    # Settings require these at import time; the archive reader doesn't use them
+    for key in ("SECRET_KEY", "SUPABASE_URL", "SUPABASE_ANON_KEY", "SUPABASE_SERVICE_KEY"):
+        os.environ.setdefault(key, "unused")
+    sys.path.insert(0, str(BACKEND_DIR))
+    from app.services.llm_archive import LLMArchive
+
+    return LLMArchive(directory)
+
+
+def _describe(entry: dict) -> str:
+    return f"{entry['ts']}  {entry['kind']:<20} {entry['curriculum_id'] or '-':<36}  {entry['segment']}@{entry['offset']} ({entry['length']} B)"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dir", default=os.environ.get("LLM_ARCHIVE_DIR", "llm_archive"))
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    list_cmd = sub.add_parser("list", help="archived records for a curriculum")
+    list_cmd.add_argument("curriculum_id")
+    list_cmd.add_argument("--kind")
+
+    show_cmd = sub.add_parser("show", help="print one record's raw output")
+    show_cmd.add_argument("curriculum_id")
+    show_cmd.add_argument("--kind")
+    show_cmd.add_argument("--nth", type=int, default=-1, help="which matching record (default: latest)")
+    show_cmd.add_argument("--json", action="store_true", help="print the whole record as JSON")
+
+    recent_cmd = sub.add_parser("recent", help="most recent records")
+    recent_cmd.add_argument("-n", type=int, default=20)
+    recent_cmd.add_argument("--kind")
+
+    args = parser.parse_args(argv)
+    archive = _archive(args.dir)
+
+    if args.command == "recent":
+        for entry in archive.lookup(kind=args.kind)[-args.n:]:
+            print(_describe(entry))
+        return 0
+
+    entries = archive.lookup(args.curriculum_id, args.kind)
+    if not entries:
+        print(f"No archived records for {args.curriculum_id} in {args.dir}", file=sys.stderr)
+        return 1
+
+    if args.command == "list":
+        for i, entry in enumerate(entries):
+            print(f"[{i}] {_describe(entry)}")
+        return 0
+
+    try:
+        entry = entries[args.nth]
+    except IndexError:
+        print(f"Only {len(entries)} record(s) match", file=sys.stderr)
+        return 1
+    record = archive.read(entry)
+    if record is None:
+        print(f"Segment {entry['segment']} has been pruned", file=sys.stderr)
+        return 1
+    if args.json:
+        print(json.dumps(record, indent=2, ensure_ascii=False))
+    else:
+        meta = {k: v for k, v in record.items() if k != "text"}
+        print(json.dumps(meta, ensure_ascii=False), file=sys.stderr)
+        print(record["text"])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,434 @@
+#!/usr/bin/env python
+"""Load test for the streaming chat endpoints against local stand-ins.
+
+Starts the real app under uvicorn in a subprocess (one worker) with
+``FakeSupabase`` and a ``FakeGeminiServer`` from ``bench_fakes.py``, then
+opens N concurrent ``/api/chat/stream`` and/or ``/api/chat/lc_stream``
+requests per concurrency level and reports:
+- time to first chunk;
+- inter-chunk gaps;
+- the server's event-loop lag;
+- server memory per open connection.
+
+    uv run scripts/load_chat.py --concurrency 50 200 500
+    uv run scripts/load_chat.py --endpoint lc_stream --tokens-per-second 100 --ttft-ms 800
+    uv run scripts/load_chat.py --max-loop-lag-ms 100   # exit 1 on a loop-blocking regression
+
+Nothing leaves localhost:
+- requests carry locally signed HS256 tokens, so auth is verified without
+  GoTrue;
+- every bench user has an active subscription row;
+- Redis is disabled;
+- the research tools are fixed-latency stand-ins.
+The LangChain agent for ``lc_stream`` is built on ``StubGeminiChat``, a chat
+model that streams from the same stand-in over HTTP, because the native
+Gemini client can only stream asynchronously over gRPC.
+
+Memory is read from ``/proc/<pid>/status``, so it is reported on Linux only.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+JWT_SECRET = "load-test-secret"
+CURRICULUM_ID = "00000000-0000-4000-8000-000000000001"
+
+SERVER_ENV = {
+    "SECRET_KEY": "bench",
+    "SUPABASE_URL": "http://127.0.0.1:9",
+    "SUPABASE_ANON_KEY": "bench",
+    "SUPABASE_SERVICE_KEY": "bench",
+    "SUPABASE_JWT_SECRET": JWT_SECRET,
+    "GEMINI_API_KEY": "bench",
+    "REDIS_URL": "",
+    "JOB_QUEUE_ENABLED": "false",
+    "LLM_ARCHIVE_ENABLED": "false",
+    "AGENT_WARMUP_ENABLED": "false",
+    "LOG_LEVEL": "WARNING",
+    "FIRECRAWL_API_KEY": "",
+    "PERPLEXITY_API_KEY": "",
+    "EXA_API_KEY": "",
+    "WOLFRAM_ALPHA_APP_ID": "",
+}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[max(1, math.ceil(pct / 100 * len(ordered))) - 1]
+
+
+def user_id(n: int) -> str:
+    return str(uuid.UUID(int=n + 1, version=4))
+
+
+# ----------------------------------------------------------------------
+# Server side (runs in the subprocess)
+# ----------------------------------------------------------------------
+
+def _start_fake_gemini(server: Any) -> None:
+    """Run the Gemini stand-in on its own thread and loop, away from the app's loop."""
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+
+    def run() -> None:
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(server.start())
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, name="fake-gemini", daemon=True).start()
+    if not ready.wait(10):
+        raise RuntimeError("fake Gemini server did not start")
+
+
+def _stub_chat_executor(base_url: str) -> Any:
+    from app.agents.chat_executor import chat_agent_prompt
+    from app.core.http_client import get_http_session
+    from app.tools.our_langchain_tools import (exa_search_lc_tool,
+                                               firecrawl_scrape_url_lc_tool,
+                                               perplexity_search_lc_tool)
+    from langchain.agents import AgentExecutor, create_tool_calling_agent
+    from langchain_core.language_models.chat_models import BaseChatModel
+    from langchain_core.messages import AIMessageChunk
+    from langchain_core.outputs import (ChatGeneration, ChatGenerationChunk,
+                                        ChatResult)
+
+    roles = {"system": "system", "human": "user", "ai": "assistant"}
+
+    class StubGeminiChat(BaseChatModel):
+        """Chat model streaming from the OpenAI-compatible stand-in; never calls tools."""
+
+        base_url: str
+
+        @property
+        def _llm_type(self) -> str:
+            return "stub-gemini"
+
+        def bind_tools(self, tools: Any, **kwargs: Any) -> "StubGeminiChat":
+            return self
+
+        def _generate(self, messages: Any, stop: Any = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+            raise NotImplementedError("StubGeminiChat is async-only")
+
+        async def _astream(self, messages: Any, stop: Any = None, run_manager: Any = None, **kwargs: Any):
+            payload = {
+                "model": "stub",
+                "stream": True,
+                "messages": [{"role": roles.get(m.type, "user"), "content": str(m.content)} for m in messages],
+            }
+            async with get_http_session().post(f"{self.base_url}/chat/completions", json=payload) as response:
+                async for line in response.content:
+                    line_str = line.decode("utf-8").strip()
+                    if not line_str.startswith("data: ") or line_str == "data: [DONE]":
+                        continue
+                    text = json.loads(line_str[len("data: "):])["choices"][0]["delta"].get("content")
+                    if text:
+                        chunk = ChatGenerationChunk(message=AIMessageChunk(content=text))
+                        if run_manager:
+                            await run_manager.on_llm_new_token(text, chunk=chunk)
+                        yield chunk
+
+        async def _agenerate(self, messages: Any, stop: Any = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+            parts = [chunk.message.content async for chunk in self._astream(messages, stop, run_manager)]
+            return ChatResult(generations=[ChatGeneration(message=AIMessageChunk(content="".join(parts)))])
+
+    tools = [exa_search_lc_tool, perplexity_search_lc_tool, firecrawl_scrape_url_lc_tool]
+    agent = create_tool_calling_agent(StubGeminiChat(base_url=base_url), tools, chat_agent_prompt())
+    return AgentExecutor(agent=agent, tools=tools, handle_parsing_errors=True, max_iterations=2)
+
+
+def serve(args: argparse.Namespace) -> None:
+    for key, value in SERVER_ENV.items():
+        os.environ.setdefault(key, value)
+    sys.path[:0] = [str(BACKEND_DIR), str(SCRIPTS_DIR)]
+
+    import uvicorn
+    from bench_fakes import FakeGeminiServer, FakeSupabase, fake_day, fake_research_tool
+
+    from app.agents import chat_executor
+    from app.agents.curriculum_agent import curriculum_agent
+    from app.core.config import settings
+    from app.main import app
+    from app.services.lesson_text import lesson_text_columns
+
+    gemini = FakeGeminiServer(
+        tokens_per_second=args.tokens_per_second,
+        ttft=args.ttft_ms / 1000,
+        tokens_per_chunk=args.tokens_per_chunk,
+        chat_reply_tokens=args.reply_tokens,
+    )
+    _start_fake_gemini(gemini)
+    settings.gemini_base_url = gemini.base_url
+
+    db = FakeSupabase(latency=args.db_latency_ms / 1000)
+    db.tables["subscription_status"] = [
+        {"user_id": user_id(n), "status": "active", "customer_id": None, "updated_at": None} for n in range(args.users)
+    ]
+    db.tables["profiles"] = [{"id": user_id(n)} for n in range(args.users)]
+    db.tables["curricula"] = [{"id": CURRICULUM_ID, "user_id": user_id(0), "title": "Load test"}]
+    db.tables["curriculum_days"] = [
+        {"id": str(uuid.uuid4()), "curriculum_id": CURRICULUM_ID, "day_number": n, "title": f"Topic {n}",
+         **lesson_text_columns(fake_day({"day_number": n, "title": f"Topic {n}"})["content"])}
+        for n in range(1, 8)
+    ]
+    db.install()
+
+    async def research_tool(query: str, *a: Any, **kw: Any) -> Any:
+        return await fake_research_tool(query, latency=args.tool_latency_ms / 1000)
+
+    for name in ("youtube_search", "arxiv_search", "wikipedia_search", "github_search"):
+        curriculum_agent.tools[name] = research_tool
+
+    key = (settings.chat_agent_model, settings.chat_agent_temperature, settings.chat_agent_max_iterations)
+    chat_executor._executors[key] = _stub_chat_executor(gemini.base_url)
+
+    lags: List[float] = []
+    monitor: Dict[str, Any] = {"task": None}
+
+    async def watch_loop(interval: float = 0.01) -> None:
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(interval)
+            lags.append(time.perf_counter() - started - interval)
+
+    @app.post("/__loadtest/reset", include_in_schema=False)
+    async def reset() -> Dict[str, Any]:
+        if monitor["task"] is None:
+            monitor["task"] = asyncio.create_task(watch_loop())
+        lags.clear()
+        db.reset_calls()
+        return {"ok": True}
+
+    @app.get("/__loadtest/stats", include_in_schema=False)
+    async def stats() -> Dict[str, Any]:
+        ms = [lag * 1000 for lag in lags]
+        return {
+            "loop_lag_p50_ms": round(percentile(ms, 50), 2),
+            "loop_lag_p99_ms": round(percentile(ms, 99), 2),
+            "loop_lag_max_ms": round(max(ms), 2) if ms else None,
+            "db_calls": db.summary(),
+        }
+
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning", access_log=False)
+
+
+# ----------------------------------------------------------------------
+# Driver
+# ----------------------------------------------------------------------
+
+def _rss_kb(pid: int) -> Optional[int]:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def _token(n: int) -> str:
+    from jose import jwt
+
+    claims = {
+        "sub": user_id(n),
+        "email": f"load{n}@example.com",
+        "aud": "authenticated",
+        "exp": int(time.time()) + 3600,
+        "user_metadata": {},
+    }
+    return jwt.encode(claims, JWT_SECRET, algorithm="HS256")
+
+
+def _body(endpoint: str, n: int) -> Dict[str, Any]:
+    messages = [
+        {"role": "user", "content": "What is a list comprehension?"},
+        {"role": "assistant", "content": "A compact way to build lists."},
+        {"role": "user", "content": f"Explain list comprehensions with an example ({n})"},
+    ]
+    if endpoint == "lc_stream":
+        return {
+            "messages": messages,
+            "curriculum_id": CURRICULUM_ID,
+            "current_day_number": 1 + n % 7,
+            "current_day_title": "Topic",
+            "curriculum_title": "Load test",
+            "learning_goal": "Learn Python",
+        }
+    return {"messages": messages, "curriculum_id": CURRICULUM_ID}
+
+
+async def _one_stream(session: Any, base_url: str, endpoint: str, n: int, token: str, result: Dict[str, Any]) -> None:
+    started = time.perf_counter()
+    last = None
+    try:
+        async with session.post(f"{base_url}/api/chat/{endpoint}", json=_body(endpoint, n), headers={"Authorization": f"Bearer {token}"}) as response:
+            result["status"] = response.status
+            async for data in response.content.iter_any():
+                if not data:
+                    continue
+                now = time.perf_counter()
+                if last is None:
+                    result["ttfc"] = now - started
+                else:
+                    result["gaps"].append(now - last)
+                last = now
+                result["bytes"] += len(data)
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["total"] = time.perf_counter() - started
+
+
+async def run_level(base_url: str, pid: int, endpoint: str, concurrency: int, tokens: List[str], timeout: float) -> Dict[str, Any]:
+    import aiohttp
+
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+        await session.post(f"{base_url}/__loadtest/reset")
+        baseline = _rss_kb(pid)
+        peak = baseline
+        results = [{"status": None, "ttfc": None, "gaps": [], "bytes": 0, "error": None} for _ in range(concurrency)]
+        tasks = [
+            asyncio.create_task(_one_stream(session, base_url, endpoint, n, tokens[n % len(tokens)], results[n]))
+            for n in range(concurrency)
+        ]
+        while not all(task.done() for task in tasks):
+            rss = _rss_kb(pid)
+            if rss is not None and peak is not None:
+                peak = max(peak, rss)
+            await asyncio.sleep(0.05)
+        async with session.get(f"{base_url}/__loadtest/stats") as response:
+            server_stats = await response.json()
+
+    ttfc = [r["ttfc"] * 1000 for r in results if r["ttfc"] is not None]
+    gaps = [gap * 1000 for r in results for gap in r["gaps"]]
+    totals = [r["total"] * 1000 for r in results]
+    ok = sum(1 for r in results if r["status"] == 200 and not r["error"])
+    errors = sorted({r["error"] or f"HTTP {r['status']}" for r in results if r["error"] or r["status"] != 200})
+    return {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "ok": ok,
+        "errors": errors[:5],
+        "ttfc_p50_ms": round(percentile(ttfc, 50), 1),
+        "ttfc_p99_ms": round(percentile(ttfc, 99), 1),
+        "gap_p50_ms": round(percentile(gaps, 50), 1),
+        "gap_p99_ms": round(percentile(gaps, 99), 1),
+        "total_p50_ms": round(percentile(totals, 50), 1),
+        "total_p99_ms": round(percentile(totals, 99), 1),
+        "kb_per_connection": round((peak - baseline) / concurrency, 1) if baseline is not None else None,
+        **{k: v for k, v in server_stats.items() if k != "db_calls"},
+        "db_calls": server_stats["db_calls"],
+    }
+
+
+async def drive(args: argparse.Namespace, port: int, pid: int) -> List[Dict[str, Any]]:
+    import aiohttp
+
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    async with aiohttp.ClientSession() as session:
+        while True:
+            try:
+                async with session.get(f"{base_url}/api/health") as response:
+                    if response.status == 200:
+                        break
+            except aiohttp.ClientError:
+                pass
+            if time.monotonic() > deadline:
+                raise SystemExit("server did not come up within 60s")
+            await asyncio.sleep(0.2)
+
+    tokens = [_token(n) for n in range(args.users)]
+    endpoints = ["stream", "lc_stream"] if args.endpoint == "both" else [args.endpoint]
+    results = []
+    for endpoint in endpoints:
+        # Warm-up: lazy imports, caches and the connection pool aren't per-connection costs
+        await run_level(base_url, pid, endpoint, min(5, args.users), tokens, args.timeout)
+        for concurrency in args.concurrency:
+            results.append(await run_level(base_url, pid, endpoint, concurrency, tokens, args.timeout))
+    return results
+
+
+def report(results: List[Dict[str, Any]]) -> None:
+    header = f"{'endpoint':<11}{'conns':>6}{'ok':>6}{'ttfc p50':>10}{'p99':>8}{'gap p50':>9}{'p99':>8}{'total p50':>11}{'lag p99':>9}{'lag max':>9}{'KB/conn':>9}"
+    print(header)
+    for r in results:
+        kb = f"{r['kb_per_connection']:.0f}" if r["kb_per_connection"] is not None else "n/a"
+        print(f"{r['endpoint']:<11}{r['concurrency']:>6}{r['ok']:>6}{r['ttfc_p50_ms']:>10.0f}{r['ttfc_p99_ms']:>8.0f}"
+              f"{r['gap_p50_ms']:>9.1f}{r['gap_p99_ms']:>8.1f}{r['total_p50_ms']:>11.0f}{r['loop_lag_p99_ms']:>9.1f}"
+              f"{(r['loop_lag_max_ms'] or 0):>9.1f}{kb:>9}")
+        if r["errors"]:
+            print(f"  errors: {'; '.join(r['errors'])}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("mode", nargs="?", default="drive", choices=["drive", "serve"], help=argparse.SUPPRESS)
+    parser.add_argument("--endpoint", choices=["stream", "lc_stream", "both"], default="both")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[50, 200])
+    parser.add_argument("--users", type=int, default=50, help="distinct authenticated users")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0, help="fake Gemini output rate per stream")
+    parser.add_argument("--tokens-per-chunk", type=int, default=5)
+    parser.add_argument("--ttft-ms", type=float, default=300.0)
+    parser.add_argument("--reply-tokens", type=int, default=300)
+    parser.add_argument("--db-latency-ms", type=float, default=5.0)
+    parser.add_argument("--tool-latency-ms", type=float, default=50.0)
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-stream timeout (seconds)")
+    parser.add_argument("--max-loop-lag-ms", type=float, default=None, help="fail if any level's p99 loop lag exceeds this")
+    parser.add_argument("--json", action="store_true")
+    parser.add_argument("--verbose", action="store_true", help="show the server's output")
+    parser.add_argument("--port", type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.mode == "serve":
+        serve(args)
+        return 0
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server_args = [a for a in (argv if argv is not None else sys.argv[1:]) if a not in ("drive", "--json", "--verbose")]
+    server = subprocess.Popen(
+        [sys.executable, __file__, "serve", *server_args, "--port", str(port)],
+        cwd=BACKEND_DIR,
+        stdout=None if args.verbose else subprocess.DEVNULL,
+    )
+    try:
+        results = asyncio.run(drive(args, port, server.pid))
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        report(results)
+
+    if args.max_loop_lag_ms is not None:
+        slow = [r for r in results if r["loop_lag_p99_ms"] > args.max_loop_lag_ms]
+        if slow:
+            print(f"\nFAIL: event-loop lag p99 over {args.max_loop_lag_ms:.0f} ms at "
+                  f"{', '.join(f'{r['endpoint']}@{r['concurrency']}' for r in slow)}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -15,4 +15,166 @@ create policy "User can read own subscription" on subscription_status
 
 -- Service role can insert/update
 create policy "Service role can manage subscriptions" on subscription_status
-  for all using (auth.jwt()->>'role' = 'service_role'); 
\ No newline at end of file
+  for all using (auth.jwt()->>'role' = 'service_role'); 
+
+-- Chat history: one row per message instead of a rewritten JSON array
+create table if not exists chat_messages (
+  id          bigint generated always as identity primary key,
+  session_id  uuid not null references chat_sessions(id) on delete cascade,
+  role        text not null,
+  content     text not null default '',
+  created_at  timestamptz default current_timestamp
+);
+
+create index if not exists chat_messages_session_id_idx on chat_messages (session_id, id desc);
+
+alter table chat_messages enable row level security;
+
+create policy "User can read own chat messages" on chat_messages
+  for select using (
+    exists (select 1 from chat_sessions s where s.id = chat_messages.session_id and s.user_id = auth.uid())
+  );
+
+create policy "Service role can manage chat messages" on chat_messages
+  for all using (auth.jwt()->>'role' = 'service_role');
+
+-- Running summary of older turns; chat_sessions.messages is no longer written
+alter table chat_sessions add column if not exists message_count integer not null default 0;
+alter table chat_sessions add column if not exists summary text;
+alter table chat_sessions add column if not exists summarized_through bigint;  -- last chat_messages.id folded into summary
+alter table chat_sessions add column if not exists summarized_count integer not null default 0;
+
+-- Backfill existing sessions
+insert into chat_messages (session_id, role, content, created_at)
+select s.id, coalesce(t.m->>'role', 'user'), coalesce(t.m->>'content', ''), s.updated_at
+from chat_sessions s
+cross join lateral jsonb_array_elements(
+  case when jsonb_typeof(s.messages) = 'array' then s.messages else '[]'::jsonb end
+) with ordinality as t(m, ord)
+where not exists (select 1 from chat_messages c where c.session_id = s.id)
+order by s.id, t.ord;
+
+update chat_sessions s
+set message_count = (select count(*) from chat_messages c where c.session_id = s.id);
+
+-- Append messages to a user's session for a curriculum (or an explicit session),
+-- creating the session if needed. Concurrent appends for the same user/curriculum
+-- are serialised, so turns are never lost and only one session is created.
+create or replace function append_chat_turn(
+  p_user_id       uuid,
+  p_curriculum_id uuid,
+  p_messages      jsonb,
+  p_session_id    uuid default null
+)
+returns table (session_id uuid, created boolean, message_count integer, unsummarized integer)
+language plpgsql
+as $$
+#variable_conflict use_column
+declare
+  v_session uuid := p_session_id;
+  v_created boolean := false;
+begin
+  perform pg_advisory_xact_lock(hashtext(p_user_id::text || ':' || coalesce(p_curriculum_id::text, '')));
+
+  if v_session is null then
+    select s.id into v_session
+    from chat_sessions s
+    where s.user_id = p_user_id and s.curriculum_id is not distinct from p_curriculum_id
+    order by s.created_at
+    limit 1;
+  elsif exists (select 1 from chat_sessions s where s.id = v_session and s.user_id <> p_user_id) then
+    raise exception 'chat session % belongs to another user', v_session;
+  end if;
+
+  if v_session is null or not exists (select 1 from chat_sessions s where s.id = v_session) then
+    v_session := coalesce(v_session, gen_random_uuid());
+    insert into chat_sessions (id, user_id, curriculum_id, messages)
+    values (v_session, p_user_id, p_curriculum_id, '[]'::jsonb);
+    v_created := true;
+  end if;
+
+  insert into chat_messages (session_id, role, content)
+  select v_session, t.m->>'role', coalesce(t.m->>'content', '')
+  from jsonb_array_elements(p_messages) with ordinality as t(m, ord)
+  order by t.ord;
+
+  return query
+  update chat_sessions s
+  set message_count = s.message_count + jsonb_array_length(p_messages),
+      updated_at = now()
+  where s.id = v_session
+  returning s.id, v_created, s.message_count, s.message_count - s.summarized_count;
+end;
+$$;
+
+-- Lesson text flattened from curriculum_days.content at write time (see app/services/lesson_text.py).
+-- Rows written earlier are backfilled lazily on first read.
+alter table curriculum_days add column if not exists content_text text;
+alter table curriculum_days add column if not exists content_sections jsonb;  -- [{heading, start, end, tokens}]
+alter table curriculum_days add column if not exists content_tokens integer;
+
+-- Renumber curriculum days in bulk. Days are parked above the live range first so
+-- a unique (curriculum_id, day_number) never trips mid-update, and "Day N:" title
+-- prefixes are rewritten alongside. Concurrent edits to the same curriculum are serialised.
+create or replace function resequence_curriculum_days(
+  p_curriculum_id uuid,
+  p_order         jsonb  -- [{"id": ..., "day_number": ...}, ...]
+)
+returns integer
+language plpgsql
+as $$
+declare
+  v_updated integer;
+begin
+  perform pg_advisory_xact_lock(hashtext('curriculum_days:' || p_curriculum_id::text));
+
+  update curriculum_days c
+  set day_number = c.day_number + 1000000
+  from jsonb_to_recordset(p_order) as o(id uuid, day_number integer)
+  where c.id = o.id and c.curriculum_id = p_curriculum_id and o.day_number is not null;
+
+  update curriculum_days c
+  set day_number = o.day_number,
+      title = regexp_replace(c.title, '^Day [^:]*:', 'Day ' || o.day_number || ':')
+  from jsonb_to_recordset(p_order) as o(id uuid, day_number integer)
+  where c.id = o.id and c.curriculum_id = p_curriculum_id and o.day_number is not null;
+
+  get diagnostics v_updated = row_count;
+  return v_updated;
+end;
+$$;
+
+-- Delete one day and close the gap it leaves. Returns the deleted day_number,
+-- or null if the day isn't part of the curriculum.
+create or replace function delete_curriculum_day(
+  p_curriculum_id uuid,
+  p_day_id        uuid
+)
+returns integer
+language plpgsql
+as $$
+declare
+  v_deleted integer;
+begin
+  perform pg_advisory_xact_lock(hashtext('curriculum_days:' || p_curriculum_id::text));
+
+  delete from curriculum_days
+  where id = p_day_id and curriculum_id = p_curriculum_id
+  returning day_number into v_deleted;
+
+  if v_deleted is null then
+    return null;
+  end if;
+
+  update curriculum_days
+  set day_number = day_number + 1000000
+  where curriculum_id = p_curriculum_id and day_number > v_deleted;
+
+  update curriculum_days
+  set day_number = day_number - 1000001,
+      title = regexp_replace(title, '^Day [^:]*:', 'Day ' || (day_number - 1000001) || ':')
+  where curriculum_id = p_curriculum_id and day_number > 1000000;
+
+  return v_deleted;
+end;
+$$;
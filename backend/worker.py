@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+"""Entry point for the background job worker (curriculum generation).
+
+Runs next to the API process, e.g. ``uv run worker.py``. Concurrency, lease and
+heartbeat timings come from the JOB_* settings.
+"""
+
+import asyncio
+import signal
+
+from app.core.executors import shutdown_executors
+from app.core.http_client import http_pool
+from app.core.log import configure_logging, shutdown_logging
+from app.db.redis_client import close_redis, init_redis
+from app.services.curriculum_generation import register_generation_jobs
+from app.services.job_queue import JobWorker
+from app.services.llm_archive import llm_archive
+
+
+async def main():
+    configure_logging()
+    init_redis()
+    await http_pool.open()
+    register_generation_jobs()
+
+    worker = JobWorker()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        # Finish running jobs, stop claiming new ones
+        loop.add_signal_handler(sig, worker.stop)
+
+    try:
+        await worker.run()
+    finally:
+        await http_pool.close()
+        shutdown_executors()
+        await close_redis()
+        # Flush raw outputs of the jobs that just finished
+        llm_archive.close()
+        shutdown_logging()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -86,7 +86,8 @@ export default function CurriculumPage() {
       // Fetch days for the curriculum
       const { data: daysData, error: daysError } = await supabase
         .from('curriculum_days')
-        .select('*')
+        // Not '*': skip the plain-text copies the backend keeps for chat context
+        .select('id, curriculum_id, day_number, title, content, resources, estimated_hours, is_project_day, project_data, created_at, updated_at')
         .eq('curriculum_id', id)
         .order('day_number');
 